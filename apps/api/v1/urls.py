@@ -11,6 +11,7 @@ from apps.policies.viewsets import (
     PolicyUploadViewSet,
     TagsViewSet,
     RatingViewSet,
+    ImportTaskViewSet,
 )
 
 app_name = 'api-ui-v1'
@@ -22,6 +23,7 @@ router.register(r'contributors', ContributorViewSet, basename='contributor')
 router.register(r'policies', PolicyViewSet, basename='policy')
 router.register(r'search', SearchViewSet, basename='search')
 router.register(r'tags', TagsViewSet, basename='tag')
+router.register(r'imports', ImportTaskViewSet, basename='import')
 router.register(r'ratings', RatingViewSet, basename='rating')
 
 # Upload endpoint
@@ -10,6 +10,7 @@ from apps.policies.viewsets import (
     ContributorViewSet,
     SearchViewSet,
     TagsViewSet,
+    ImportTaskViewSet,
 )
 
 app_name = 'api-v3'
@@ -21,6 +22,7 @@ router.register(r'contributors', ContributorViewSet, basename='contributor')
 router.register(r'policies', PolicyViewSet, basename='policy')
 router.register(r'search', SearchViewSet, basename='search')
 router.register(r'tags', TagsViewSet, basename='tag')
+router.register(r'imports', ImportTaskViewSet, basename='import')
 
 urlpatterns = [
     path('', include(router.urls)),
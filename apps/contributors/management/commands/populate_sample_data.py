@@ -5,6 +5,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 from apps.contributors.models import Contributor
 from apps.policies.models import Policy, PolicyVersion, Tag
+from apps.policies.snapshots import publish_version
 
 User = get_user_model()
 
@@ -141,6 +142,7 @@ class Command(BaseCommand):
                     git_commit='a' * 40,  # Dummy commit hash
                     changelog='Initial release\n- Initial policy implementation\n- Basic security contexts\n- File permissions'
                 )
+                publish_version(version.pk)
                 
                 self.stdout.write(self.style.SUCCESS(f'Created policy: {policy.full_name} v{version.version}'))
                 
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:00
+
+import os
+
+from django.db import migrations
+
+USE_POSTGRES = os.getenv("USE_POSTGRES", "False") == "True"
+
+operations = []
+
+if USE_POSTGRES:
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.operations import TrigramExtension
+
+    operations += [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="contributor",
+            index=GinIndex(fields=["name"], name="contributors_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contributors", "0001_initial"),
+    ]
+
+    operations = operations
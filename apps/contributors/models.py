@@ -2,6 +2,7 @@
 Contributor models for organizing SELinux policies.
 Contributors can have multiple owners, and users can own multiple contributors.
 """
+import os
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth import get_user_model
@@ -9,6 +10,14 @@ from apps.core.models import TimeStampedModel
 
 User = get_user_model()
 
+# PostgreSQL-specific imports (conditional)
+USE_POSTGRES = os.getenv('USE_POSTGRES', 'False') == 'True'
+
+if USE_POSTGRES:
+    from django.contrib.postgres.indexes import GinIndex
+else:
+    GinIndex = None
+
 
 class Contributor(TimeStampedModel):
     """
@@ -53,6 +62,9 @@ class Contributor(TimeStampedModel):
         verbose_name = _('contributor')
         verbose_name_plural = _('contributors')
         ordering = ['name']
+        indexes = []
+        if USE_POSTGRES and GinIndex:
+            indexes.append(GinIndex(fields=['name'], name='contributors_name_trgm', opclasses=['gin_trgm_ops']))
 
     def __str__(self):
         return self.name
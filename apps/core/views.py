@@ -6,7 +6,8 @@ from django.shortcuts import render
 from django.http import JsonResponse
 from django.db import connection
 from random import sample
-from apps.policies.models import Policy, DownloadLog
+from apps.policies.models import Policy
+from apps.policies.rollups import total_downloads
 from apps.contributors.models import Contributor
 from apps.accounts.models import User
 
@@ -30,7 +31,7 @@ def home(request):
     # Get statistics
     policy_count = Policy.objects.filter(is_active=True).count()
     contributor_count = Contributor.objects.filter(is_active=True).count()
-    download_count = DownloadLog.objects.count()
+    download_count = total_downloads()
     user_count = User.objects.filter(is_active=True).count()
     
     # Get recommendations (random featured contributor if available)
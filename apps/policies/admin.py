@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Tag, Policy, PolicyVersion, PolicyFile, DownloadLog
+from .models import Tag, Policy, PolicyVersion, PolicyFile, DownloadLog, ImportTask
+from .snapshots import publish_version
 
 
 @admin.register(Tag)
@@ -21,7 +22,7 @@ class PolicyAdmin(admin.ModelAdmin):
     list_filter = ('is_deprecated', 'is_active', 'contributor', 'created_at')
     search_fields = ('name', 'contributor__name', 'description')
     filter_horizontal = ('tags',)
-    readonly_fields = ('created_at', 'updated_at', 'download_count', 'star_count')
+    readonly_fields = ('created_at', 'updated_at', 'download_count', 'star_count', 'downvote_count', 'wilson_score', 'rating_count', 'average_rating', 'bayesian_rating')
     inlines = [PolicyVersionInline]
     
     fieldsets = (
@@ -38,7 +39,7 @@ class PolicyAdmin(admin.ModelAdmin):
             'fields': ('tags', 'license')
         }),
         ('Statistics', {
-            'fields': ('download_count', 'star_count')
+            'fields': ('download_count', 'star_count', 'downvote_count', 'wilson_score', 'rating_count', 'average_rating', 'bayesian_rating')
         }),
         ('Status', {
             'fields': ('is_deprecated', 'is_active')
@@ -53,7 +54,8 @@ class PolicyAdmin(admin.ModelAdmin):
 class PolicyFileInline(admin.TabularInline):
     model = PolicyFile
     extra = 0
-    readonly_fields = ('size',)
+    fields = ('file_path', 'file_type', 'size', 'blob')
+    readonly_fields = ('size', 'blob')
 
 
 @admin.register(PolicyVersion)
@@ -61,8 +63,9 @@ class PolicyVersionAdmin(admin.ModelAdmin):
     list_display = ('__str__', 'version', 'is_latest', 'download_count', 'created_at')
     list_filter = ('is_latest', 'created_at', 'policy__contributor')
     search_fields = ('policy__name', 'policy__contributor__name', 'version')
-    readonly_fields = ('created_at', 'updated_at', 'download_count')
+    readonly_fields = ('created_at', 'updated_at', 'download_count', 'published_at', 'snapshot_hash')
     inlines = [PolicyFileInline]
+    actions = ['regenerate_snapshots']
     
     fieldsets = (
         (None, {
@@ -86,11 +89,22 @@ class PolicyVersionAdmin(admin.ModelAdmin):
         ('Status', {
             'fields': ('is_latest', 'download_count')
         }),
+        ('Snapshot', {
+            'fields': ('published_at', 'snapshot_hash'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    @admin.action(description='Regenerate JSON snapshots of selected versions')
+    def regenerate_snapshots(self, request, queryset):
+        """Re-render stored version details, e.g. after the serializer changed."""
+        for pk in queryset.values_list('pk', flat=True):
+            publish_version(pk, force=True)
+        self.message_user(request, f'Regenerated {queryset.count()} version snapshots.')
 
 
 @admin.register(PolicyFile)
@@ -98,6 +112,7 @@ class PolicyFileAdmin(admin.ModelAdmin):
     list_display = ('version', 'file_path', 'file_type', 'size', 'created_at')
     list_filter = ('file_type', 'created_at')
     search_fields = ('version__policy__name', 'file_path')
+    readonly_fields = ('size', 'blob', 'content')
 
 
 @admin.register(DownloadLog)
@@ -112,3 +127,16 @@ class DownloadLogAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ImportTask)
+class ImportTaskAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'user', 'state', 'stage', 'files_processed', 'created_at', 'finished_at')
+    list_filter = ('state', 'created_at')
+    search_fields = ('contributor', 'name', 'version', 'user__username')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,187 @@
+"""
+Stored policy archives and the responses that serve them.
+
+Imported packages are kept under ``YSEAL_ARCHIVE_ROOT`` named by their
+SHA-256, which is also the version's ``checksum`` and the download's ETag,
+so identical uploads share one file. ``archive_response`` hands the file to
+the front end or the WSGI server instead of reading it in Python: behind
+nginx it answers with ``X-Accel-Redirect`` (``YSEAL_ARCHIVE_ACCEL_REDIRECT``)
+and nginx serves the bytes and byte ranges itself; otherwise it returns a
+``FileResponse`` that gunicorn sends with ``sendfile()``, limited to the
+requested range.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework.renderers import JSONRenderer
+
+ARCHIVE_TYPES = {
+    '.tar.gz': 'application/gzip',
+    '.zip': 'application/zip',
+}
+
+
+class ArchiveRenderer(JSONRenderer):
+    """
+    Accepts any media type, so clients asking for application/gzip are not
+    refused with a 406; archive bodies never go through a renderer.
+    """
+    media_type = '*/*'
+    format = 'archive'
+
+
+class ArchiveResponse(FileResponse):
+    block_size = 64 * 1024
+
+
+class FileRange:
+    """
+    A byte range of an open file. ``read`` stops at the end of the range when
+    the file is streamed in Python; ``fileno`` lets the server ``sendfile()``
+    it from the current offset for ``Content-Length`` bytes instead.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def archive_suffix(filename):
+    """The archive type suffix of an uploaded file name."""
+    return '.zip' if filename.endswith('.zip') else '.tar.gz'
+
+
+def archive_file(relative_path):
+    return os.path.join(settings.YSEAL_ARCHIVE_ROOT, relative_path)
+
+
+def archive_name(checksum, filename):
+    """Path of an uploaded archive relative to ``YSEAL_ARCHIVE_ROOT``."""
+    return f'{checksum[:2]}/{checksum}{archive_suffix(filename)}'
+
+
+def stage_archive(path, relative_path):
+    """
+    Copy the archive at ``path`` to a temporary file beside ``relative_path``
+    in the archive store, for ``keep_archive`` or ``discard_archive``. Returns
+    None when the store already holds it.
+    """
+    target = archive_file(relative_path)
+    if os.path.exists(target):
+        return None
+    directory = os.path.dirname(target)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        # copyfile uses sendfile() where it can, so the archive is not read into Python
+        shutil.copyfile(path, temp_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def keep_archive(staged, relative_path):
+    """Move a staged archive into place; the rename cannot leave a partial file."""
+    if staged:
+        os.replace(staged, archive_file(relative_path))
+
+
+def discard_archive(staged):
+    """Remove a staged archive that will not be kept."""
+    if staged:
+        try:
+            os.remove(staged)
+        except FileNotFoundError:
+            pass
+
+
+def parse_range(header, size):
+    """
+    Parse a ``Range`` header against a file of ``size`` bytes. Returns
+    ``(start, end)`` inclusive, None to serve the whole file (no header, or
+    one this server does not split, such as multiple ranges), or ``False``
+    when the range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            # A suffix range: the last N bytes
+            start, end = max(size - int(last), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return False
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def requested_range(request, size, etag):
+    """The byte range to serve, honouring ``If-Range``."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        return None
+    return parse_range(request.META.get('HTTP_RANGE'), size)
+
+
+def starts_download(request):
+    """Whether a request fetches an archive from its first byte, rather than resuming."""
+    header = request.META.get('HTTP_RANGE', '')
+    return not header.startswith('bytes=') or header[len('bytes='):].lstrip().startswith('0-')
+
+
+def archive_response(request, relative_path, filename, etag):
+    """Serve a stored archive, or the requested byte range of it, as an attachment."""
+    content_type = ARCHIVE_TYPES[archive_suffix(relative_path)]
+    path = archive_file(relative_path)
+    size = os.path.getsize(path)
+    byte_range = requested_range(request, size, etag)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if settings.YSEAL_ARCHIVE_ACCEL_REDIRECT:
+        # nginx serves the file, including byte ranges, from an internal location
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.YSEAL_ARCHIVE_ACCEL_REDIRECT.rstrip('/') + '/' + relative_path
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    elif byte_range:
+        start, end = byte_range
+        response = ArchiveResponse(
+            FileRange(open(path, 'rb'), start, end - start + 1),
+            status=206, as_attachment=True, filename=filename, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = ArchiveResponse(open(path, 'rb'), as_attachment=True, filename=filename, content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,239 @@
+"""
+On-demand ``.tar.gz`` archives for versions that have no stored upload,
+such as versions imported from git, assembled from their ``PolicyFile`` rows.
+
+The archive is deterministic: members are sorted by path, carry fixed
+ownership, mode and mtime, and the gzip header has no name or timestamp, so
+the same files always give the same archive. Built archives are cached
+under ``YSEAL_ARCHIVE_ROOT/built`` keyed by a hash of the file manifest
+(paths, blob digests and sizes), which also serves as the download's ETag, so
+versions that ship identical files share one archive.
+
+The first request streams the archive while it is generated, one blob
+chunk at a time, and writes it to the cache as it goes. A lock per manifest
+key (``fcntl`` locks on striped lock files, so they work across processes)
+makes concurrent first requests wait for that build and then read its
+result instead of building again; a request that waits longer than
+``YSEAL_ARCHIVE_BUILD_WAIT`` streams an uncached copy. Cached archives are
+evicted least recently served first once they exceed
+``YSEAL_ARCHIVE_CACHE_MAX_SIZE`` bytes.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import struct
+import tarfile
+import tempfile
+import time
+import zlib
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
+
+from .archives import archive_file, archive_response
+from .blobs import open_blob, remove_file
+from .models import PolicyBlob, PolicyFile
+
+logger = logging.getLogger(__name__)
+
+# Part of the manifest key; bump it when the archive layout below changes
+FORMAT_VERSION = 1
+GZIP_LEVEL = 6
+# Fixed gzip header: no file name, mtime 0, unknown OS
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+BLOCK_SIZE = tarfile.BLOCKSIZE
+RECORD_SIZE = tarfile.RECORDSIZE
+CHUNK_SIZE = 64 * 1024
+
+BUILT_DIR = 'built'
+LOCK_DIR = 'locks'
+# Seconds between attempts to take a build lock held by another request
+LOCK_POLL_INTERVAL = 0.2
+# Partial builds older than this were left by a worker that died mid-build
+STALE_BUILD_SECONDS = 60 * 60
+
+
+def version_manifest(version_id):
+    """
+    ``(path, digest, size)`` of a version's files, in archive order. Files
+    whose content was not kept have a digest and size of None.
+    """
+    return list(
+        PolicyFile.objects.filter(version_id=version_id)
+        .order_by('file_path', 'pk')
+        .values_list('file_path', 'blob_id', 'blob__size')
+    )
+
+
+def missing_files(manifest):
+    """Paths in ``manifest`` that have no blob to archive."""
+    return [path for path, digest, _ in manifest if digest is None]
+
+
+def manifest_key(manifest):
+    """Content hash naming the archive built from ``manifest``."""
+    raw = json.dumps([FORMAT_VERSION, GZIP_LEVEL, manifest], separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def built_path(key):
+    """Path of a built archive relative to YSEAL_ARCHIVE_ROOT."""
+    return f'{BUILT_DIR}/{key[:2]}/{key}.tar.gz'
+
+
+def cached_archive(key):
+    """The relative path of the built archive for ``key`` if it is cached."""
+    relative_path = built_path(key)
+    try:
+        # The modification time records when the archive was last served
+        os.utime(archive_file(relative_path))
+    except FileNotFoundError:
+        return None
+    return relative_path
+
+
+def member_header(path, size):
+    info = tarfile.TarInfo(path)
+    info.size = size
+    info.mtime = 0
+    info.mode = 0o644
+    info.uid = info.gid = 0
+    info.uname = info.gname = ''
+    return info.tobuf(format=tarfile.PAX_FORMAT, encoding='utf-8', errors='strict')
+
+
+def generate_archive(manifest):
+    """
+    Yield the gzip-compressed tar stream of ``manifest``. Blob contents are
+    read in chunks, so no more than one chunk of a file is held at a time.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    crc, length = 0, 0
+
+    def compress(data):
+        nonlocal crc, length
+        crc = zlib.crc32(data, crc)
+        length += len(data)
+        return compressor.compress(data)
+
+    yield GZIP_HEADER
+    for path, digest, size in manifest:
+        out = compress(member_header(path, size))
+        blob = PolicyBlob.objects.get(pk=digest)
+        written = 0
+        with open_blob(blob) as stream:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                written += len(chunk)
+                out += compress(chunk)
+                if out:
+                    yield out
+                    out = b''
+        if written != size:
+            raise ValueError(f'Blob {digest} holds {written} bytes, expected {size}')
+        out += compress(b'\0' * (-size % BLOCK_SIZE))
+        if out:
+            yield out
+    # Two zero blocks end the archive, padded to a whole record like tarfile does
+    end = 2 * BLOCK_SIZE
+    out = compress(b'\0' * (end + (-(length + end) % RECORD_SIZE)))
+    yield out + compressor.flush() + struct.pack('<II', crc & 0xffffffff, length & 0xffffffff)
+
+
+class BuildLock:
+    """An exclusive ``flock`` on one of 256 lock files, chosen by key prefix."""
+
+    def __init__(self, key):
+        directory = archive_file(LOCK_DIR)
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(os.path.join(directory, f'{key[:2]}.lock'), 'a+b')
+
+    def acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    return False
+                time.sleep(LOCK_POLL_INTERVAL)
+
+    def release(self):
+        self.file.close()
+
+
+def stream_archive(key, manifest):
+    """
+    Stream the archive for ``key``: from the cache once a concurrent build
+    has finished, otherwise by building it and caching it as it is sent.
+    """
+    lock = BuildLock(key)
+    if not lock.acquire(settings.YSEAL_ARCHIVE_BUILD_WAIT):
+        lock.release()
+        logger.warning('Timed out waiting for archive %s to be built; streaming an uncached copy', key)
+        yield from generate_archive(manifest)
+        return
+    try:
+        relative_path = cached_archive(key)
+        if relative_path:
+            with open(archive_file(relative_path), 'rb') as archive:
+                yield from iter(lambda: archive.read(CHUNK_SIZE), b'')
+            return
+        target = archive_file(built_path(key))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, 'wb') as partial:
+                for chunk in generate_archive(manifest):
+                    partial.write(chunk)
+                    yield chunk
+            os.replace(temp_path, target)
+        except BaseException:
+            # Includes the client going away mid-download
+            os.remove(temp_path)
+            raise
+    finally:
+        lock.release()
+    evict_archives()
+
+
+def assembled_response(request, key, manifest, filename):
+    """
+    Serve the archive built from ``manifest``: like a stored archive when it
+    is cached, otherwise streamed as it is built, without a length or ranges.
+    """
+    etag = f'"{key}"'
+    relative_path = cached_archive(key)
+    if relative_path:
+        return archive_response(request, relative_path, filename, etag)
+    response = StreamingHttpResponse(stream_archive(key, manifest), content_type='application/gzip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['ETag'] = etag
+    return response
+
+
+def evict_archives():
+    """Delete the least recently served built archives while the cache is over its size."""
+    archives, total = [], 0
+    stale = time.time() - STALE_BUILD_SECONDS
+    for directory, _, names in os.walk(archive_file(BUILT_DIR)):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if name.endswith('.tar.gz'):
+                archives.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+            elif stat.st_mtime < stale:
+                remove_file(path)
+    archives.sort()
+    for _, size, path in archives:
+        if total <= settings.YSEAL_ARCHIVE_CACHE_MAX_SIZE:
+            break
+        remove_file(path)
+        total -= size
@@ -0,0 +1,177 @@
+"""
+Content-addressed storage for policy file contents.
+
+Every imported file is stored once per SHA-256 as a ``PolicyBlob`` however
+many versions ship it, and ``PolicyFile`` rows reference blobs by digest.
+``YSEAL_BLOB_STORAGE`` chooses where new blobs keep their bytes: in the
+``policy_blobs`` table (``database``) or as files under ``YSEAL_BLOB_ROOT``
+(``filesystem``), fanned out by the first two bytes of the digest. Each blob
+records where it went, so existing blobs stay readable when the setting
+changes. With ``YSEAL_BLOB_COMPRESSION = 'zstd'`` blobs are stored
+compressed when that makes them smaller, which needs the ``zstandard``
+package.
+
+Blobs never change once written. A rolled back import can leave blob files
+that no row knows about, and deleting versions leaves blobs no file uses;
+``prune_blobs`` removes both. An import locks the existing blobs it reuses
+until it commits, and ``prune_blobs`` skips blobs that turn out to be
+referenced by the time their delete commits, so the two can run at once.
+"""
+import io
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import PolicyBlob
+
+CHUNK_SIZE = 64 * 1024
+
+# Blobs younger than this may belong to an import that has not committed yet
+GRACE_SECONDS = 60 * 60
+
+
+def zstd():
+    """Import zstandard, which is only needed when blobs are compressed."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImproperlyConfigured('zstd blob compression requires the zstandard package')
+    return zstandard
+
+
+def blob_path(digest):
+    """Location of a filesystem blob."""
+    return os.path.join(settings.YSEAL_BLOB_ROOT, digest[:2], digest[2:4], digest)
+
+
+def encode(data):
+    """Return ``(encoding, stored bytes)`` for new blob contents."""
+    if settings.YSEAL_BLOB_COMPRESSION == PolicyBlob.ZSTD and data:
+        compressed = zstd().ZstdCompressor(level=settings.YSEAL_BLOB_ZSTD_LEVEL).compress(data)
+        if len(compressed) < len(data):
+            return PolicyBlob.ZSTD, compressed
+    elif settings.YSEAL_BLOB_COMPRESSION not in ('', 'none', PolicyBlob.ZSTD):
+        raise ImproperlyConfigured(f'Unknown YSEAL_BLOB_COMPRESSION {settings.YSEAL_BLOB_COMPRESSION!r}')
+    return PolicyBlob.IDENTITY, data
+
+
+def write_file(digest, data):
+    """Write a filesystem blob; the rename makes it appear complete or not at all."""
+    path = blob_path(digest)
+    if os.path.exists(path):
+        return
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as blob_file:
+            blob_file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def store_blobs(contents):
+    """
+    Store ``{digest: bytes}`` contents, skipping digests that are already
+    known. Returns the number of blobs written. Inside a transaction the
+    known blobs stay locked until it ends, so ``prune_blobs`` cannot delete
+    them before the files that reuse them are committed.
+    """
+    storage = settings.YSEAL_BLOB_STORAGE
+    if storage not in (PolicyBlob.DATABASE, PolicyBlob.FILESYSTEM):
+        raise ImproperlyConfigured(f'Unknown YSEAL_BLOB_STORAGE {storage!r}')
+    known = PolicyBlob.objects.filter(digest__in=list(contents))
+    if transaction.get_connection().in_atomic_block:
+        known = known.select_for_update()
+    known = set(known.values_list('digest', flat=True))
+    blobs = []
+    for digest, data in contents.items():
+        if digest in known:
+            continue
+        encoding, stored = encode(data)
+        blob = PolicyBlob(digest=digest, size=len(data), stored_size=len(stored), storage=storage, encoding=encoding)
+        if storage == PolicyBlob.FILESYSTEM:
+            write_file(digest, stored)
+        else:
+            blob.data = stored
+        blobs.append(blob)
+    # A concurrent import may store the same contents first; its row is as good
+    PolicyBlob.objects.bulk_create(blobs, ignore_conflicts=True)
+    return len(blobs)
+
+
+def open_blob(blob):
+    """Open a blob's contents as a binary stream."""
+    if blob.storage == PolicyBlob.FILESYSTEM:
+        stream = open(blob_path(blob.digest), 'rb')
+    else:
+        stream = io.BytesIO(bytes(blob.data))
+    if blob.encoding == PolicyBlob.ZSTD:
+        stream = zstd().ZstdDecompressor().stream_reader(stream, closefd=True)
+    return stream
+
+
+def decode_text(data):
+    """Text shown for file contents: '' when over YSEAL_FILE_CONTENT_MAX_SIZE or not UTF-8."""
+    if len(data) > settings.YSEAL_FILE_CONTENT_MAX_SIZE:
+        return ''
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return ''
+
+
+def read_text(blob):
+    """The text of a blob, read only when it is small enough to be shown."""
+    if blob.size > settings.YSEAL_FILE_CONTENT_MAX_SIZE:
+        return ''
+    with open_blob(blob) as stream:
+        return decode_text(b''.join(iter(lambda: stream.read(CHUNK_SIZE), b'')))
+
+
+def prune_blobs():
+    """
+    Delete blobs no policy file references and blob files without a row.
+    Returns the number of blobs and files removed.
+    """
+    removed = 0
+    unused = PolicyBlob.objects.filter(
+        files__isnull=True, created_at__lt=timezone.now() - timedelta(seconds=GRACE_SECONDS)
+    )
+    for digest, storage in list(unused.values_list('digest', 'storage')):
+        try:
+            with transaction.atomic():
+                deleted = PolicyBlob.objects.filter(digest=digest, files__isnull=True).delete()[0]
+        except IntegrityError:
+            # An import committed files using the blob while the delete waited on its lock
+            continue
+        if deleted:
+            removed += 1
+            if storage == PolicyBlob.FILESYSTEM:
+                remove_file(blob_path(digest))
+
+    cutoff = time.time() - GRACE_SECONDS
+    for directory, _, names in os.walk(settings.YSEAL_BLOB_ROOT):
+        known = set(PolicyBlob.objects.filter(digest__in=names).values_list('digest', flat=True))
+        for name in names:
+            path = os.path.join(directory, name)
+            if name not in known and os.path.getmtime(path) < cutoff:
+                removed += remove_file(path)
+    return removed
+
+
+def remove_file(path):
+    """Remove a file that may already be gone; returns 1 if it was removed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return 0
+    return 1
@@ -0,0 +1,109 @@
+"""
+Conditional GET for the read endpoints the CLI polls.
+
+Each endpoint derives its validators from one small query over ``updated_at``
+columns and the maintained counters, never from the serialized payload, and
+answers ``If-None-Match`` / ``If-Modified-Since`` with a 304 before loading
+anything else. The signals in ``apps.policies.signals`` touch ``updated_at``
+when related rows that are part of a payload change (tags, owners), so a
+timestamp always covers everything its endpoint renders. Version details are
+stored snapshots and validate against the snapshot's hash.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import Policy, PolicyVersion
+from .snapshots import publish_version
+
+# Policy columns that change without touching updated_at
+POLICY_COUNTERS = (
+    'download_count', 'star_count', 'downvote_count', 'rating_count', 'rating_sum',
+    'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+)
+
+
+def make_etag(request, parts):
+    """Strong ETag over the validator parts and the negotiated media type."""
+    raw = repr((getattr(request, 'accepted_media_type', ''),) + tuple(parts))
+    return '"%s"' % hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def conditional_response(request, validators, render, cache_control=None):
+    """
+    Answer a GET from ``validators`` when the client's copy is current,
+    otherwise return ``render()`` with ``ETag`` and ``Last-Modified`` set.
+    ``validators`` is ``(parts, last_modified)``, or None when the resource
+    does not exist, in which case ``render`` produces the 404.
+    ``cache_control`` directives are added to both 200 and 304 responses.
+    """
+    if validators is None:
+        return render()
+    parts, last_modified = validators
+    etag = make_etag(request, parts)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+        if response.status_code != 200:
+            return response
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    if cache_control:
+        patch_cache_control(response, **cache_control)
+    return response
+
+
+def policy_validators(**lookup):
+    """
+    Validators for a policy detail. The counters have no timestamp of their
+    own, so the detail only carries an ETag.
+    """
+    try:
+        row = Policy.objects.filter(**lookup).values_list(
+            'pk', 'updated_at', 'contributor__updated_at', *POLICY_COUNTERS
+        ).first()
+    except (TypeError, ValueError):
+        return None
+    return None if row is None else (('policy',) + row, None)
+
+
+def policy_versions_validators(contributor, name):
+    """Validators for a version list; saving or deleting a version touches the policy."""
+    row = Policy.objects.filter(contributor__name=contributor, name=name).values_list('pk', 'updated_at').first()
+    return None if row is None else (('versions',) + row, row[1])
+
+
+def version_validators(contributor, name, version):
+    """Validators for a version detail: its snapshot hash, publishing it first if needed."""
+    versions = PolicyVersion.objects.filter(policy__contributor__name=contributor, policy__name=name, version=version)
+    row = versions.values_list('pk', 'snapshot_hash', 'published_at').first()
+    if row is None:
+        return None
+    if not row[1]:
+        publish_version(row[0])
+        row = versions.values_list('pk', 'snapshot_hash', 'published_at').first()
+    return ('version',) + row[:2], row[2]
+
+
+def instance_validators(model, **lookup):
+    """Validators for a single contributor or tag."""
+    try:
+        row = model.objects.filter(**lookup).values_list('pk', 'updated_at').first()
+    except (TypeError, ValueError):
+        return None
+    return None if row is None else ((model._meta.label,) + row, row[1])
+
+
+def collection_validators(model):
+    """
+    Validators for a contributor or tag list: the newest change and the row
+    count, which also moves when a row is deleted.
+    """
+    summary = model.objects.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+    return (model._meta.label, summary['count'], summary['last_modified']), summary['last_modified']
+
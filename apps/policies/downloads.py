@@ -0,0 +1,337 @@
+"""
+Download counting for policies, versions and contributors.
+
+Recording a download only increments pending counters in the cache. The
+``flush_download_counters`` Celery beat task folds them into the
+``download_count`` columns in a few bulk UPDATEs, so list views sort on a
+plain indexed column and a download never contends for the policy row.
+
+With the Redis cache backend the pending counts are fields of a single
+hash. A flush renames the hash before reading it, so downloads recorded
+during the flush land in a fresh hash and nothing is counted twice. Other
+cache backends are local to the process, so counts are buffered in memory
+and the recording process flushes them itself once
+``YSEAL_DOWNLOAD_FLUSH_INTERVAL`` has elapsed.
+
+``DownloadLog`` rows are not written on the request path either. They are
+appended to a per-process ``DownloadBuffer`` that a background thread writes
+with ``bulk_create`` once ``YSEAL_DOWNLOAD_BUFFER_SIZE`` rows are waiting or
+``YSEAL_DOWNLOAD_BUFFER_SECONDS`` have passed, and again when the process
+exits. During an install storm the buffer stops taking rows for the
+policies that already fill it, so a single hot policy is sampled down
+instead of the worker running out of memory; download counts stay exact.
+"""
+import atexit
+import ipaddress
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.contributors.models import Contributor
+from apps.search.cache import DOWNLOADS, bump_generation
+from .models import DownloadLog, Policy, PolicyVersion
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'downloads:pending'
+
+# Counter kinds and the model whose download_count they feed
+COUNTED_MODELS = {
+    'policy': Policy,
+    'version': PolicyVersion,
+    'contributor': Contributor,
+}
+
+# Rows updated per statement when flushing
+FLUSH_BATCH_SIZE = 500
+
+
+class RedisCounters:
+    """Pending counts in a Redis hash shared by every worker."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.key = backend.make_key(PENDING_KEY)
+
+    @property
+    def client(self):
+        return self.backend._cache.get_client(self.key, write=True)
+
+    def add(self, counts):
+        pipeline = self.client.pipeline(transaction=False)
+        for (kind, pk), n in counts.items():
+            pipeline.hincrby(self.key, f'{kind}:{pk}', n)
+        pipeline.execute()
+
+    def drain(self):
+        from redis.exceptions import ResponseError
+
+        client = self.client
+        flushing = f'{self.key}:flush:{uuid.uuid4().hex}'
+        try:
+            client.rename(self.key, flushing)
+        except ResponseError:
+            # No downloads since the last flush
+            return Counter()
+        counts = Counter()
+        for field, n in client.hgetall(flushing).items():
+            kind, pk = field.decode().split(':', 1)
+            counts[(kind, int(pk))] += int(n)
+        client.delete(flushing)
+        return counts
+
+    def is_due(self):
+        return False
+
+
+class LocalCounters:
+    """Pending counts buffered in this process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.last_flush = time.monotonic()
+
+    def add(self, counts):
+        with self.lock:
+            self.counts.update(counts)
+
+    def drain(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.last_flush = time.monotonic()
+        return counts
+
+    def is_due(self):
+        return time.monotonic() - self.last_flush >= settings.YSEAL_DOWNLOAD_FLUSH_INTERVAL
+
+
+_counters = None
+
+
+def get_counters():
+    """Return the pending counter store for the configured cache backend."""
+    global _counters
+    if _counters is None:
+        from django.core.cache.backends.redis import RedisCache
+
+        backend = caches['default']
+        _counters = RedisCounters(backend) if isinstance(backend, RedisCache) else LocalCounters()
+    return _counters
+
+
+class DownloadBuffer:
+    """
+    Per-process buffer of unsaved ``DownloadLog`` rows, written in bulk by a
+    background thread.
+
+    Once ``capacity`` rows are waiting, a row is only accepted if its policy
+    holds fewer than ``capacity // POLICY_SHARE`` of them; at twice the
+    capacity every row is dropped until the next flush.
+    """
+    POLICY_SHARE = 100
+
+    def __init__(self, size, interval, capacity):
+        self.size = size
+        self.interval = interval
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.rows = []
+        self.per_policy = Counter()
+        self.dropped = Counter()
+        self.pid = None
+
+    def add(self, row):
+        """Queue a row; returns False when it was dropped."""
+        with self.lock:
+            self._start()
+            waiting = len(self.rows)
+            if waiting >= self.capacity:
+                quota = max(self.capacity // self.POLICY_SHARE, 1)
+                if waiting >= 2 * self.capacity or self.per_policy[row.policy_id] >= quota:
+                    self.dropped[row.policy_id] += 1
+                    return False
+            self.rows.append(row)
+            self.per_policy[row.policy_id] += 1
+            if waiting + 1 >= self.size:
+                self.wakeup.set()
+        return True
+
+    def drain(self):
+        with self.lock:
+            rows, dropped = self.rows, self.dropped
+            self.rows, self.per_policy, self.dropped = [], Counter(), Counter()
+        return rows, dropped
+
+    def restore(self, rows):
+        """
+        Put rows whose write failed back in front of the queue. Only as many
+        as keep the buffer under twice its capacity are kept, oldest dropped first.
+        """
+        with self.lock:
+            keep = max(2 * self.capacity - len(self.rows), 0)
+            lost = rows[:len(rows) - keep] if keep < len(rows) else []
+            rows = rows[len(lost):]
+            self.rows[:0] = rows
+            self.per_policy.update(row.policy_id for row in rows)
+            self.dropped.update(row.policy_id for row in lost)
+
+    def flush(self):
+        """Write every waiting row; returns the number written."""
+        rows, dropped = self.drain()
+        if dropped:
+            logger.warning(
+                'Download log buffer overloaded, dropped %d rows for %d policies',
+                sum(dropped.values()), len(dropped)
+            )
+        if rows:
+            try:
+                DownloadLog.objects.bulk_create(rows, batch_size=self.size)
+            except Exception:
+                # bulk_create writes all batches in one transaction, so none were saved
+                self.restore(rows)
+                raise
+        return len(rows)
+
+    def _start(self):
+        # Threads do not survive fork, so each worker process starts its own
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        thread = threading.Thread(target=self._run, name='download-log-writer', daemon=True)
+        thread.start()
+        atexit.register(flush_pending)
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+                counters = get_counters()
+                if counters.is_due():
+                    flush_counts()
+            except Exception:
+                logger.exception('Failed to write buffered downloads')
+            finally:
+                connections.close_all()
+
+
+_buffer = None
+
+
+def get_buffer():
+    """Return this process's download log buffer."""
+    global _buffer
+    if _buffer is None:
+        _buffer = DownloadBuffer(
+            size=settings.YSEAL_DOWNLOAD_BUFFER_SIZE,
+            interval=settings.YSEAL_DOWNLOAD_BUFFER_SECONDS,
+            capacity=settings.YSEAL_DOWNLOAD_BUFFER_CAPACITY,
+        )
+    return _buffer
+
+
+def count_download(version, contributor_id=None):
+    """Increment the pending download counters of a version, its policy and contributor."""
+    if contributor_id is None:
+        contributor_id = version.policy.contributor_id
+    get_counters().add({
+        ('policy', version.policy_id): 1,
+        ('version', version.pk): 1,
+        ('contributor', contributor_id): 1,
+    })
+
+
+def client_ip(request):
+    """
+    The client address for download logs: the first X-Forwarded-For hop set
+    by the router, or the peer address. Invalid values are not logged.
+    """
+    for candidate in (request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')[0], request.META.get('REMOTE_ADDR', '')):
+        try:
+            return str(ipaddress.ip_address(candidate.strip()))
+        except ValueError:
+            continue
+    return None
+
+
+def record_download(version, ip_address, user_agent='', contributor_id=None):
+    """
+    Count a download and queue its analytics row. Nothing is written to the
+    database on the calling thread unless buffering is disabled.
+    """
+    count_download(version, contributor_id)
+    row = DownloadLog(
+        policy_id=version.policy_id,
+        version_id=version.pk,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        created_at=timezone.now(),
+    )
+    if settings.YSEAL_DOWNLOAD_BUFFER_SIZE <= 1:
+        row.save()
+        return
+    get_buffer().add(row)
+
+
+def flush_pending():
+    """Write buffered download logs and process-local counters, e.g. at shutdown."""
+    try:
+        if _buffer is not None:
+            _buffer.flush()
+        if isinstance(get_counters(), LocalCounters):
+            flush_counts()
+    except Exception:
+        logger.exception('Failed to flush pending downloads')
+
+
+def apply_counts(counts):
+    """Add pending counts to the download_count columns in bulk."""
+    by_kind = {}
+    for (kind, pk), n in counts.items():
+        if n and kind in COUNTED_MODELS:
+            by_kind.setdefault(kind, []).append((pk, n))
+
+    with transaction.atomic():
+        for kind, increments in by_kind.items():
+            model = COUNTED_MODELS[kind]
+            # Sorted ids keep lock order consistent between concurrent flushes
+            increments.sort()
+            for start in range(0, len(increments), FLUSH_BATCH_SIZE):
+                batch = increments[start:start + FLUSH_BATCH_SIZE]
+                model.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+                    download_count=F('download_count') + Case(
+                        *[When(pk=pk, then=Value(n)) for pk, n in batch],
+                        default=Value(0),
+                        output_field=IntegerField(),
+                    )
+                )
+    return sum(n for _, n in by_kind.get('policy', []))
+
+
+def flush_counts():
+    """Move pending counters into the database; returns the policy downloads applied."""
+    counters = get_counters()
+    counts = counters.drain()
+    if not counts:
+        return 0
+    try:
+        applied = apply_counts(counts)
+    except Exception:
+        # Put the counts back so the next flush retries them
+        logger.exception('Failed to flush %d download counters', len(counts))
+        counters.add(counts)
+        raise
+    bump_generation(DOWNLOADS)
+    return applied
@@ -0,0 +1,372 @@
+"""
+Streaming import of uploaded policy packages.
+
+``SpoolUploadHandler`` writes an uploaded archive chunk by chunk into
+``YSEAL_IMPORT_SPOOL_DIR`` instead of memory, and the upload view records an
+``ImportTask`` for it and hands the task to the ``import_policy_package``
+Celery task, so a request only costs the web worker the time to receive the
+bytes.
+
+``import_package`` then reads the archive without ever holding it in memory:
+the SHA-256 and size are computed over ``YSEAL_IMPORT_CHUNK_SIZE`` reads,
+``.tar.gz`` members are read from a streaming tarfile and ``.zip`` members
+one at a time, and ``PolicyFile`` rows are written with ``bulk_create`` every
+``YSEAL_IMPORT_BATCH_SIZE`` members. Their contents go to the blob store
+(``apps.policies.blobs``) unless an identical blob is already there. The
+version, its files, its symbols and its JSON snapshot are written in one
+transaction, so clients either see the complete version or none of it.
+Progress (stage, files processed, per-file errors) is reported through
+``ImportProgress`` for ``/api/v3/imports/{id}/``.
+"""
+import hashlib
+import logging
+import os
+import posixpath
+import tarfile
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+
+from apps.search.symbols import index_files
+from .archives import archive_name, discard_archive, keep_archive, stage_archive
+from .blobs import decode_text, store_blobs
+from .models import ImportTask, Policy, PolicyFile, PolicyVersion
+from .snapshots import publish_version
+
+logger = logging.getLogger(__name__)
+
+FILE_TYPES = {
+    '.te': 'te',
+    '.fc': 'fc',
+    '.if': 'if',
+    '.pp': 'pp',
+    '.cil': 'cil',
+}
+
+# Per-file errors kept on an import task
+MAX_FILE_ERRORS = 100
+
+# Seconds cached progress outlives a worker that died mid-import
+PROGRESS_TTL = 24 * 60 * 60
+
+
+class PackageImportError(Exception):
+    """The uploaded package cannot be imported."""
+
+
+class SpooledUpload(UploadedFile):
+    """An uploaded file kept in the import spool directory after the request."""
+
+    def __init__(self, name, content_type, charset, content_type_extra=None):
+        os.makedirs(settings.YSEAL_IMPORT_SPOOL_DIR, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(suffix='.upload', dir=settings.YSEAL_IMPORT_SPOOL_DIR)
+        super().__init__(os.fdopen(fd, 'w+b'), name, content_type, 0, charset, content_type_extra)
+
+    def temporary_file_path(self):
+        return self.path
+
+
+class SpoolUploadHandler(FileUploadHandler):
+    """Stream uploaded files to the spool directory instead of memory or /tmp."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = SpooledUpload(self.file_name, self.content_type, self.charset, self.content_type_extra)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        self.file.size = file_size
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            self.file.close()
+            discard(self.file.path)
+
+
+def progress_key(task_id):
+    return f'imports:progress:{task_id}'
+
+
+def cached_progress(task_id):
+    """Live progress of a running import, or None."""
+    return cache.get(progress_key(task_id))
+
+
+class ImportProgress:
+    """
+    Progress of one running import. The import transaction would hide
+    updates to the ``ImportTask`` row until it ends, so progress is written to
+    the cache instead, at most every ``YSEAL_IMPORT_PROGRESS_INTERVAL``
+    seconds except on stage changes; ``finish`` stores the outcome on the row.
+    """
+
+    def __init__(self, task_id):
+        self.task_id = task_id
+        self.stage = ImportTask.QUEUED
+        self.files_processed = 0
+        self.files_total = None
+        self.file_errors = []
+        self.saved_at = 0.0
+
+    def as_dict(self):
+        return {
+            'state': ImportTask.RUNNING,
+            'stage': self.stage,
+            'files_processed': self.files_processed,
+            'files_total': self.files_total,
+            'file_errors': self.file_errors,
+        }
+
+    def save(self):
+        cache.set(progress_key(self.task_id), self.as_dict(), PROGRESS_TTL)
+        self.saved_at = time.monotonic()
+
+    def save_if_due(self):
+        if time.monotonic() - self.saved_at >= settings.YSEAL_IMPORT_PROGRESS_INTERVAL:
+            self.save()
+
+    def set_stage(self, stage):
+        self.stage = stage
+        self.save()
+
+    def set_total(self, total):
+        self.files_total = total
+        self.save_if_due()
+
+    def files_done(self, count):
+        self.files_processed += count
+        self.save_if_due()
+
+    def file_error(self, path, message):
+        if len(self.file_errors) < MAX_FILE_ERRORS:
+            self.file_errors.append({'file': path[:500], 'message': message})
+        self.save_if_due()
+
+    def finish(self, state, error='', policy_version_id=None):
+        """Record the outcome on the task row and drop the cached progress."""
+        ImportTask.objects.filter(pk=self.task_id).update(
+            state=state,
+            stage=ImportTask.DONE,
+            files_processed=self.files_processed,
+            files_total=self.files_total,
+            file_errors=self.file_errors,
+            error=error,
+            policy_version_id=policy_version_id,
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+        cache.delete(progress_key(self.task_id))
+
+
+def discard(path):
+    """Remove a spool file, ignoring one that is already gone."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def archive_digest(path):
+    """Return the SHA-256 and size of a file, read in chunks."""
+    digest, size = hashlib.sha256(), 0
+    with open(path, 'rb') as archive:
+        for chunk in iter(lambda: archive.read(settings.YSEAL_IMPORT_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def member_path(name):
+    """Normalize an archive member name; None for names that escape the package."""
+    path = posixpath.normpath(name.replace('\\', '/')).lstrip('/')
+    if path in ('', '.') or path == '..' or path.startswith('../'):
+        return None
+    return path[:500]
+
+
+def file_type(path):
+    """Classify a package member by its extension."""
+    return FILE_TYPES.get(posixpath.splitext(path)[1].lower(), 'other')
+
+
+def read_member(stream, path, size):
+    """
+    Read a member's bytes, returning ``(data, error)``. Members over
+    ``YSEAL_IMPORT_MAX_FILE_SIZE`` are skipped with ``data`` None; the limit
+    is applied to what is actually read as well, not only to the declared size.
+    """
+    limit = settings.YSEAL_IMPORT_MAX_FILE_SIZE
+    data = stream.read(limit + 1) if size <= limit else b''
+    if size > limit or len(data) > limit:
+        return None, f'larger than {limit} bytes; skipped'
+    kind = file_type(path)
+    if kind != 'other' and kind not in PolicyFile.BINARY_FILE_TYPES:
+        try:
+            data.decode('utf-8')
+        except UnicodeDecodeError:
+            return data, 'not valid UTF-8; content not shown'
+    return data, None
+
+
+def tar_members(path, progress):
+    """Yield ``(path, data)`` for the regular files of a .tar.gz, in archive order."""
+    with tarfile.open(path, mode='r|gz', bufsize=settings.YSEAL_IMPORT_CHUNK_SIZE) as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            name = member_path(member.name)
+            if name is None:
+                progress.file_error(member.name, 'path outside the package; skipped')
+                continue
+            data, error = read_member(archive.extractfile(member), name, member.size)
+            if error:
+                progress.file_error(name, error)
+            if data is not None:
+                yield name, data
+
+
+def zip_members(path, progress):
+    """Yield ``(path, data)`` for the regular files of a .zip, one member at a time."""
+    with zipfile.ZipFile(path) as archive:
+        members = [member for member in archive.infolist() if not member.is_dir()]
+        progress.set_total(len(members))
+        for member in members:
+            name = member_path(member.filename)
+            if name is None:
+                progress.file_error(member.filename, 'path outside the package; skipped')
+                continue
+            with archive.open(member) as stream:
+                data, error = read_member(stream, name, member.file_size)
+            if error:
+                progress.file_error(name, error)
+            if data is not None:
+                yield name, data
+
+
+def package_members(path, filename, progress):
+    """Iterate over the members of a package archive chosen by its file name."""
+    if filename.endswith('.zip'):
+        return zip_members(path, progress)
+    return tar_members(path, progress)
+
+
+def import_package(path, filename, contributor, name, version, progress):
+    """
+    Import the archive at ``path`` as ``version`` of ``contributor/name``
+    and publish it as the latest version. Returns the new version's pk.
+    """
+    try:
+        policy = Policy.objects.get(contributor__name=contributor, name=name)
+    except Policy.DoesNotExist:
+        raise PackageImportError(f"Policy '{contributor}/{name}' does not exist")
+    progress.set_stage(ImportTask.HASHING)
+    checksum, archive_size = archive_digest(path)
+    # Identical uploads share the stored file. It is copied into the store
+    # now but only moved into place once the version commits, so a failed
+    # import leaves nothing behind
+    archive_path = archive_name(checksum, filename)
+    staged = stage_archive(path, archive_path)
+
+    try:
+        with transaction.atomic():
+            if PolicyVersion.objects.filter(policy=policy, version=version).exists():
+                raise PackageImportError(f"Version '{version}' of '{contributor}/{name}' already exists")
+            policy_version = PolicyVersion.objects.create(
+                policy=policy,
+                version=version,
+                git_commit='',
+                checksum=checksum,
+                archive_size=archive_size,
+                archive_path=archive_path,
+                is_latest=True,
+            )
+            progress.set_stage(ImportTask.UNPACKING)
+            # Batches are also cut by size, so at most about two members'
+            # worth of bytes over the file size limit is held at once
+            batch, batch_bytes = [], 0
+            for file_path, data in package_members(path, filename, progress):
+                batch.append((file_path, data))
+                batch_bytes += len(data)
+                if len(batch) >= settings.YSEAL_IMPORT_BATCH_SIZE or batch_bytes >= settings.YSEAL_IMPORT_MAX_FILE_SIZE:
+                    write_files(policy_version, batch)
+                    progress.files_done(len(batch))
+                    batch, batch_bytes = [], 0
+            write_files(policy_version, batch)
+            progress.files_done(len(batch))
+            progress.set_stage(ImportTask.PUBLISHING)
+            publish_version(policy_version.pk)
+            transaction.on_commit(lambda: keep_archive(staged, archive_path))
+    except (tarfile.TarError, zipfile.BadZipFile, EOFError, OSError) as exc:
+        discard_archive(staged)
+        raise PackageImportError(f'Cannot read package archive: {exc}') from exc
+    except BaseException:
+        discard_archive(staged)
+        raise
+
+    logger.info('Imported %s/%s %s (%d bytes, sha256 %s)', contributor, name, version, archive_size, checksum)
+    return policy_version.pk
+
+
+def write_files(policy_version, members):
+    """
+    Store the contents of a batch of ``(path, data)`` members in the blob
+    store, insert their policy files and index their symbols (bulk_create
+    sends no signals).
+    """
+    if not members:
+        return
+    files, contents = [], {}
+    for file_path, data in members:
+        digest = hashlib.sha256(data).hexdigest()
+        contents[digest] = data
+        policy_file = PolicyFile(
+            version=policy_version,
+            file_path=file_path,
+            file_type=file_type(file_path),
+            blob_id=digest,
+            size=len(data),
+        )
+        # Spares symbol indexing a read back from the blob store
+        policy_file.content = '' if policy_file.file_type in PolicyFile.BINARY_FILE_TYPES else decode_text(data)
+        files.append(policy_file)
+    store_blobs(contents)
+    PolicyFile.objects.bulk_create(files)
+    index_files(files)
+
+
+def run_import(task_id):
+    """
+    Run the import of an ``ImportTask`` and record its outcome. The spool
+    file is removed whatever happens.
+    """
+    task = ImportTask.objects.get(pk=task_id)
+    if task.state != ImportTask.PENDING:
+        # Redelivered after the import already ran
+        return task.policy_version_id
+    ImportTask.objects.filter(pk=task_id).update(state=ImportTask.RUNNING, started_at=timezone.now())
+    progress = ImportProgress(task_id)
+    try:
+        version_id = import_package(task.spool_path, task.filename, task.contributor, task.name, task.version, progress)
+    except PackageImportError as exc:
+        logger.warning('Import of %s failed: %s', task, exc)
+        progress.finish(ImportTask.FAILED, error=str(exc))
+        return None
+    except Exception:
+        progress.finish(ImportTask.FAILED, error='Internal error while importing the package')
+        raise
+    finally:
+        discard(task.spool_path)
+    progress.finish(ImportTask.COMPLETED, policy_version_id=version_id)
+    return version_id
@@ -0,0 +1,13 @@
+"""
+Management command to delete policy file blobs that are no longer used.
+"""
+from django.core.management.base import BaseCommand
+from apps.policies.blobs import prune_blobs
+
+
+class Command(BaseCommand):
+    help = 'Delete blobs no policy file references and blob files without a row; run it while no imports are in flight'
+
+    def handle(self, *args, **options):
+        removed = prune_blobs()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} unused blobs'))
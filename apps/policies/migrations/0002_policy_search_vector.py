@@ -0,0 +1,51 @@
+# Generated by Django 4.2.30 on 2026-10-16 22:56
+
+import os
+
+from django.db import migrations
+
+USE_POSTGRES = os.getenv("USE_POSTGRES", "False") == "True"
+
+
+def populate_search_vectors(apps, schema_editor):
+    from apps.search.fulltext import update_search_vectors
+
+    Policy = apps.get_model("policies", "Policy")
+    update_search_vectors(Policy.objects.values_list("pk", flat=True), model=Policy)
+
+
+operations = [
+    migrations.RenameIndex(
+        model_name="policy",
+        new_name="policies_contrib_779f7b_idx",
+        old_name="policies_contrib_49a22b_idx",
+    ),
+]
+
+# The search vector and its GIN index only exist on PostgreSQL deployments,
+# mirroring the conditional field on the Policy model.
+if USE_POSTGRES:
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVectorField
+
+    operations += [
+        migrations.AddField(
+            model_name="policy",
+            name="search_vector",
+            field=SearchVectorField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="policy",
+            index=GinIndex(fields=["search_vector"], name="policies_search_vector_gin"),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("policies", "0001_initial"),
+    ]
+
+    operations = operations
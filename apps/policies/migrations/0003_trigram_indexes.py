@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:00
+
+import os
+
+from django.db import migrations
+
+USE_POSTGRES = os.getenv("USE_POSTGRES", "False") == "True"
+
+operations = []
+
+# Typo-tolerant matching uses pg_trgm GIN indexes on PostgreSQL; SQLite
+# deployments use the precomputed postings in apps.search instead.
+if USE_POSTGRES:
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.operations import TrigramExtension
+
+    operations += [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="policy",
+            index=GinIndex(fields=["name"], name="policies_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="policy",
+            index=GinIndex(
+                fields=["display_name"], name="policies_display_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=GinIndex(fields=["name"], name="tags_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("policies", "0002_policy_search_vector"),
+    ]
+
+    operations = operations
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0003_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['updated_at', 'id'], name='policies_updated_7de0a3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['download_count', 'id'], name='policies_downloa_ae8640_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['name', 'id'], name='policies_name_f54f10_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_latest_versions(apps, schema_editor):
+    Policy = apps.get_model("policies", "Policy")
+    PolicyVersion = apps.get_model("policies", "PolicyVersion")
+    latest = PolicyVersion.objects.filter(policy_id=models.OuterRef("pk")).order_by(
+        "-is_latest", "-created_at", "-id"
+    ).values("pk")[:1]
+    Policy.objects.update(latest_version_id=models.Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0004_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='latest_version',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='policies.policyversion'),
+        ),
+        migrations.RunPython(populate_latest_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0005_policy_latest_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='name')),
+                ('position', models.BigIntegerField(default=0, verbose_name='position')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'rollup watermark',
+                'verbose_name_plural': 'rollup watermarks',
+                'db_table': 'rollup_watermarks',
+            },
+        ),
+        migrations.CreateModel(
+            name='DownloadRollupHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='hour')),
+                ('count', models.IntegerField(default=0, verbose_name='downloads')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='policies.policy')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='policies.policyversion')),
+            ],
+            options={
+                'verbose_name': 'hourly download rollup',
+                'verbose_name_plural': 'hourly download rollups',
+                'db_table': 'download_rollups_hourly',
+                'indexes': [models.Index(fields=['policy', 'bucket'], name='download_ro_policy__5c2a6d_idx'), models.Index(fields=['bucket'], name='download_ro_bucket_e0227e_idx')],
+                'unique_together': {('version', 'bucket')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DownloadRollupDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateField(verbose_name='day')),
+                ('count', models.IntegerField(default=0, verbose_name='downloads')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='policies.policy')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='policies.policyversion')),
+            ],
+            options={
+                'verbose_name': 'daily download rollup',
+                'verbose_name_plural': 'daily download rollups',
+                'db_table': 'download_rollups_daily',
+                'indexes': [models.Index(fields=['policy', 'bucket'], name='download_ro_policy__c2a66a_idx'), models.Index(fields=['bucket'], name='download_ro_bucket_7078ae_idx')],
+                'unique_together': {('version', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0006_download_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='downloadlog',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_rating_summaries(apps, schema_editor):
+    Policy = apps.get_model("policies", "Policy")
+    Rating = apps.get_model("voting", "Rating")
+    weight = settings.YSEAL_RATING_PRIOR_WEIGHT
+    prior = settings.YSEAL_RATING_PRIOR_MEAN * weight
+    summaries = Rating.objects.order_by().values("policy_id").annotate(
+        rating_count=models.Count("id"),
+        rating_sum=models.Sum("score"),
+        **{f"rating_{score}_count": models.Count("id", filter=models.Q(score=score)) for score in range(1, 6)},
+    )
+    for summary in summaries:
+        policy_id = summary.pop("policy_id")
+        summary["bayesian_rating"] = (prior + summary["rating_sum"]) / (weight + summary["rating_count"])
+        Policy.objects.filter(pk=policy_id).update(**summary)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0007_downloadlog_created_at'),
+        ('voting', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='bayesian_rating',
+            field=models.FloatField(default=0, help_text='Average rating shrunk towards YSEAL_RATING_PRIOR_MEAN; 0 when unrated', verbose_name='Bayesian average rating'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_1_count',
+            field=models.IntegerField(default=0, verbose_name='1 star ratings'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_2_count',
+            field=models.IntegerField(default=0, verbose_name='2 star ratings'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_3_count',
+            field=models.IntegerField(default=0, verbose_name='3 star ratings'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_4_count',
+            field=models.IntegerField(default=0, verbose_name='4 star ratings'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_5_count',
+            field=models.IntegerField(default=0, verbose_name='5 star ratings'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_count',
+            field=models.IntegerField(default=0, verbose_name='rating count'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='rating_sum',
+            field=models.IntegerField(default=0, verbose_name='rating sum'),
+        ),
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['bayesian_rating', 'id'], name='policies_bayesia_547502_idx'),
+        ),
+        migrations.RunPython(populate_rating_summaries, migrations.RunPython.noop),
+    ]
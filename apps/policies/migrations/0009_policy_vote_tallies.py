@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:17
+
+import math
+
+from django.db import migrations, models
+
+WILSON_Z = 1.96
+
+
+def populate_vote_tallies(apps, schema_editor):
+    Policy = apps.get_model("policies", "Policy")
+    Vote = apps.get_model("voting", "Vote")
+    z2 = WILSON_Z * WILSON_Z
+    tallies = Vote.objects.order_by().values("policy_id").annotate(
+        star_count=models.Count("id", filter=models.Q(value__gt=0)),
+        downvote_count=models.Count("id", filter=models.Q(value__lt=0)),
+    )
+    for tally in tallies:
+        up, down = tally["star_count"], tally["downvote_count"]
+        total = up + down
+        spread = WILSON_Z * math.sqrt(up * down / total + z2 / 4)
+        Policy.objects.filter(pk=tally["policy_id"]).update(
+            star_count=up,
+            downvote_count=down,
+            wilson_score=(up + z2 / 2 - spread) / (total + z2),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0008_policy_rating_summary'),
+        ('voting', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policy',
+            name='downvote_count',
+            field=models.IntegerField(default=0, verbose_name='downvote count'),
+        ),
+        migrations.AddField(
+            model_name='policy',
+            name='wilson_score',
+            field=models.FloatField(default=0, help_text='Lower bound of the 95% Wilson interval for the upvote share; 0 without votes', verbose_name='Wilson score'),
+        ),
+        migrations.AlterField(
+            model_name='policy',
+            name='star_count',
+            field=models.IntegerField(default=0, help_text='Number of upvotes', verbose_name='star count'),
+        ),
+        migrations.AddIndex(
+            model_name='policy',
+            index=models.Index(fields=['wilson_score', 'id'], name='policies_wilson__38059a_idx'),
+        ),
+        migrations.RunPython(populate_vote_tallies, migrations.RunPython.noop),
+    ]
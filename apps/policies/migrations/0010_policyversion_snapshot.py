@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0009_policy_vote_tallies'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policyversion',
+            name='published_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='published at'),
+        ),
+        migrations.AddField(
+            model_name='policyversion',
+            name='snapshot',
+            field=models.TextField(blank=True, editable=False, verbose_name='JSON snapshot'),
+        ),
+        migrations.AddField(
+            model_name='policyversion',
+            name='snapshot_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='snapshot SHA256'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('policies', '0010_policyversion_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contributor', models.CharField(max_length=100, verbose_name='contributor')),
+                ('name', models.CharField(max_length=100, verbose_name='policy name')),
+                ('version', models.CharField(max_length=50, verbose_name='version')),
+                ('filename', models.CharField(max_length=255, verbose_name='file name')),
+                ('archive_size', models.BigIntegerField(default=0, verbose_name='archive size (bytes)')),
+                ('spool_path', models.CharField(editable=False, max_length=500, verbose_name='spool path')),
+                ('state', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20, verbose_name='state')),
+                ('stage', models.CharField(choices=[('queued', 'Queued'), ('hashing', 'Hashing archive'), ('unpacking', 'Unpacking files'), ('publishing', 'Publishing version'), ('done', 'Done')], default='queued', max_length=20, verbose_name='stage')),
+                ('files_processed', models.IntegerField(default=0, verbose_name='files processed')),
+                ('files_total', models.IntegerField(blank=True, help_text='Unknown for .tar.gz archives until they are fully read', null=True, verbose_name='files total')),
+                ('file_errors', models.JSONField(blank=True, default=list, verbose_name='file errors')),
+                ('error', models.TextField(blank=True, verbose_name='error')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='started at')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='finished at')),
+                ('policy_version', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='policies.policyversion')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'import task',
+                'verbose_name_plural': 'import tasks',
+                'db_table': 'import_tasks',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='import_task_user_id_2caa99_idx'), models.Index(fields=['state'], name='import_task_state_28df92_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:30
+
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_contents_to_blobs(apps, schema_editor):
+    PolicyBlob = apps.get_model("policies", "PolicyBlob")
+    PolicyFile = apps.get_model("policies", "PolicyFile")
+    # Files whose text was not kept (binary or oversized) have no blob
+    files = PolicyFile.objects.exclude(content="", size__gt=0).only("pk", "content").order_by("pk")
+    for policy_file in files.iterator(chunk_size=500):
+        data = policy_file.content.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        PolicyBlob.objects.get_or_create(
+            digest=digest,
+            defaults={"size": len(data), "stored_size": len(data), "data": data},
+        )
+        PolicyFile.objects.filter(pk=policy_file.pk).update(blob_id=digest, size=len(data))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0011_import_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False, verbose_name='SHA256')),
+                ('size', models.BigIntegerField(verbose_name='size (bytes)')),
+                ('stored_size', models.BigIntegerField(verbose_name='stored size (bytes)')),
+                ('storage', models.CharField(choices=[('database', 'Database'), ('filesystem', 'Filesystem')], default='database', max_length=20, verbose_name='storage')),
+                ('encoding', models.CharField(choices=[('identity', 'Uncompressed'), ('zstd', 'Zstandard')], default='identity', max_length=20, verbose_name='encoding')),
+                ('data', models.BinaryField(blank=True, default=b'', verbose_name='data')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'policy blob',
+                'verbose_name_plural': 'policy blobs',
+                'db_table': 'policy_blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='policyfile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='files', to='policies.policyblob'),
+        ),
+        migrations.RunPython(move_contents_to_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:30
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Separate from 0012 so PostgreSQL does not alter policy_files while the
+    # backfill's foreign key checks are still pending
+    dependencies = [
+        ('policies', '0012_policy_blobs'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='policyfile',
+            name='content',
+        ),
+    ]
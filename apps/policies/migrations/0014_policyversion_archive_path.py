@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0013_remove_policyfile_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='policyversion',
+            name='archive_path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='archive path'),
+        ),
+    ]
@@ -2,7 +2,10 @@
 SELinux Policy models for ySEal.
 """
 import os
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 from apps.core.models import TimeStampedModel
 from apps.contributors.models import Contributor
@@ -20,6 +23,8 @@ else:
     SearchVectorField = None
     GinIndex = None
 
+User = get_user_model()
+
 
 class Tag(TimeStampedModel):
     """
@@ -32,6 +37,9 @@ class Tag(TimeStampedModel):
         verbose_name = _('tag')
         verbose_name_plural = _('tags')
         ordering = ['name']
+        indexes = []
+        if USE_POSTGRES and GinIndex:
+            indexes.append(GinIndex(fields=['name'], name='tags_name_trgm', opclasses=['gin_trgm_ops']))
 
     def __str__(self):
         return self.name
@@ -66,9 +74,40 @@ class Policy(TimeStampedModel):
     tags = models.ManyToManyField(Tag, related_name='policies', blank=True)
     license = models.CharField(_('license'), max_length=100, blank=True)
     
+    # Denormalized pointer to the current version, maintained by PolicyVersion
+    latest_version = models.ForeignKey(
+        'PolicyVersion',
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    
     # Statistics
     download_count = models.IntegerField(_('download count'), default=0)
-    star_count = models.IntegerField(_('star count'), default=0)
+    # Vote tallies, maintained from Vote changes by apps.voting.tallies
+    star_count = models.IntegerField(_('star count'), default=0, help_text=_('Number of upvotes'))
+    downvote_count = models.IntegerField(_('downvote count'), default=0)
+    wilson_score = models.FloatField(
+        _('Wilson score'),
+        default=0,
+        help_text=_('Lower bound of the 95% Wilson interval for the upvote share; 0 without votes')
+    )
+    
+    # Rating summary, maintained from Rating changes by apps.voting.tallies
+    rating_count = models.IntegerField(_('rating count'), default=0)
+    rating_sum = models.IntegerField(_('rating sum'), default=0)
+    rating_1_count = models.IntegerField(_('1 star ratings'), default=0)
+    rating_2_count = models.IntegerField(_('2 star ratings'), default=0)
+    rating_3_count = models.IntegerField(_('3 star ratings'), default=0)
+    rating_4_count = models.IntegerField(_('4 star ratings'), default=0)
+    rating_5_count = models.IntegerField(_('5 star ratings'), default=0)
+    bayesian_rating = models.FloatField(
+        _('Bayesian average rating'),
+        default=0,
+        help_text=_('Average rating shrunk towards YSEAL_RATING_PRIOR_MEAN; 0 when unrated')
+    )
     
     # Status
     is_deprecated = models.BooleanField(_('deprecated'), default=False)
@@ -89,9 +128,20 @@ class Policy(TimeStampedModel):
         indexes = [
             models.Index(fields=['contributor', 'name']),
             models.Index(fields=['is_deprecated', 'is_active']),
+            # Keyset pagination sort keys
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['download_count', 'id']),
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['bayesian_rating', 'id']),
+            models.Index(fields=['wilson_score', 'id']),
         ]
         if USE_POSTGRES and GinIndex and SearchVectorField:
-            indexes.insert(0, GinIndex(fields=['search_vector']))
+            indexes.insert(0, GinIndex(fields=['search_vector'], name='policies_search_vector_gin'))
+        if USE_POSTGRES and GinIndex:
+            indexes += [
+                GinIndex(fields=['name'], name='policies_name_trgm', opclasses=['gin_trgm_ops']),
+                GinIndex(fields=['display_name'], name='policies_display_name_trgm', opclasses=['gin_trgm_ops']),
+            ]
 
     def __str__(self):
         return f"{self.contributor.name}.{self.name}"
@@ -101,6 +151,18 @@ class Policy(TimeStampedModel):
         """Returns the full policy name (contributor.name)."""
         return f"{self.contributor.name}.{self.name}"
 
+    @property
+    def average_rating(self):
+        """Mean rating score, or None when the policy has no ratings."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
+    @property
+    def rating_histogram(self):
+        """Number of ratings per score, keyed '1' to '5'."""
+        return {str(score): getattr(self, f'rating_{score}_count') for score in range(1, 6)}
+
 
 class PolicyVersion(TimeStampedModel):
     """
@@ -129,6 +191,8 @@ class PolicyVersion(TimeStampedModel):
     archive_url = models.URLField(_('archive URL'), blank=True)
     archive_size = models.IntegerField(_('archive size (bytes)'), default=0)
     checksum = models.CharField(_('SHA256 checksum'), max_length=64, blank=True)
+    # Uploaded package kept by apps.policies.archives, relative to YSEAL_ARCHIVE_ROOT
+    archive_path = models.CharField(_('archive path'), max_length=255, blank=True, editable=False)
     
     # Dependencies
     dependencies = models.JSONField(_('dependencies'), default=list, blank=True)
@@ -157,6 +221,11 @@ class PolicyVersion(TimeStampedModel):
     is_latest = models.BooleanField(_('is latest'), default=False)
     download_count = models.IntegerField(_('download count'), default=0)
     
+    # Pre-rendered detail JSON, written once by apps.policies.snapshots.publish_version
+    snapshot = models.TextField(_('JSON snapshot'), blank=True, editable=False)
+    snapshot_hash = models.CharField(_('snapshot SHA256'), max_length=64, blank=True, editable=False)
+    published_at = models.DateTimeField(_('published at'), null=True, blank=True, editable=False)
+    
     class Meta:
         db_table = 'policy_versions'
         verbose_name = _('policy version')
@@ -172,20 +241,82 @@ class PolicyVersion(TimeStampedModel):
         return f"{self.policy.full_name} v{self.version}"
 
     def save(self, *args, **kwargs):
-        """Override save to update is_latest flag."""
-        if self.is_latest:
-            # Set all other versions of this policy to not latest
-            PolicyVersion.objects.filter(
-                policy=self.policy,
-                is_latest=True
-            ).exclude(id=self.id).update(is_latest=False)
-        super().save(*args, **kwargs)
+        """Override save to update is_latest flag and the policy's latest version."""
+        with transaction.atomic():
+            if self.is_latest:
+                # Set all other versions of this policy to not latest
+                PolicyVersion.objects.filter(
+                    policy=self.policy,
+                    is_latest=True
+                ).exclude(id=self.id).update(is_latest=False)
+            super().save(*args, **kwargs)
+            self.refresh_latest_version(self.policy_id)
+
+    def delete(self, *args, **kwargs):
+        """Point the policy at its next latest version."""
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self.refresh_latest_version(self.policy_id)
+        return result
+
+    @staticmethod
+    def refresh_latest_version(policy_id):
+        """
+        Set Policy.latest_version to the version flagged is_latest, or the
+        newest version when none is flagged.
+        """
+        latest = PolicyVersion.objects.filter(policy_id=policy_id).order_by(
+            '-is_latest', '-created_at', '-id'
+        ).values('pk')[:1]
+        Policy.objects.filter(pk=policy_id).update(
+            latest_version_id=models.Subquery(latest),
+            updated_at=timezone.now()
+        )
+
+
+class PolicyBlob(models.Model):
+    """
+    File contents stored once per SHA-256 and shared by every PolicyFile
+    with the same bytes. See apps.policies.blobs.
+    """
+    DATABASE = 'database'
+    FILESYSTEM = 'filesystem'
+    STORAGE_CHOICES = [
+        (DATABASE, 'Database'),
+        (FILESYSTEM, 'Filesystem'),
+    ]
+    IDENTITY = 'identity'
+    ZSTD = 'zstd'
+    ENCODING_CHOICES = [
+        (IDENTITY, 'Uncompressed'),
+        (ZSTD, 'Zstandard'),
+    ]
+
+    digest = models.CharField(_('SHA256'), max_length=64, primary_key=True)
+    size = models.BigIntegerField(_('size (bytes)'))
+    stored_size = models.BigIntegerField(_('stored size (bytes)'))
+    storage = models.CharField(_('storage'), max_length=20, choices=STORAGE_CHOICES, default=DATABASE)
+    encoding = models.CharField(_('encoding'), max_length=20, choices=ENCODING_CHOICES, default=IDENTITY)
+    # The stored bytes for database blobs; empty for filesystem blobs
+    data = models.BinaryField(_('data'), blank=True, default=b'')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'policy_blobs'
+        verbose_name = _('policy blob')
+        verbose_name_plural = _('policy blobs')
+
+    def __str__(self):
+        return self.digest
 
 
 class PolicyFile(TimeStampedModel):
     """
     Individual files within a policy version.
     """
+    # Compiled modules have no text to show
+    BINARY_FILE_TYPES = ('pp',)
+    
     version = models.ForeignKey(
         PolicyVersion,
         on_delete=models.CASCADE,
@@ -205,7 +336,14 @@ class PolicyFile(TimeStampedModel):
         ],
         default='other'
     )
-    content = models.TextField(_('content'), blank=True)
+    # Null for files imported before contents were kept in full
+    blob = models.ForeignKey(
+        PolicyBlob,
+        on_delete=models.PROTECT,
+        related_name='files',
+        null=True,
+        blank=True
+    )
     size = models.IntegerField(_('size (bytes)'), default=0)
     
     class Meta:
@@ -217,6 +355,17 @@ class PolicyFile(TimeStampedModel):
     def __str__(self):
         return f"{self.version} - {self.file_path}"
 
+    @cached_property
+    def content(self):
+        """
+        The file's text, or '' for compiled modules, files over
+        YSEAL_FILE_CONTENT_MAX_SIZE and files that are not UTF-8.
+        """
+        from .blobs import read_text
+        if self.blob_id is None or self.file_type in self.BINARY_FILE_TYPES:
+            return ''
+        return read_text(self.blob)
+
 
 class DownloadLog(TimeStampedModel):
     """
@@ -227,6 +376,9 @@ class DownloadLog(TimeStampedModel):
     ip_address = models.GenericIPAddressField(_('IP address'))
     user_agent = models.TextField(_('user agent'), blank=True)
     
+    # Set when the download happens rather than when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
     class Meta:
         db_table = 'download_logs'
         verbose_name = _('download log')
@@ -238,3 +390,150 @@ class DownloadLog(TimeStampedModel):
 
     def __str__(self):
         return f"{self.policy.full_name} v{self.version.version} - {self.created_at}"
+
+
+class DownloadRollupHourly(models.Model):
+    """
+    Downloads per policy version and hour, rolled up from DownloadLog.
+    """
+    policy = models.ForeignKey(Policy, on_delete=models.CASCADE, related_name='+')
+    version = models.ForeignKey(PolicyVersion, on_delete=models.CASCADE, related_name='+')
+    bucket = models.DateTimeField(_('hour'))
+    count = models.IntegerField(_('downloads'), default=0)
+
+    class Meta:
+        db_table = 'download_rollups_hourly'
+        verbose_name = _('hourly download rollup')
+        verbose_name_plural = _('hourly download rollups')
+        unique_together = [['version', 'bucket']]
+        indexes = [
+            models.Index(fields=['policy', 'bucket']),
+            models.Index(fields=['bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.version_id} @ {self.bucket:%Y-%m-%d %H:00} - {self.count}"
+
+
+class DownloadRollupDaily(models.Model):
+    """
+    Downloads per policy version and day, rolled up from DownloadLog.
+    """
+    policy = models.ForeignKey(Policy, on_delete=models.CASCADE, related_name='+')
+    version = models.ForeignKey(PolicyVersion, on_delete=models.CASCADE, related_name='+')
+    bucket = models.DateField(_('day'))
+    count = models.IntegerField(_('downloads'), default=0)
+
+    class Meta:
+        db_table = 'download_rollups_daily'
+        verbose_name = _('daily download rollup')
+        verbose_name_plural = _('daily download rollups')
+        unique_together = [['version', 'bucket']]
+        indexes = [
+            models.Index(fields=['policy', 'bucket']),
+            models.Index(fields=['bucket']),
+        ]
+
+    def __str__(self):
+        return f"{self.version_id} @ {self.bucket} - {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """
+    High-water mark of the source rows a rollup job has consumed.
+    """
+    name = models.CharField(_('name'), max_length=50, unique=True)
+    position = models.BigIntegerField(_('position'), default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'rollup_watermarks'
+        verbose_name = _('rollup watermark')
+        verbose_name_plural = _('rollup watermarks')
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
+
+
+class ImportTask(TimeStampedModel):
+    """
+    An uploaded policy package and the progress of its import.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    STATE_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+    FINISHED_STATES = (COMPLETED, FAILED)
+
+    QUEUED = 'queued'
+    HASHING = 'hashing'
+    UNPACKING = 'unpacking'
+    PUBLISHING = 'publishing'
+    DONE = 'done'
+    STAGE_CHOICES = [
+        (QUEUED, 'Queued'),
+        (HASHING, 'Hashing archive'),
+        (UNPACKING, 'Unpacking files'),
+        (PUBLISHING, 'Publishing version'),
+        (DONE, 'Done'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='import_tasks',
+        null=True
+    )
+    contributor = models.CharField(_('contributor'), max_length=100)
+    name = models.CharField(_('policy name'), max_length=100)
+    version = models.CharField(_('version'), max_length=50)
+    filename = models.CharField(_('file name'), max_length=255)
+    archive_size = models.BigIntegerField(_('archive size (bytes)'), default=0)
+    # Where the upload waits for the import task; removed once it has run
+    spool_path = models.CharField(_('spool path'), max_length=500, editable=False)
+    
+    state = models.CharField(_('state'), max_length=20, choices=STATE_CHOICES, default=PENDING)
+    stage = models.CharField(_('stage'), max_length=20, choices=STAGE_CHOICES, default=QUEUED)
+    files_processed = models.IntegerField(_('files processed'), default=0)
+    files_total = models.IntegerField(
+        _('files total'),
+        null=True,
+        blank=True,
+        help_text=_('Unknown for .tar.gz archives until they are fully read')
+    )
+    # [{"file": ..., "message": ...}] for members that could not be imported as-is
+    file_errors = models.JSONField(_('file errors'), default=list, blank=True)
+    error = models.TextField(_('error'), blank=True)
+    
+    policy_version = models.ForeignKey(
+        PolicyVersion,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        null=True,
+        blank=True
+    )
+    started_at = models.DateTimeField(_('started at'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('finished at'), null=True, blank=True)
+    
+    class Meta:
+        db_table = 'import_tasks'
+        verbose_name = _('import task')
+        verbose_name_plural = _('import tasks')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['state']),
+        ]
+
+    def __str__(self):
+        return f"{self.contributor}/{self.name} v{self.version} ({self.state})"
+
+    @property
+    def is_finished(self):
+        return self.state in self.FINISHED_STATES
@@ -0,0 +1,215 @@
+"""
+Pagination classes for the policies API.
+
+``StandardResultsSetPagination`` keeps the galaxy_ng style page numbers for
+the browse UI. Passing ``?cursor=`` (an empty value starts at the beginning)
+switches a request to keyset pagination: the cursor carries the sort key of
+the last row returned, so the next page is a range scan on an index instead
+of an ``OFFSET`` and deep pages cost the same as the first one. Keyset pages
+skip the ``COUNT(*)`` unless ``?count=true`` is passed.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _is_true(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _encode_value(value):
+    # DjangoJSONEncoder keeps only milliseconds, which would skip or repeat rows
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the queryset's own ordering plus ``pk``.
+    Orderings must be plain field or annotation names, e.g. ``-updated_at``.
+    """
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.count = queryset.count() if _is_true(request.query_params.get(self.count_query_param)) else None
+
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, reverse))
+        ordering = [self._flip(key) for key in self.ordering] if reverse else self.ordering
+        rows = list(queryset.order_by(*ordering)[:self.page_size + 1])
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """The queryset ordering with the primary key appended as a tie-breaker."""
+        ordering = [key for key in queryset.query.order_by if isinstance(key, str)]
+        if not ordering:
+            ordering = list(queryset.model._meta.ordering)
+        if not {'pk', '-pk', 'id', '-id'}.intersection(ordering):
+            descending = ordering[0].startswith('-') if ordering else False
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+
+    @staticmethod
+    def _flip(key):
+        return key[1:] if key.startswith('-') else f'-{key}'
+
+    def _after(self, position, reverse):
+        """
+        Rows strictly after ``position`` in the ordering:
+        ``a > x OR (a = x AND b > y) OR ...`` with each comparison following
+        the direction of its key.
+        """
+        condition = Q()
+        equal = Q()
+        for key, value in zip(self.ordering, position):
+            field = key.lstrip('-')
+            descending = key.startswith('-') != reverse
+            condition |= equal & Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{field: value})
+        return condition
+
+    def _position(self, obj):
+        values = []
+        for key in self.ordering:
+            value = obj
+            for attr in key.lstrip('-').split('__'):
+                value = value.pk if attr == 'pk' else getattr(value, attr)
+            values.append(value)
+        return values
+
+    def encode_cursor(self, position, reverse=False):
+        position = [_encode_value(value) for value in position]
+        payload = json.dumps({'p': position, 'r': reverse}, cls=DjangoJSONEncoder, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            position, reverse = payload['p'], bool(payload['r'])
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError(position)
+            position = [_decode_value(value) for value in position]
+        except (TypeError, KeyError, ValueError, UnicodeEncodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self._position(self.last))
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first is None:
+            return None
+        return self.encode_cursor(self._position(self.first), reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque keyset cursor; pass an empty value to start.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Include the total result count.',
+                'schema': {'type': 'boolean'},
+            },
+        ]
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    """Standard pagination similar to galaxy_ng, with opt-in keyset cursors"""
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size
+            self.keyset.max_page_size = self.max_page_size
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return (
+            super().get_schema_operation_parameters(view) +
+            self.keyset_class().get_schema_operation_parameters(view)
+        )
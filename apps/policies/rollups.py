@@ -0,0 +1,131 @@
+"""
+Download rollups.
+
+``DownloadLog`` keeps one row per download. A background job folds new rows
+into hourly and daily per-version counts, remembering how far it got in a
+``RollupWatermark``. Raw rows that have been rolled up and are older than
+the retention window are then deleted, as are hourly buckets past their own
+retention, so the raw table stays bounded and aggregate reads only touch
+the small rollup tables.
+
+Buckets are UTC hours and days.
+"""
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import DownloadLog, DownloadRollupDaily, DownloadRollupHourly, RollupWatermark
+
+WATERMARK = 'downloads'
+
+TOTAL_CACHE_KEY = 'downloads:total'
+TOTAL_CACHE_TTL = 300
+
+
+def _add_counts(model, deltas):
+    """Add ``{(policy_id, version_id, bucket): n}`` to a rollup table."""
+    if not deltas:
+        return
+    existing = {
+        (row.version_id, row.bucket): row
+        for row in model.objects.filter(
+            version_id__in={version_id for _, version_id, _ in deltas},
+            bucket__in={bucket for _, _, bucket in deltas},
+        )
+    }
+    changed, created = [], []
+    for (policy_id, version_id, bucket), n in deltas.items():
+        row = existing.get((version_id, bucket))
+        if row is None:
+            created.append(model(policy_id=policy_id, version_id=version_id, bucket=bucket, count=n))
+        else:
+            row.count += n
+            changed.append(row)
+    model.objects.bulk_update(changed, ['count'], batch_size=1000)
+    model.objects.bulk_create(created, batch_size=1000)
+
+
+def roll_up_batch(batch_size=None):
+    """
+    Fold the next batch of settled DownloadLog rows into the rollups.
+    Rows younger than ``YSEAL_DOWNLOAD_ROLLUP_LAG`` seconds are left for the
+    next run so transactions still in flight are not skipped past.
+    Returns the number of log rows consumed.
+    """
+    batch_size = batch_size or settings.YSEAL_DOWNLOAD_ROLLUP_BATCH
+    cutoff = timezone.now() - timedelta(seconds=settings.YSEAL_DOWNLOAD_ROLLUP_LAG)
+
+    with transaction.atomic():
+        # The row lock serializes concurrent rollup jobs
+        mark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+        pending = DownloadLog.objects.filter(pk__gt=mark.position)
+        unsettled = pending.filter(created_at__gte=cutoff).order_by('pk').values_list('pk', flat=True).first()
+        if unsettled is not None:
+            pending = pending.filter(pk__lt=unsettled)
+        ids = list(pending.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return 0
+
+        rows = DownloadLog.objects.filter(pk__gt=mark.position, pk__lte=ids[-1]).annotate(
+            hour=TruncHour('created_at', tzinfo=dt_timezone.utc)
+        ).values('policy_id', 'version_id', 'hour').annotate(n=Count('id')).order_by()
+
+        hourly, daily = {}, {}
+        for row in rows:
+            hourly[(row['policy_id'], row['version_id'], row['hour'])] = row['n']
+            day = (row['policy_id'], row['version_id'], row['hour'].date())
+            daily[day] = daily.get(day, 0) + row['n']
+        _add_counts(DownloadRollupHourly, hourly)
+        _add_counts(DownloadRollupDaily, daily)
+
+        mark.position = ids[-1]
+        mark.save(update_fields=['position', 'updated_at'])
+    return len(ids)
+
+
+def roll_up_downloads(batch_size=None):
+    """Consume every settled DownloadLog row; returns the number of rows consumed."""
+    total = 0
+    while True:
+        consumed = roll_up_batch(batch_size)
+        if not consumed:
+            return total
+        total += consumed
+
+
+def compact_downloads(batch_size=None):
+    """
+    Delete rolled-up DownloadLog rows older than the retention window and
+    hourly buckets older than theirs. Returns ``(log_rows, hourly_rows)`` deleted.
+    """
+    batch_size = batch_size or settings.YSEAL_DOWNLOAD_ROLLUP_BATCH
+    now = timezone.now()
+    log_cutoff = now - timedelta(days=settings.YSEAL_DOWNLOAD_LOG_RETENTION_DAYS)
+    hourly_cutoff = now - timedelta(days=settings.YSEAL_DOWNLOAD_HOURLY_RETENTION_DAYS)
+    position = RollupWatermark.objects.filter(name=WATERMARK).values_list('position', flat=True).first() or 0
+
+    deleted_logs = 0
+    expired = DownloadLog.objects.filter(pk__lte=position, created_at__lt=log_cutoff).order_by('pk')
+    while True:
+        # Short transactions keep locks and WAL per statement small
+        ids = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        deleted_logs += DownloadLog.objects.filter(pk__in=ids).delete()[0]
+
+    deleted_hourly, _ = DownloadRollupHourly.objects.filter(bucket__lt=hourly_cutoff).delete()
+    return deleted_logs, deleted_hourly
+
+
+def total_downloads():
+    """Total recorded downloads, summed from the daily rollups."""
+    total = cache.get(TOTAL_CACHE_KEY)
+    if total is None:
+        total = DownloadRollupDaily.objects.aggregate(total=Sum('count'))['total'] or 0
+        cache.set(TOTAL_CACHE_KEY, total, TOTAL_CACHE_TTL)
+    return total
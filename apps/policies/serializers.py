@@ -1,21 +1,46 @@
 """
 Serializers for the policies app, based on Ansible Galaxy patterns.
 """
-from django.db.models import Avg
+from django.conf import settings
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Policy, PolicyVersion, PolicyFile, Tag, DownloadLog
+from .models import Policy, PolicyVersion, PolicyFile, Tag, DownloadLog, ImportTask
+from .sparse import SparseFieldsMixin
 from apps.contributors.models import Contributor
+from apps.search.models import PolicySymbol
 from apps.voting.models import Rating
 
+CONTRIBUTOR_FIELDS = [
+    'name', 'display_name', 'company', 'description', 'email', 'avatar_url',
+    'is_verified', 'is_personal', 'created_at', 'updated_at'
+]
 
-class ContributorSerializer(serializers.ModelSerializer):
-    """Serializer for Contributor model"""
+VERSION_SUMMARY_FIELDS = [
+    'id', 'version', 'git_commit', 'changelog', 'selinux_version',
+    'supported_systems', 'dependencies', 'created_at', 'updated_at'
+]
+
+# Queryset needs of the policy fields shared by the list and detail serializers
+POLICY_FIELD_QUERIES = {
+    'contributor': {'only': ['contributor__name'], 'select': ['contributor']},
+    'tags': {'prefetch': ['tags']},
+    'average_rating': {'only': ['rating_count', 'rating_sum']},
+    'rating_histogram': {'only': [f'rating_{score}_count' for score in range(1, 6)]},
+}
+
+
+class ContributorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Serializer for Contributor model; owners are included with ?expand=owners"""
     owners = serializers.StringRelatedField(many=True, read_only=True)
     
     class Meta:
         model = Contributor
         fields = ['name', 'display_name', 'company', 'description', 'email', 'avatar_url', 'is_verified', 'is_personal', 'owners', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at', 'is_verified']
+        expand_only = ['owners']
+        field_queries = {
+            'owners': {'prefetch': ['owners']},
+        }
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -25,14 +50,14 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ['name']
 
 
-class PolicyVersionListSerializer(serializers.ModelSerializer):
+class PolicyVersionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for listing policy versions"""
     class Meta:
         model = PolicyVersion
         fields = ['version', 'created_at']
 
 
-class PolicyListSerializer(serializers.ModelSerializer):
+class PolicyListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for listing policies (similar to CollectionListSerializer).
     Used in browse/search views.
@@ -41,6 +66,8 @@ class PolicyListSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     latest_version = serializers.SerializerMethodField()
     download_count = serializers.IntegerField(read_only=True, default=0)
+    average_rating = serializers.FloatField(read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     is_deprecated = serializers.BooleanField(read_only=True, default=False)
     
     class Meta:
@@ -53,15 +80,27 @@ class PolicyListSerializer(serializers.ModelSerializer):
             'latest_version',
             'tags',
             'download_count',
+            'rating_count',
+            'average_rating',
+            'rating_histogram',
+            'star_count',
+            'downvote_count',
             'is_deprecated',
             'created_at',
             'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        field_queries = {
+            **POLICY_FIELD_QUERIES,
+            'latest_version': {
+                'only': ['latest_version__version', 'latest_version__created_at'],
+                'select': ['latest_version'],
+            },
+        }
     
     def get_latest_version(self, obj):
         """Get the latest version for this policy"""
-        latest = obj.versions.order_by('-created_at').first()
+        latest = obj.latest_version
         if latest:
             return {
                 'version': latest.version,
@@ -74,13 +113,14 @@ class PolicyFileSerializer(serializers.ModelSerializer):
     """Serializer for policy files"""
     class Meta:
         model = PolicyFile
-        fields = ['name', 'content', 'created_at']
+        fields = ['file_path', 'file_type', 'size', 'content', 'created_at']
         read_only_fields = ['created_at']
 
 
 class PolicyVersionDetailSerializer(serializers.ModelSerializer):
     """
     Detailed serializer for a specific policy version.
+    Rendered once per version into PolicyVersion.snapshot.
     """
     policy = serializers.CharField(source='policy.name', read_only=True)
     contributor = serializers.CharField(source='policy.contributor.name', read_only=True)
@@ -94,26 +134,39 @@ class PolicyVersionDetailSerializer(serializers.ModelSerializer):
             'contributor',
             'version',
             'changelog',
-            'requires_reboot',
-            'selinux_contexts',
+            'git_commit',
+            'git_tag',
+            'checksum',
+            'archive_size',
+            'dependencies',
+            'selinux_version',
+            'supported_systems',
             'files',
-            'created_at',
-            'updated_at'
+            'created_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at']
+
 
+class PolicyVersionSummarySerializer(serializers.ModelSerializer):
+    """Version metadata without file contents, embedded in policy details"""
+    class Meta:
+        model = PolicyVersion
+        fields = VERSION_SUMMARY_FIELDS
 
-class PolicyDetailSerializer(serializers.ModelSerializer):
+
+class PolicyDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Detailed serializer for a policy (similar to CollectionDetailSerializer).
-    Shows all versions and metadata.
+    The contributor is rendered by name and the version list is left out
+    unless requested with ?expand=contributor,versions.
     """
-    contributor = ContributorSerializer(read_only=True)
+    contributor = serializers.CharField(source='contributor.name', read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     versions = PolicyVersionListSerializer(many=True, read_only=True)
     latest_version = serializers.SerializerMethodField()
-    download_count = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
+    download_count = serializers.IntegerField(read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
     
     class Meta:
         model = Policy
@@ -126,31 +179,39 @@ class PolicyDetailSerializer(serializers.ModelSerializer):
             'versions',
             'tags',
             'download_count',
+            'rating_count',
             'average_rating',
+            'rating_histogram',
+            'star_count',
+            'downvote_count',
             'is_deprecated',
             'created_at',
             'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+        expand_only = ['versions']
+        expandable_fields = {
+            'contributor': lambda: ContributorSerializer(read_only=True),
+        }
+        field_queries = {
+            **POLICY_FIELD_QUERIES,
+            'latest_version': {
+                'only': [f'latest_version__{name}' for name in VERSION_SUMMARY_FIELDS],
+                'select': ['latest_version'],
+            },
+            'versions': {
+                'prefetch': [Prefetch('versions', queryset=PolicyVersion.objects.only('policy_id', 'version', 'created_at'))],
+            },
+        }
+        expanded_field_queries = {
+            'contributor': {'only': [f'contributor__{name}' for name in CONTRIBUTOR_FIELDS], 'select': ['contributor']},
+        }
     
     def get_latest_version(self, obj):
-        """Get the latest version for this policy"""
-        latest = obj.versions.order_by('-created_at').first()
+        """Get the latest version for this policy; files are served by version_detail"""
+        latest = obj.latest_version
         if latest:
-            return PolicyVersionDetailSerializer(latest).data
-        return None
-    
-    def get_download_count(self, obj):
-        """Calculate total download count"""
-        return DownloadLog.objects.filter(
-            policy_version__policy=obj
-        ).count()
-    
-    def get_average_rating(self, obj):
-        """Calculate average rating"""
-        ratings = Rating.objects.filter(policy=obj)
-        if ratings.exists():
-            return ratings.aggregate(avg=Avg('score'))['avg']
+            return PolicyVersionSummarySerializer(latest).data
         return None
 
 
@@ -166,6 +227,11 @@ class SearchResultsSerializer(serializers.Serializer):
     latest_version = serializers.CharField()
     tags = serializers.ListField(child=serializers.CharField())
     download_count = serializers.IntegerField()
+    rating_count = serializers.IntegerField()
+    average_rating = serializers.FloatField(allow_null=True)
+    rating_histogram = serializers.DictField(child=serializers.IntegerField())
+    star_count = serializers.IntegerField()
+    downvote_count = serializers.IntegerField()
     is_deprecated = serializers.BooleanField()
     created_at = serializers.DateTimeField()
     updated_at = serializers.DateTimeField()
@@ -173,6 +239,22 @@ class SearchResultsSerializer(serializers.Serializer):
     content_type = serializers.CharField(default='policy')
 
 
+class PolicySymbolSerializer(serializers.ModelSerializer):
+    """
+    Serializer for symbol search results.
+    Locates a symbol occurrence down to the policy version, file and line.
+    """
+    contributor = serializers.CharField(source='policy.contributor.name', read_only=True)
+    policy = serializers.CharField(source='policy.name', read_only=True)
+    version = serializers.CharField(source='version.version', read_only=True)
+    is_latest = serializers.BooleanField(source='version.is_latest', read_only=True)
+    file = serializers.CharField(source='file.file_path', read_only=True)
+    
+    class Meta:
+        model = PolicySymbol
+        fields = ['name', 'kind', 'role', 'contributor', 'policy', 'version', 'is_latest', 'file', 'line']
+
+
 class PolicyUploadSerializer(serializers.Serializer):
     """
     Serializer for policy package uploads.
@@ -184,9 +266,9 @@ class PolicyUploadSerializer(serializers.Serializer):
     
     def validate_file(self, value):
         """Validate uploaded file"""
-        # Check file size (max 10MB)
-        if value.size > 10 * 1024 * 1024:
-            raise serializers.ValidationError("File size cannot exceed 10MB")
+        # Check file size
+        if value.size > settings.MAX_POLICY_SIZE_MB * 1024 * 1024:
+            raise serializers.ValidationError(f"File size cannot exceed {settings.MAX_POLICY_SIZE_MB}MB")
         
         # Check file extension
         if not value.name.endswith(('.tar.gz', '.zip')):
@@ -195,10 +277,37 @@ class PolicyUploadSerializer(serializers.Serializer):
         return value
     
     def validate_contributor(self, value):
-        """Validate contributor exists"""
-        if not Contributor.objects.filter(name=value).exists():
+        """Validate contributor exists and the uploader owns it (or is staff)"""
+        contributor = Contributor.objects.filter(name=value).first()
+        if contributor is None:
             raise serializers.ValidationError(f"Contributor '{value}' does not exist")
+        request = self.context.get('request')
+        user = getattr(request, 'user', None)
+        if user is None or not (user.is_staff or contributor.is_owner(user)):
+            raise serializers.ValidationError(f"You are not an owner of contributor '{value}'")
         return value
+    
+    def validate(self, attrs):
+        """Validate the policy exists and the version is new"""
+        policy = Policy.objects.filter(contributor__name=attrs['contributor'], name=attrs['name']).only('pk').first()
+        if policy is None:
+            raise serializers.ValidationError({'name': f"Policy '{attrs['contributor']}/{attrs['name']}' does not exist"})
+        if PolicyVersion.objects.filter(policy=policy, version=attrs['version']).exists():
+            raise serializers.ValidationError({'version': f"Version '{attrs['version']}' already exists"})
+        return attrs
+
+
+class ImportTaskSerializer(serializers.ModelSerializer):
+    """Serializer for policy package import tasks"""
+    
+    class Meta:
+        model = ImportTask
+        fields = [
+            'id', 'state', 'stage', 'contributor', 'name', 'version', 'filename', 'archive_size',
+            'files_processed', 'files_total', 'file_errors', 'error',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
 
 
 class RatingSerializer(serializers.ModelSerializer):
@@ -213,11 +322,10 @@ class RatingSerializer(serializers.ModelSerializer):
 
 class DownloadLogSerializer(serializers.ModelSerializer):
     """Serializer for download logs"""
-    policy = serializers.CharField(source='policy_version.policy.name', read_only=True)
-    version = serializers.CharField(source='policy_version.version', read_only=True)
-    user = serializers.CharField(source='user.username', read_only=True)
+    policy = serializers.CharField(source='policy.name', read_only=True)
+    version = serializers.CharField(source='version.version', read_only=True)
     
     class Meta:
         model = DownloadLog
-        fields = ['id', 'policy', 'version', 'user', 'downloaded_at']
-        read_only_fields = ['id', 'downloaded_at']
+        fields = ['id', 'policy', 'version', 'created_at']
+        read_only_fields = ['id', 'created_at']
@@ -0,0 +1,67 @@
+"""
+Signals touching ``updated_at`` when a related row that is rendered as part
+of a policy or contributor changes, so conditional GET validators
+only need to read the parent row.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.contributors.models import Contributor
+from .models import Policy, Tag
+
+
+def touch(model, pks):
+    """Mark rows as changed without sending save signals."""
+    pks = list(pks)
+    if pks:
+        model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Policy.tags.through)
+def touch_tagged_policies(sender, instance, action, reverse, pk_set, **kwargs):
+    """Attaching or removing tags changes the policy."""
+    if action == 'pre_clear' and reverse:
+        instance._touch_policy_ids = list(instance.policies.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch(Policy, [instance.pk])
+    elif action == 'post_clear':
+        touch(Policy, getattr(instance, '_touch_policy_ids', []))
+    else:
+        touch(Policy, pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+def touch_renamed_tag_policies(sender, instance, created, **kwargs):
+    """A renamed tag changes every policy carrying it."""
+    if not created:
+        touch(Policy, instance.policies.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_deleted_tag_policies(sender, instance, **kwargs):
+    instance._touch_policy_ids = list(instance.policies.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def touch_deleted_tag_policies(sender, instance, **kwargs):
+    touch(Policy, getattr(instance, '_touch_policy_ids', []))
+
+
+@receiver(m2m_changed, sender=Contributor.owners.through)
+def touch_owned_contributors(sender, instance, action, reverse, pk_set, **kwargs):
+    """Owners are listed in the contributor detail."""
+    if action == 'pre_clear' and reverse:
+        instance._touch_contributor_ids = list(instance.owned_contributors.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch(Contributor, [instance.pk])
+    elif action == 'post_clear':
+        touch(Contributor, getattr(instance, '_touch_contributor_ids', []))
+    else:
+        touch(Contributor, pk_set or [])
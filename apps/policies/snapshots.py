@@ -0,0 +1,53 @@
+"""
+Pre-rendered JSON snapshots of published policy versions.
+
+A published version does not change, so ``publish_version`` renders its
+detail payload, files included, once and stores the bytes on the row
+together with their SHA-256. ``version_detail`` serves those bytes as they
+are, with a strong ETag and an immutable ``Cache-Control``. Versions that
+predate snapshots are published on first read. An existing snapshot is only
+re-rendered on request (``force=True``, the admin action), e.g. after the
+detail serializer changes.
+"""
+import hashlib
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import PolicyFile, PolicyVersion
+from .serializers import PolicyVersionDetailSerializer
+
+
+def render_snapshot(version_id):
+    """Render the detail JSON of a version."""
+    version = PolicyVersion.objects.select_related('policy__contributor').prefetch_related(
+        Prefetch('files', queryset=PolicyFile.objects.select_related('blob'))
+    ).get(pk=version_id)
+    return JSONRenderer().render(PolicyVersionDetailSerializer(version).data)
+
+
+def publish_version(version_id, force=False):
+    """
+    Store the JSON snapshot of a version unless it already has one (or
+    ``force`` is set). Returns the snapshot's SHA-256.
+    """
+    with transaction.atomic():
+        # The row lock keeps concurrent first readers from rendering twice
+        current = PolicyVersion.objects.select_for_update().filter(
+            pk=version_id
+        ).values_list('snapshot_hash', flat=True).first()
+        if current is None:
+            raise PolicyVersion.DoesNotExist(f'Policy version {version_id} does not exist')
+        if current and not force:
+            return current
+        data = render_snapshot(version_id)
+        digest = hashlib.sha256(data).hexdigest()
+        # update() leaves updated_at and the save signals alone
+        PolicyVersion.objects.filter(pk=version_id).update(
+            snapshot=data.decode('utf-8'),
+            snapshot_hash=digest,
+            published_at=timezone.now(),
+        )
+    return digest
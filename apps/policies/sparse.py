@@ -0,0 +1,89 @@
+"""
+Sparse fieldsets and opt-in expansion for the policy API.
+
+``?fields=name,latest_version`` limits a response to the named top-level
+fields and ``?expand=contributor,versions`` switches on the expensive ones:
+fields listed in a serializer's ``Meta.expand_only`` are left out unless
+expanded (or named in ``?fields=``), and ``Meta.expandable_fields`` swap a
+compact representation for a full nested one.
+
+``sparse_queryset`` applies the same selection to the queryset, using
+``Meta.field_queries`` (and ``Meta.expanded_field_queries`` for expanded
+fields) to find the columns, joins and prefetches each field needs, so
+unrequested data is never loaded rather than loaded and thrown away.
+"""
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    """Split a comma-separated query parameter into a set of names."""
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+
+def requested(request):
+    """Return ``(fields, expand)`` from the request; ``fields`` is None when not restricted."""
+    if request is None:
+        return None, set()
+    fields = parse_names(request.query_params.get(FIELDS_PARAM)) or None
+    return fields, parse_names(request.query_params.get(EXPAND_PARAM))
+
+
+class SparseFieldsMixin:
+    """Apply ``?fields=`` and ``?expand=`` to a top-level ModelSerializer."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is None:
+            selected, expand = requested(self.context.get('request'))
+        else:
+            # The parameters name top-level fields; nested serializers keep their defaults
+            selected, expand = None, set()
+        for name, build in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expand:
+                fields[name] = build()
+        for name in getattr(self.Meta, 'expand_only', ()):
+            if name not in expand and not (selected and name in selected):
+                fields.pop(name, None)
+        if selected:
+            fields = {name: field for name, field in fields.items() if name in selected}
+        return fields
+
+
+def sparse_queryset(queryset, serializer_class, request, extra_fields=()):
+    """
+    Restrict ``queryset`` to what ``serializer_class`` renders for this
+    request. ``extra_fields`` are columns the view needs regardless, such as
+    its sort keys.
+    """
+    meta = serializer_class.Meta
+    names = serializer_class(context={'request': request}).fields.keys()
+    _, expand = requested(request)
+    concrete = {field.name for field in queryset.model._meta.concrete_fields}
+
+    only, select, prefetch = {queryset.model._meta.pk.name, *extra_fields}, set(), []
+    for name in names:
+        query = None
+        if name in expand:
+            query = getattr(meta, 'expanded_field_queries', {}).get(name)
+        if query is None:
+            query = getattr(meta, 'field_queries', {}).get(name)
+        if query is None:
+            if name in concrete:
+                only.add(name)
+            continue
+        only.update(query.get('only', ()))
+        select.update(query.get('select', ()))
+        prefetch.extend(lookup for lookup in query.get('prefetch', ()) if lookup not in prefetch)
+
+    queryset = queryset.only(*only)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
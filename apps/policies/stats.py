@@ -0,0 +1,139 @@
+"""
+Download time series served from the rollup tables.
+
+Hourly series read ``DownloadRollupHourly``; day, week and month series
+read ``DownloadRollupDaily``. Buckets are summed in the database, empty
+buckets are filled with zeros, and responses are cached, so a year of daily
+points costs one grouped query over at most a few hundred rows per version.
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import DownloadRollupDaily, DownloadRollupHourly
+
+INTERVALS = ('hour', 'day', 'week', 'month')
+
+RANGE_RE = re.compile(r'^(\d{1,9})([hdwmy])$')
+RANGE_UNITS = {'h': 1 / 24, 'd': 1, 'w': 7, 'm': 30, 'y': 365}
+
+# Longest range accepted, in days; longer ones would overflow date arithmetic
+MAX_RANGE_DAYS = 100 * 365
+
+# Upper bound on points in one series
+MAX_BUCKETS = 1000
+
+
+class StatsError(ValueError):
+    """Raised for an unsupported interval or range."""
+
+
+def parse_range(value):
+    """Turn ``90d``, ``12w``, ``24h``, ``6m`` or ``1y`` into a timedelta."""
+    match = RANGE_RE.match((value or '').strip().lower())
+    if not match:
+        raise StatsError(f"Invalid range '{value}', expected e.g. 24h, 30d, 12w, 6m or 1y")
+    count, unit = int(match.group(1)), match.group(2)
+    if count <= 0:
+        raise StatsError('Range must be positive')
+    days = count * RANGE_UNITS[unit]
+    if days > MAX_RANGE_DAYS:
+        raise StatsError(f'Range must be at most {MAX_RANGE_DAYS // 365} years')
+    return timedelta(days=days)
+
+
+def _floor(moment, interval):
+    """Start of the bucket containing ``moment`` (a UTC datetime)."""
+    if interval == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.date()
+    if interval == 'week':
+        day -= timedelta(days=day.weekday())
+    elif interval == 'month':
+        day = day.replace(day=1)
+    return day
+
+
+def _next(bucket, interval):
+    if interval == 'hour':
+        return bucket + timedelta(hours=1)
+    if interval == 'day':
+        return bucket + timedelta(days=1)
+    if interval == 'week':
+        return bucket + timedelta(weeks=1)
+    return (bucket.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def download_series(interval='day', range_value='30d', **filters):
+    """
+    Return the gap-filled download series for rollup rows matching ``filters``
+    (e.g. ``policy_id=1`` or ``policy__contributor_id=2``).
+    """
+    if interval not in INTERVALS:
+        raise StatsError(f"Invalid interval '{interval}', expected one of {', '.join(INTERVALS)}")
+    span = parse_range(range_value)
+    if interval == 'hour' and span > timedelta(days=settings.YSEAL_DOWNLOAD_HOURLY_RETENTION_DAYS):
+        raise StatsError(
+            f'Hourly data is kept for {settings.YSEAL_DOWNLOAD_HOURLY_RETENTION_DAYS} days, use a shorter range'
+        )
+
+    now = timezone.now().astimezone(dt_timezone.utc)
+    first, last = _floor(now - span, interval), _floor(now, interval)
+    buckets = [first]
+    while buckets[-1] < last:
+        buckets.append(_next(buckets[-1], interval))
+        if len(buckets) > MAX_BUCKETS:
+            raise StatsError(f'More than {MAX_BUCKETS} points requested, use a longer interval')
+
+    if interval == 'hour':
+        rows = DownloadRollupHourly.objects.filter(bucket__gte=first, **filters).values('bucket')
+    else:
+        rows = DownloadRollupDaily.objects.filter(bucket__gte=first, **filters)
+        if interval == 'week':
+            rows = rows.annotate(period=TruncWeek('bucket')).values('period')
+        elif interval == 'month':
+            rows = rows.annotate(period=TruncMonth('bucket')).values('period')
+        else:
+            rows = rows.values('bucket')
+    counts = {}
+    for row in rows.annotate(downloads=Sum('count')).order_by():
+        bucket = row.get('period', row.get('bucket'))
+        if isinstance(bucket, datetime) and interval != 'hour':
+            bucket = bucket.date()
+        elif interval == 'hour' and timezone.is_naive(bucket):
+            bucket = timezone.make_aware(bucket, dt_timezone.utc)
+        counts[bucket] = counts.get(bucket, 0) + row['downloads']
+
+    series = [{'bucket': bucket.isoformat(), 'downloads': counts.get(bucket, 0)} for bucket in buckets]
+
+    return {
+        'interval': interval,
+        'range': range_value,
+        'start': first.isoformat(),
+        'end': last.isoformat(),
+        'total': sum(point['downloads'] for point in series),
+        'series': series,
+    }
+
+
+def cached_series(scope, resolve, interval='day', range_value='30d'):
+    """
+    ``download_series`` cached per scope and parameters. ``resolve`` returns
+    the rollup filters for the scope, or None when it does not exist, and is
+    only called on a cache miss. Returns None for a missing scope.
+    """
+    range_value = (range_value or '').strip().lower()
+    key = f'stats:downloads:{scope}:{interval}:{range_value}'
+    result = cache.get(key)
+    if result is None:
+        filters = resolve()
+        if filters is None:
+            return None
+        result = download_series(interval, range_value, **filters)
+        cache.set(key, result, settings.YSEAL_STATS_CACHE_TTL)
+    return result
@@ -0,0 +1,33 @@
+"""
+Celery tasks for the policies app.
+"""
+from celery import shared_task
+
+from .downloads import flush_counts
+from .imports import run_import
+from .rollups import compact_downloads, roll_up_downloads
+
+
+@shared_task(ignore_result=True)
+def flush_download_counters():
+    """Fold pending download counters into the download_count columns."""
+    return flush_counts()
+
+
+@shared_task(ignore_result=True)
+def roll_up_download_logs():
+    """Fold new download log rows into the hourly and daily rollups."""
+    return roll_up_downloads()
+
+
+@shared_task(ignore_result=True)
+def compact_download_logs():
+    """Delete raw download logs and hourly rollups past their retention."""
+    roll_up_downloads()
+    return compact_downloads()
+
+
+@shared_task(ignore_result=True)
+def import_policy_package(task_id):
+    """Import the spooled package of an ImportTask as a new policy version."""
+    return run_import(task_id)
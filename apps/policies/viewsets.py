@@ -1,52 +1,82 @@
 """
 ViewSets for the policies app, based on Ansible Galaxy architecture.
 """
-from django.db.models import Q, Count, Avg, OuterRef, Exists, Subquery
+import json
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db.models import Count, Avg, Exists, Case, When, Value
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.urls import reverse
 from django_filters import rest_framework as filters
 from rest_framework import viewsets, status, mixins
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 
 from .models import (
-    Policy, PolicyVersion, PolicyFile, Tag, DownloadLog
+    USE_POSTGRES, Policy, PolicyVersion, PolicyFile, Tag, ImportTask
 )
 from apps.contributors.models import Contributor
+from apps.search import cache as search_cache
+from apps.search.facets import get_facets, parse_facets
+from apps.search.fulltext import fulltext_search
+from apps.search.keyword import keyword_search
+from apps.search.models import PolicySymbol
+from apps.search.suggest import suggest
+from apps.search.tags import filter_by_tags
+from apps.search.trigram import POLICY_SOURCES, fuzzy_search
 from apps.voting.models import Vote, Rating
+from .archives import ArchiveRenderer, archive_response, archive_suffix, starts_download
+from .assembly import assembled_response, manifest_key, missing_files, version_manifest
+from .conditional import (
+    collection_validators, conditional_response, instance_validators,
+    policy_validators, policy_versions_validators, version_validators
+)
+from .downloads import client_ip, record_download
+from .imports import SpoolUploadHandler, cached_progress, discard
+from .pagination import StandardResultsSetPagination
+from .sparse import requested, sparse_queryset
+from .stats import StatsError, cached_series
+from .tasks import import_policy_package
 from .serializers import (
     PolicyListSerializer, PolicyDetailSerializer,
-    PolicyVersionDetailSerializer, PolicyVersionListSerializer,
+    PolicyVersionListSerializer,
     ContributorSerializer, TagSerializer, RatingSerializer,
-    PolicyUploadSerializer, DownloadLogSerializer,
-    SearchResultsSerializer
+    PolicyUploadSerializer, ImportTaskSerializer, DownloadLogSerializer,
+    SearchResultsSerializer, PolicySymbolSerializer
 )
 
 
-class StandardResultsSetPagination(PageNumberPagination):
-    """Standard pagination similar to galaxy_ng"""
-    page_size = 10
-    page_size_query_param = 'limit'
-    max_page_size = 100
+def is_true(value):
+    """Interpret a query parameter flag such as ?fuzzy=1 or ?fuzzy=true."""
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
 
 
 class PolicyFilter(filters.FilterSet):
     """Filter class for policies (similar to galaxy_ng CollectionFilter)"""
     contributor = filters.CharFilter(field_name='contributor__name')
-    name = filters.CharFilter(lookup_expr='icontains')
     is_deprecated = filters.BooleanFilter()
     tags = filters.CharFilter(method='filter_tags')
+    # Last, so fuzzy matching ranks only the policies the other filters leave
+    name = filters.CharFilter(method='filter_name')
     
     class Meta:
         model = Policy
-        fields = ['contributor', 'name', 'is_deprecated']
+        fields = ['contributor', 'is_deprecated', 'tags', 'name']
+    
+    def filter_name(self, queryset, name, value):
+        """Filter by name substring, or by trigram similarity with ?fuzzy=1"""
+        if is_true(self.data.get('fuzzy')):
+            return fuzzy_search(queryset, value, sources=POLICY_SOURCES).order_by('-relevance', 'name')
+        return queryset.filter(name__icontains=value)
     
     def filter_tags(self, queryset, name, value):
-        """Filter by tag names"""
-        tags = value.split(',')
-        for tag in tags:
-            queryset = queryset.filter(tags__name__iexact=tag.strip())
-        return queryset
+        """Filter by a tag expression (web,httpd / web|nginx / -deprecated)"""
+        return filter_by_tags(queryset, value)
 
 
 class PolicyViewSet(viewsets.ReadOnlyModelViewSet):
@@ -55,33 +85,37 @@ class PolicyViewSet(viewsets.ReadOnlyModelViewSet):
     Similar to galaxy_ng CollectionViewSet.
     
     Endpoints:
-    - GET /api/v1/policies/ - List all policies
+    - GET /api/v1/policies/ - List all policies (?order_by=-updated_at, -download_count, -rating, -score, name)
     - GET /api/v1/policies/{id}/ - Get policy details
     - GET /api/v1/policies/{contributor}/{name}/ - Get policy by contributor and name
     - GET /api/v1/policies/{contributor}/{name}/versions/ - List policy versions
     - GET /api/v1/policies/{contributor}/{name}/versions/{version}/ - Get specific version
+    - GET /api/v1/policies/{contributor}/{name}/versions/{version}/download/ - Download the version archive
+    
+    Reads accept ?fields=name,latest_version to return only some fields and
+    ?expand=contributor,versions to embed the contributor and version list.
     """
     permission_classes = [AllowAny]
     pagination_class = StandardResultsSetPagination
     filterset_class = PolicyFilter
     lookup_field = 'id'
     
+    # Accepted ?order_by= values, each ending in id so cursors are stable
+    orderings = {
+        '-updated_at': ('-updated_at', '-id'),
+        '-download_count': ('-download_count', '-id'),
+        '-rating': ('-bayesian_rating', '-id'),
+        '-score': ('-wilson_score', '-id'),
+        'name': ('name', 'id'),
+    }
+    
     def get_queryset(self):
-        """Get queryset with annotations for downloads and tags"""
-        queryset = Policy.objects.select_related('contributor').prefetch_related('tags', 'versions')
-        
-        # Annotate with download count
-        download_count = DownloadLog.objects.filter(
-            policy_version__policy=OuterRef('pk')
-        ).values('policy_version__policy').annotate(
-            count=Count('id')
-        ).values('count')
-        
-        queryset = queryset.annotate(
-            download_count=Subquery(download_count)
-        )
-        
-        return queryset.order_by('-updated_at')
+        """Get queryset loading only what the requested ?fields= and ?expand= render"""
+        ordering = self.orderings.get(self.request.query_params.get('order_by'), self.orderings['-updated_at'])
+        # Keyset cursors read the sort keys, and ?fuzzy=1 re-sorts by name
+        sort_keys = {key.lstrip('-') for key in ordering} | {'name'}
+        queryset = sparse_queryset(Policy.objects.all(), self.get_serializer_class(), self.request, sort_keys)
+        return queryset.order_by(*ordering)
     
     def get_serializer_class(self):
         """Return appropriate serializer based on action"""
@@ -93,11 +127,20 @@ class PolicyViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Retrieve a policy by ID or by contributor/name.
         Supports: /api/v1/policies/123/ or /api/v1/policies/contributor/policyname/
+        Answers If-None-Match with 304 after a single lookup.
         """
+        if 'contributor' in kwargs and 'name' in kwargs:
+            validators = policy_validators(contributor__name=kwargs['contributor'], name=kwargs['name'])
+        else:
+            validators = policy_validators(pk=kwargs[self.lookup_field])
+        return conditional_response(request, validators, lambda: self.render_detail(request, *args, **kwargs))
+    
+    def render_detail(self, request, *args, **kwargs):
+        """Serialize a policy looked up by ID or by contributor/name."""
         # Check if we're looking up by contributor/name
         if 'contributor' in kwargs and 'name' in kwargs:
             try:
-                policy = Policy.objects.get(
+                policy = self.get_queryset().get(
                     contributor__name=kwargs['contributor'],
                     name=kwargs['name']
                 )
@@ -117,13 +160,22 @@ class PolicyViewSet(viewsets.ReadOnlyModelViewSet):
         List all versions for a specific policy.
         GET /api/v1/policies/{contributor}/{name}/versions/
         """
+        return conditional_response(
+            request, policy_versions_validators(contributor, name),
+            lambda: self.render_versions(request, contributor, name)
+        )
+    
+    def render_versions(self, request, contributor, name):
         try:
-            policy = Policy.objects.get(contributor__name=contributor, name=name)
-            versions = policy.versions.all().order_by('-created_at')
-            serializer = PolicyVersionListSerializer(versions, many=True)
+            policy = Policy.objects.only('pk').get(contributor__name=contributor, name=name)
+            versions = sparse_queryset(
+                policy.versions.all(), PolicyVersionListSerializer, request, ['created_at']
+            ).order_by('-created_at')
+            serializer = PolicyVersionListSerializer(versions, many=True, context={'request': request})
+            data = serializer.data
             return Response({
-                'meta': {'count': versions.count()},
-                'data': serializer.data
+                'meta': {'count': len(data)},
+                'data': data
             })
         except Policy.DoesNotExist:
             return Response(
@@ -140,12 +192,28 @@ class PolicyViewSet(viewsets.ReadOnlyModelViewSet):
         """
         Get details for a specific policy version.
         GET /api/v1/policies/{contributor}/{name}/versions/{version}/
+        
+        Served byte-for-byte from the version's stored JSON snapshot;
+        ?fields= picks top-level keys out of it.
         """
+        return conditional_response(
+            request, version_validators(contributor, name, version),
+            lambda: self.render_version_detail(request, contributor, name, version),
+            cache_control={'public': True, 'max_age': settings.YSEAL_VERSION_CACHE_MAX_AGE, 'immutable': True}
+        )
+    
+    def render_version_detail(self, request, contributor, name, version):
         try:
             policy = Policy.objects.get(contributor__name=contributor, name=name)
-            policy_version = policy.versions.get(version=version)
-            serializer = PolicyVersionDetailSerializer(policy_version)
-            return Response(serializer.data)
+            snapshot = policy.versions.values_list('snapshot', flat=True).get(version=version)
+            selected, _ = requested(request)
+            if selected:
+                # Sparse responses are cut from the snapshot rather than re-serialized
+                data = json.loads(snapshot)
+                return Response({name: value for name, value in data.items() if name in selected})
+            if request.accepted_renderer.format == 'json':
+                return HttpResponse(snapshot, content_type='application/json')
+            return Response(json.loads(snapshot))
         except Policy.DoesNotExist:
             return Response(
                 {'detail': f"Policy {contributor}/{name} not found"},
@@ -156,6 +224,124 @@ class PolicyViewSet(viewsets.ReadOnlyModelViewSet):
                 {'detail': f"Version {version} not found for {contributor}/{name}"},
                 status=status.HTTP_404_NOT_FOUND
             )
+    
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'(?P<contributor>[^/]+)/(?P<name>[^/]+)/versions/(?P<version>[^/]+)/download',
+        renderer_classes=[JSONRenderer, ArchiveRenderer]
+    )
+    def download(self, request, contributor=None, name=None, version=None):
+        """
+        Download the archive of a policy version.
+        GET /api/v1/policies/{contributor}/{name}/versions/{version}/download/
+        
+        The ETag is the archive's SHA-256. Supports If-None-Match and single
+        byte ranges (Range, If-Range); the file is sent by nginx or sendfile(),
+        never read into memory. Only requests from the first byte count as
+        downloads.
+        
+        Versions without a stored upload get a .tar.gz assembled from their
+        files, streamed on the first request and cached afterwards; its ETag
+        is the hash of the file manifest. Ranges apply once it is cached.
+        """
+        row = PolicyVersion.objects.filter(
+            policy__contributor__name=contributor, policy__name=name, version=version
+        ).values_list('pk', 'policy_id', 'policy__contributor_id', 'checksum', 'archive_path').first()
+        if row is None:
+            return JsonResponse(
+                {'detail': f"Version {version} not found for {contributor}/{name}"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        pk, policy_id, contributor_id, checksum, archive_path = row
+        if archive_path:
+            etag = f'"{checksum}"'
+        else:
+            # No upload is stored (e.g. imported from git); assemble one from the files
+            manifest = version_manifest(pk)
+            if not manifest:
+                return JsonResponse(
+                    {'detail': f"No archive is stored for {contributor}/{name} {version}"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            missing = missing_files(manifest)
+            if missing:
+                # Serving the rest would give an incomplete package
+                return JsonResponse(
+                    {
+                        'detail': f"The content of {len(missing)} file(s) of {contributor}/{name} {version} is not stored",
+                        'missing_files': missing,
+                    },
+                    status=status.HTTP_409_CONFLICT
+                )
+            key = manifest_key(manifest)
+            etag = f'"{key}"'
+        
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response['ETag'] = etag
+            return response
+        
+        if archive_path:
+            filename = f"{contributor}-{name}-{version}{archive_suffix(archive_path)}"
+            response = archive_response(request, archive_path, filename, etag)
+        else:
+            response = assembled_response(request, key, manifest, f"{contributor}-{name}-{version}.tar.gz")
+        # DRF routes HEAD here too; only GETs transfer the archive
+        if request.method == 'GET' and response.status_code in (200, 206) and starts_download(request):
+            ip_address = client_ip(request)
+            if ip_address:
+                record_download(
+                    PolicyVersion(pk=pk, policy_id=policy_id), ip_address,
+                    request.META.get('HTTP_USER_AGENT', ''), contributor_id
+                )
+        return response
+    
+    @action(detail=False, methods=['get'], url_path=r'(?P<contributor>[^/]+)/(?P<name>[^/]+)/stats')
+    def stats(self, request, contributor=None, name=None):
+        """
+        Download time series for a policy, served from the rollup tables.
+        GET /api/v1/policies/{contributor}/{name}/stats/?interval=day&range=90d
+        
+        Supports:
+        - interval: hour, day, week, month
+        - range: 24h, 30d, 12w, 6m, 1y
+        - version: restrict to one version
+        """
+        version = request.query_params.get('version')
+        
+        def resolve():
+            policy_id = Policy.objects.filter(
+                contributor__name=contributor, name=name
+            ).values_list('pk', flat=True).first()
+            if policy_id is None:
+                return None
+            if not version:
+                return {'policy_id': policy_id}
+            version_id = PolicyVersion.objects.filter(
+                policy_id=policy_id, version=version
+            ).values_list('pk', flat=True).first()
+            return None if version_id is None else {'version_id': version_id}
+        
+        scope = f'policy:{contributor}/{name}' + (f'@{version}' if version else '')
+        not_found = f"Version {version} not found for {contributor}/{name}" if version else \
+            f"Policy {contributor}/{name} not found"
+        return stats_response(request, scope, resolve, not_found)
+
+
+def stats_response(request, scope, resolve, not_found):
+    """Render a download time series for the stats actions."""
+    try:
+        result = cached_series(
+            scope, resolve,
+            interval=request.query_params.get('interval', 'day'),
+            range_value=request.query_params.get('range', '30d'),
+        )
+    except StatsError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if result is None:
+        return Response({'detail': not_found}, status=status.HTTP_404_NOT_FOUND)
+    return Response(result)
 
 
 class ContributorViewSet(viewsets.ModelViewSet):
@@ -170,8 +356,24 @@ class ContributorViewSet(viewsets.ModelViewSet):
     lookup_field = 'name'
     
     def get_queryset(self):
-        """Return contributors ordered by name"""
-        return Contributor.objects.all().order_by('name')
+        """Return contributors ordered by name, loading only the requested fields"""
+        queryset = Contributor.objects.all()
+        if self.request.method == 'GET':
+            queryset = sparse_queryset(queryset, self.get_serializer_class(), self.request, ['name'])
+        return queryset.order_by('name', 'id')
+    
+    def list(self, request, *args, **kwargs):
+        """List contributors, answering conditional requests from one aggregate"""
+        return conditional_response(
+            request, collection_validators(Contributor), partial(super().list, request, *args, **kwargs)
+        )
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a contributor, answering conditional requests from one lookup"""
+        return conditional_response(
+            request, instance_validators(Contributor, name=kwargs['name']),
+            partial(super().retrieve, request, *args, **kwargs)
+        )
     
     def destroy(self, request, *args, **kwargs):
         """
@@ -190,6 +392,18 @@ class ContributorViewSet(viewsets.ModelViewSet):
             )
         
         return super().destroy(request, *args, **kwargs)
+    
+    @action(detail=True, methods=['get'], url_path='stats')
+    def stats(self, request, name=None):
+        """
+        Download time series across all policies of a contributor.
+        GET /api/v1/contributors/{name}/stats/?interval=week&range=1y
+        """
+        def resolve():
+            contributor_id = Contributor.objects.filter(name=name).values_list('pk', flat=True).first()
+            return None if contributor_id is None else {'policy__contributor_id': contributor_id}
+        
+        return stats_response(request, f'contributor:{name}', resolve, f"Contributor {name} not found")
 
 
 class SearchViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
@@ -200,9 +414,12 @@ class SearchViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
     Supports:
     - keywords: text search
     - contributor: filter by contributor
-    - tags: filter by tags (comma-separated)
+    - tags: filter by tags (comma-separated AND, | for OR, leading - or ! for NOT)
     - is_deprecated: filter deprecated policies
-    - order_by: sort results (-relevance, -download_count, -updated_at, name)
+    - fuzzy: typo-tolerant matching of keywords against policy, contributor and tag names
+    - facets: counts to return alongside results (tags, contributor, supported_systems, is_deprecated)
+    - order_by: sort results (-relevance, -download_count, -rating, -score, -updated_at, name)
+    - cursor: keyset pagination without a total count (pass count=true to include one)
     """
     permission_classes = [AllowAny]
     pagination_class = StandardResultsSetPagination
@@ -215,18 +432,10 @@ class SearchViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
         tags = self.request.query_params.get('tags')
         is_deprecated = self.request.query_params.get('is_deprecated')
         order_by = self.request.query_params.get('order_by', '-updated_at')
+        fuzzy = is_true(self.request.query_params.get('fuzzy'))
         
         # Start with all policies
-        queryset = Policy.objects.select_related('contributor').prefetch_related('tags')
-        
-        # Apply keyword search
-        if keywords:
-            queryset = queryset.filter(
-                Q(name__icontains=keywords) |
-                Q(description__icontains=keywords) |
-                Q(contributor__name__icontains=keywords) |
-                Q(tags__name__icontains=keywords)
-            ).distinct()
+        queryset = Policy.objects.select_related('contributor', 'latest_version').prefetch_related('tags')
         
         # Apply contributor filter
         if contributor:
@@ -234,48 +443,56 @@ class SearchViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
         
         # Apply tags filter
         if tags:
-            tag_list = [t.strip() for t in tags.split(',')]
-            for tag in tag_list:
-                queryset = queryset.filter(tags__name__iexact=tag)
+            queryset = filter_by_tags(queryset, tags)
         
         # Apply is_deprecated filter
         if is_deprecated is not None:
-            queryset = queryset.filter(is_deprecated=is_deprecated.lower() == 'true')
+            queryset = queryset.filter(is_deprecated=is_true(is_deprecated))
         
-        # Annotate with download count
-        download_count = DownloadLog.objects.filter(
-            policy_version__policy=OuterRef('pk')
-        ).values('policy_version__policy').annotate(
-            count=Count('id')
-        ).values('count')
-        
-        queryset = queryset.annotate(
-            download_count=Subquery(download_count, output_field=Count('id'))
-        )
+        # Apply keyword search after the filters, so ranking cuts only matching policies
+        if keywords and fuzzy:
+            # Trigram similarity over policy, contributor and tag names
+            queryset = fuzzy_search(queryset, keywords)
+        elif keywords and USE_POSTGRES:
+            # Ranked full-text search served by the search_vector GIN index
+            queryset = fulltext_search(queryset, keywords)
+        elif keywords:
+            # BM25 ranking from the in-process keyword index
+            queryset = keyword_search(queryset, keywords)
         
-        # Apply ordering
+        # Apply ordering, with id as a tie-breaker so cursors are stable
         if order_by == '-relevance':
-            # For now, relevance is same as -updated_at
-            # TODO: Implement proper full-text search with ranking
-            queryset = queryset.order_by('-updated_at')
+            if 'relevance' in queryset.query.annotations:
+                queryset = queryset.order_by('-relevance', '-updated_at', '-id')
+            else:
+                queryset = queryset.order_by('-updated_at', '-id')
         elif order_by == '-download_count':
-            queryset = queryset.order_by('-download_count', '-updated_at')
+            queryset = queryset.order_by('-download_count', '-id')
+        elif order_by == '-rating':
+            queryset = queryset.order_by('-bayesian_rating', '-id')
+        elif order_by == '-score':
+            queryset = queryset.order_by('-wilson_score', '-id')
         elif order_by == 'name':
-            queryset = queryset.order_by('name')
+            queryset = queryset.order_by('name', 'id')
         else:
-            queryset = queryset.order_by(order_by)
+            queryset = queryset.order_by(order_by, '-id' if order_by.startswith('-') else 'id')
         
         return queryset
     
     def list(self, request, *args, **kwargs):
-        """Return search results with metadata"""
+        """Return search results with metadata, cached per normalized query"""
+        cache_key = search_cache.results_key(request)
+        cached = search_cache.get_results(cache_key)
+        if cached is not None:
+            return Response(cached)
+        
         queryset = self.filter_queryset(self.get_queryset())
         page = self.paginate_queryset(queryset)
         
         # Format results
         results = []
         for policy in page:
-            latest_version = policy.versions.order_by('-created_at').first()
+            latest_version = policy.latest_version
             results.append({
                 'id': policy.id,
                 'contributor': policy.contributor.name,
@@ -283,15 +500,87 @@ class SearchViewSet(viewsets.GenericViewSet, mixins.ListModelMixin):
                 'description': policy.description,
                 'latest_version': latest_version.version if latest_version else None,
                 'tags': [tag.name for tag in policy.tags.all()],
-                'download_count': policy.download_count or 0,
+                'download_count': policy.download_count,
+                'rating_count': policy.rating_count,
+                'average_rating': policy.average_rating,
+                'rating_histogram': policy.rating_histogram,
+                'star_count': policy.star_count,
+                'downvote_count': policy.downvote_count,
                 'is_deprecated': policy.is_deprecated,
                 'created_at': policy.created_at,
                 'updated_at': policy.updated_at,
                 'content_type': 'policy',
-                'relevance': 0.0  # TODO: Implement proper relevance scoring
+                'relevance': getattr(policy, 'relevance', None) or 0.0
             })
         
-        return self.get_paginated_response(results)
+        response = self.get_paginated_response(results)
+        facets = parse_facets(request.query_params.get('facets'))
+        if facets:
+            response.data['facets'] = get_facets(queryset, request.query_params, facets)
+        search_cache.set_results(cache_key, response.data)
+        return response
+    
+    @action(detail=False, methods=['get'], url_path='suggest')
+    def suggest(self, request):
+        """
+        Search-as-you-type completions for policies, tags and contributors.
+        GET /api/v1/search/suggest/?q={prefix}&limit={n}
+        """
+        prefix = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            limit = None
+        
+        return Response({
+            'query': prefix,
+            'suggestions': [
+                {'value': label, 'type': kind, 'popularity': weight}
+                for label, kind, weight in suggest(prefix, limit)
+            ]
+        })
+
+
+    @action(detail=False, methods=['get'], url_path='symbols')
+    def symbols(self, request):
+        """
+        Find the policies and versions that declare or use a SELinux symbol.
+        GET /api/v1/search/symbols/?q=httpd_t
+        
+        Supports:
+        - q: symbol name, a trailing * matches by prefix (httpd_*)
+        - kind: type, attribute, boolean, interface, template
+        - role: declaration, require, use, call, allow_source, allow_target, file_context
+        - latest: only search the latest version of each policy
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'detail': "Query parameter 'q' is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = PolicySymbol.objects.select_related(
+            'policy__contributor', 'version', 'file'
+        )
+        if query.endswith('*'):
+            queryset = queryset.filter(name__startswith=query.rstrip('*'))
+        else:
+            queryset = queryset.filter(name=query)
+        
+        for param in ('kind', 'role'):
+            value = request.query_params.get(param)
+            if value:
+                queryset = queryset.filter(**{param: value})
+        if is_true(request.query_params.get('latest')):
+            queryset = queryset.filter(version__is_latest=True)
+        
+        # Declarations first, then uses
+        declarations_first = Case(When(role='declaration', then=Value(0)), default=Value(1))
+        queryset = queryset.order_by('name', declarations_first, 'role', 'policy_id', '-version_id', 'file_id', 'line')
+        page = self.paginate_queryset(queryset)
+        serializer = PolicySymbolSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class PolicyUploadViewSet(viewsets.GenericViewSet):
@@ -302,24 +591,115 @@ class PolicyUploadViewSet(viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated]
     serializer_class = PolicyUploadSerializer
     
+    def initialize_request(self, request, *args, **kwargs):
+        """
+        Install the spool upload handler before authentication runs: the
+        CSRF check for session logins reads request.POST, which parses the
+        upload.
+        """
+        request.upload_handlers = [SpoolUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+    
+    def discard_uploads(self):
+        """Remove the spool files of an upload that will not be imported"""
+        request = self.request._request
+        # Only uploads that were already parsed have spool files
+        if hasattr(request, '_files'):
+            for upload in request.FILES.values():
+                upload.close()
+                discard(upload.temporary_file_path())
+    
+    def handle_exception(self, exc):
+        # Authentication can fail after the upload was spooled by the CSRF check
+        self.discard_uploads()
+        return super().handle_exception(exc)
+    
     def create(self, request, *args, **kwargs):
         """
         Upload a policy package.
         POST /api/v1/policies/upload/
+        
+        The archive is streamed to the import spool directory and imported by
+        the import_policy_package Celery task.
         """
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        try:
+            serializer = self.get_serializer(data=request.data)
+            valid = serializer.is_valid()
+        finally:
+            for upload in request.FILES.values():
+                upload.close()
+        if not valid:
+            self.discard_uploads()
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # TODO: Implement actual package parsing and import
-        # For now, just return success
+        data = serializer.validated_data
+        task = ImportTask.objects.create(
+            user=request.user,
+            contributor=data['contributor'],
+            name=data['name'],
+            version=data['version'],
+            filename=data['file'].name[:255],
+            archive_size=data['file'].size,
+            spool_path=data['file'].temporary_file_path(),
+        )
+        import_policy_package.delay(task.pk)
         return Response({
             'detail': 'Policy upload initiated',
-            'contributor': serializer.validated_data['contributor'],
-            'name': serializer.validated_data['name'],
-            'version': serializer.validated_data['version'],
+            'contributor': data['contributor'],
+            'name': data['name'],
+            'version': data['version'],
+            'task': request.build_absolute_uri(reverse('api-v3:import-detail', args=[task.pk])),
         }, status=status.HTTP_202_ACCEPTED)
 
 
+class ImportTaskViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    ViewSet for following policy package imports.
+    
+    Endpoints:
+    - GET /api/v3/imports/{id}/ - Import state, stage, file counts and per-file errors
+    - GET /api/v3/imports/{id}/?wait=5 - Block up to 5 seconds until the import finishes
+    """
+    serializer_class = ImportTaskSerializer
+    permission_classes = [IsAuthenticated]
+    # Seconds between checks while a request waits for an import
+    poll_interval = 0.5
+    
+    def get_queryset(self):
+        """Users follow their own imports; staff can follow any"""
+        if self.request.user.is_staff:
+            return ImportTask.objects.all()
+        return ImportTask.objects.filter(user=self.request.user)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get an import task. With ?wait=N the response is held until the
+        import finishes or N seconds (at most YSEAL_IMPORT_MAX_WAIT) pass.
+        The wait holds a web worker, so it is kept short: clients poll again
+        while the returned state is not finished.
+        """
+        task = self.get_object()
+        try:
+            wait = min(max(float(request.query_params.get('wait', 0)), 0), settings.YSEAL_IMPORT_MAX_WAIT)
+        except ValueError:
+            wait = 0
+        
+        deadline = time.monotonic() + wait
+        progress = cached_progress(task.pk)
+        while not task.is_finished and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            # Running imports report through the cache; the row is only
+            # read again once the import starts or finishes
+            progress = cached_progress(task.pk)
+            if progress is None:
+                task.refresh_from_db()
+        
+        data = self.get_serializer(task).data
+        if not task.is_finished and progress is not None:
+            data.update(progress)
+        return Response(data)
+
+
 class TagsViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for browsing tags.
@@ -335,6 +715,17 @@ class TagsViewSet(viewsets.ReadOnlyModelViewSet):
         return Tag.objects.annotate(
             policy_count=Count('policies')
         ).order_by('name')
+    
+    def list(self, request, *args, **kwargs):
+        """List tags, answering conditional requests from one aggregate"""
+        return conditional_response(request, collection_validators(Tag), partial(super().list, request, *args, **kwargs))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Retrieve a tag, answering conditional requests from one lookup"""
+        return conditional_response(
+            request, instance_validators(Tag, pk=kwargs['pk']),
+            partial(super().retrieve, request, *args, **kwargs)
+        )
 
 
 class RatingViewSet(viewsets.ModelViewSet):
@@ -345,7 +736,7 @@ class RatingViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter ratings by policy if specified"""
-        queryset = Rating.objects.select_related('user', 'policy').order_by('-created_at')
+        queryset = Rating.objects.select_related('user', 'policy').order_by('-created_at', '-id')
         policy_id = self.request.query_params.get('policy')
         if policy_id:
             queryset = queryset.filter(policy_id=policy_id)
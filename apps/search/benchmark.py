@@ -0,0 +1,348 @@
+"""
+Search benchmark: a reproducible synthetic catalog and a query replayer.
+
+``generate_corpus`` bulk-loads contributors, policies, versions, tags and
+download logs drawn from seeded Zipf-like distributions, so two runs with the
+same seed and sizes produce the same catalog. ``run_benchmark`` replays a
+query mix against the search, policy list and tag list views and reports
+latency percentiles and SQL query counts per endpoint.
+
+Everything the generator creates belongs to contributors named ``bench-*``
+so it can be removed again without touching real data.
+"""
+import ipaddress
+import random
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from itertools import accumulate
+
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.contributors.models import Contributor
+from apps.policies.models import DownloadLog, Policy, PolicyVersion, Tag
+from .cache import CATALOG, DOWNLOADS, bump_generation
+
+PREFIX = 'bench-'
+
+WORDS = [
+    'httpd', 'nginx', 'apache', 'container', 'podman', 'docker', 'kubernetes', 'postgresql',
+    'mysql', 'redis', 'samba', 'nfs', 'ssh', 'sudo', 'systemd', 'journald', 'firewalld',
+    'cron', 'dbus', 'polkit', 'bind', 'dns', 'dhcp', 'ldap', 'kerberos', 'sssd', 'tomcat',
+    'java', 'python', 'node', 'php', 'ruby', 'git', 'gitlab', 'jenkins', 'ansible', 'puppet',
+    'nagios', 'zabbix', 'prometheus', 'grafana', 'elastic', 'kafka', 'rabbitmq', 'memcached',
+    'haproxy', 'squid', 'postfix', 'dovecot', 'openvpn', 'wireguard', 'libvirt', 'qemu',
+    'usbguard', 'fapolicyd', 'audit', 'rsyslog', 'chrony', 'tuned', 'cockpit', 'keylime',
+]
+QUALIFIERS = ['policy', 'confined', 'module', 'hardening', 'sandbox', 'agent', 'server', 'client', 'tools']
+SYSTEMS = ['RHEL 8', 'RHEL 9', 'RHEL 10', 'Fedora 40', 'Fedora 41', 'CentOS Stream 9', 'AlmaLinux 9']
+
+# Zipf exponent for tag and download popularity
+SKEW = 1.1
+
+
+def zipf_weights(n, skew=SKEW):
+    """Cumulative Zipf weights for ``random.choices(..., cum_weights=...)``."""
+    return list(accumulate(1.0 / (rank ** skew) for rank in range(1, n + 1)))
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let ``bulk_create`` keep the ``created_at`` values it is given."""
+    fields = [model._meta.get_field('created_at') for model in models]
+    previous = [field.auto_now_add for field in fields]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field, value in zip(fields, previous):
+            field.auto_now_add = value
+
+
+def clear_corpus():
+    """Delete every benchmark contributor and, by cascade, its policies."""
+    Contributor.objects.filter(name__startswith=PREFIX).delete()
+    Tag.objects.filter(name__startswith=PREFIX).delete()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_corpus(policies=100000, versions=1000000, downloads=10000000, contributors=500,
+                    tags=300, seed=42, batch_size=5000, days=365, log=print):
+    """
+    Bulk-load a synthetic catalog and return the number of rows created per table.
+    Signals are bypassed, so search indexes must be rebuilt afterwards.
+    """
+    rng = random.Random(seed)
+    now = timezone.now().replace(microsecond=0)
+    created = Counter()
+
+    # Contributors and tags
+    Contributor.objects.bulk_create([
+        Contributor(name=f'{PREFIX}{i:05d}', display_name=f'Benchmark Contributor {i}')
+        for i in range(contributors)
+    ], batch_size=batch_size)
+    contributor_ids = list(
+        Contributor.objects.filter(name__startswith=PREFIX).order_by('name').values_list('pk', flat=True)
+    )
+    Tag.objects.bulk_create([
+        Tag(name=f'{PREFIX}{WORDS[i % len(WORDS)]}' + (f'-{i // len(WORDS)}' if i >= len(WORDS) else ''))
+        for i in range(tags)
+    ], batch_size=batch_size)
+    tag_ids = list(Tag.objects.filter(name__startswith=PREFIX).order_by('pk').values_list('pk', flat=True))
+    created.update(contributors=len(contributor_ids), tags=len(tag_ids))
+    log(f'Created {len(contributor_ids)} contributors and {len(tag_ids)} tags')
+
+    # Policies, with contributor sizes and tag usage both skewed
+    contributor_weights = zipf_weights(len(contributor_ids))
+    tag_weights = zipf_weights(len(tag_ids))
+    through = Policy.tags.through
+
+    def policy_rows():
+        for i in range(policies):
+            word, other = rng.choice(WORDS), rng.choice(WORDS)
+            qualifier = rng.choice(QUALIFIERS)
+            age = rng.randrange(days * 86400)
+            yield Policy(
+                contributor_id=rng.choices(contributor_ids, cum_weights=contributor_weights)[0],
+                name=f'{word}-{qualifier}-{i}',
+                display_name=f'{word.title()} {qualifier.title()} {i}',
+                description=f'SELinux {qualifier} for {word} with {other} integration',
+                readme=f'# {word}\n\nConfines {word} and grants access to {other} resources.',
+                repository_url=f'https://example.com/{word}/{i}',
+                is_deprecated=rng.random() < 0.05,
+                created_at=now - timezone.timedelta(seconds=age),
+            )
+
+    with explicit_timestamps(Policy):
+        for batch in _batches(policy_rows(), batch_size):
+            with transaction.atomic():
+                Policy.objects.bulk_create(batch)
+    policy_ids = array('q', Policy.objects.filter(
+        contributor__name__startswith=PREFIX
+    ).order_by('pk').values_list('pk', flat=True))
+    created['policies'] = len(policy_ids)
+    log(f'Created {len(policy_ids)} policies')
+
+    def tag_rows():
+        for policy_id in policy_ids:
+            for tag_id in set(rng.choices(tag_ids, cum_weights=tag_weights, k=rng.randint(1, 6))):
+                yield through(policy_id=policy_id, tag_id=tag_id)
+
+    for batch in _batches(tag_rows(), batch_size):
+        through.objects.bulk_create(batch)
+        created['policy_tags'] += len(batch)
+    log(f"Tagged policies with {created['policy_tags']} tag links")
+
+    # Versions, between one and twice the mean per policy; the last one is latest
+    mean = max(versions // max(len(policy_ids), 1), 1)
+
+    def version_rows():
+        for policy_id in policy_ids:
+            count = rng.randint(1, 2 * mean - 1)
+            start = now - timezone.timedelta(days=days)
+            for n in range(count):
+                yield PolicyVersion(
+                    policy_id=policy_id,
+                    version=f'{n // 10}.{n % 10}.0',
+                    git_commit=f'{rng.getrandbits(160):040x}',
+                    changelog=f'Release {n}',
+                    supported_systems=rng.sample(SYSTEMS, rng.randint(1, 3)),
+                    is_latest=n == count - 1,
+                    created_at=start + timezone.timedelta(days=days * (n + 1) / (count + 1)),
+                )
+
+    with explicit_timestamps(PolicyVersion):
+        for batch in _batches(version_rows(), batch_size):
+            with transaction.atomic():
+                PolicyVersion.objects.bulk_create(batch)
+            created['versions'] += len(batch)
+    # bulk_create sends no signals; one UPDATE does what refresh_latest_version
+    # does per policy, leaving updated_at as generated
+    latest = PolicyVersion.objects.filter(policy_id=OuterRef('pk')).order_by(
+        '-is_latest', '-created_at', '-id'
+    ).values('pk')[:1]
+    Policy.objects.filter(contributor__name__startswith=PREFIX).update(latest_version_id=Subquery(latest))
+    log(f"Created {created['versions']} versions")
+
+    # Downloads, skewed towards popular policies and recent versions
+    version_ids, version_policies = array('q'), array('q')
+    for pk, policy_id in PolicyVersion.objects.filter(
+        policy__contributor__name__startswith=PREFIX
+    ).order_by('pk').values_list('pk', 'policy_id').iterator(chunk_size=batch_size):
+        version_ids.append(pk)
+        version_policies.append(policy_id)
+    versions_by_policy = {}
+    for index, policy_id in enumerate(version_policies):
+        versions_by_policy.setdefault(policy_id, []).append(index)
+    policy_weights = zipf_weights(len(policy_ids))
+    popularity = list(policy_ids)
+    rng.shuffle(popularity)
+
+    policy_downloads, version_downloads = Counter(), Counter()
+
+    def download_rows():
+        for _ in range(downloads):
+            policy_id = rng.choices(popularity, cum_weights=policy_weights)[0]
+            choices = versions_by_policy[policy_id]
+            version_index = choices[-1] if rng.random() < 0.7 else rng.choice(choices)
+            version_id = version_ids[version_index]
+            policy_downloads[policy_id] += 1
+            version_downloads[version_id] += 1
+            yield DownloadLog(
+                policy_id=policy_id,
+                version_id=version_id,
+                ip_address=str(ipaddress.IPv4Address(rng.getrandbits(32))),
+                user_agent='yseal-cli/1.0',
+                created_at=now - timezone.timedelta(seconds=rng.randrange(days * 86400)),
+            )
+
+    with explicit_timestamps(DownloadLog):
+        for batch in _batches(download_rows(), batch_size):
+            with transaction.atomic():
+                DownloadLog.objects.bulk_create(batch)
+            created['downloads'] += len(batch)
+            if created['downloads'] % (batch_size * 100) == 0:
+                log(f"  {created['downloads']} downloads")
+    log(f"Created {created['downloads']} download logs")
+
+    # Denormalized counters the list views sort on
+    for model, counts in ((Policy, policy_downloads), (PolicyVersion, version_downloads)):
+        for batch in _batches(counts.items(), batch_size):
+            objects = [model(pk=pk, download_count=count) for pk, count in batch]
+            model.objects.bulk_update(objects, ['download_count'])
+    contributor_downloads = Counter()
+    contributor_policies = Counter()
+    for policy_id, contributor_id in Policy.objects.filter(
+        contributor__name__startswith=PREFIX
+    ).values_list('pk', 'contributor_id').iterator(chunk_size=batch_size):
+        contributor_downloads[contributor_id] += policy_downloads[policy_id]
+        contributor_policies[contributor_id] += 1
+    Contributor.objects.bulk_update([
+        Contributor(pk=pk, download_count=contributor_downloads[pk], policy_count=contributor_policies[pk])
+        for pk in contributor_ids
+    ], ['download_count', 'policy_count'], batch_size=batch_size)
+
+    bump_generation(CATALOG)
+    bump_generation(DOWNLOADS)
+    return dict(created)
+
+
+# Replay
+
+def query_mix(count, seed=42):
+    """Return a reproducible list of ``(endpoint, params)`` pairs."""
+    rng = random.Random(seed)
+    tag_names = list(Tag.objects.order_by('pk').values_list('name', flat=True)[:50]) or ['']
+    contributors = list(Contributor.objects.order_by('-download_count').values_list('name', flat=True)[:20]) or ['']
+    search_orders = ['-relevance', '-download_count', '-updated_at', 'name']
+
+    def search():
+        params = {'keywords': ' '.join(rng.sample(WORDS, rng.choice([1, 1, 1, 2]))),
+                  'order_by': rng.choice(search_orders)}
+        if rng.random() < 0.3:
+            params['tags'] = ','.join(rng.sample(tag_names, min(rng.randint(1, 3), len(tag_names))))
+        if rng.random() < 0.2:
+            params['contributor'] = rng.choice(contributors)
+        if rng.random() < 0.1:
+            params['fuzzy'] = 'true'
+        if rng.random() < 0.2:
+            params['page'] = rng.randint(2, 20)
+        return params
+
+    def policies():
+        params = {}
+        if rng.random() < 0.4:
+            params['tags'] = rng.choice(tag_names)
+        if rng.random() < 0.3:
+            params['contributor'] = rng.choice(contributors)
+        if rng.random() < 0.3:
+            params['page'] = rng.randint(2, 50)
+        return params
+
+    def tags():
+        return {'page': rng.randint(1, 5)}
+
+    generators = {'search': search, 'policies': policies, 'tags': tags}
+    weights = {'search': 6, 'policies': 3, 'tags': 1}
+    endpoints = rng.choices(list(weights), weights=list(weights.values()), k=count)
+    return [(endpoint, generators[endpoint]()) for endpoint in endpoints]
+
+
+def get_views():
+    """The list views exercised by the benchmark, keyed by endpoint name."""
+    from apps.policies.viewsets import PolicyViewSet, SearchViewSet, TagsViewSet
+    return {
+        'search': SearchViewSet.as_view({'get': 'list'}),
+        'policies': PolicyViewSet.as_view({'get': 'list'}),
+        'tags': TagsViewSet.as_view({'get': 'list'}),
+    }
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(samples):
+    """Reduce ``[(seconds, queries, ok)]`` to latency percentiles in milliseconds."""
+    latencies = sorted(seconds * 1000 for seconds, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, ok in samples if not ok),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'queries_mean': sum(queries) / len(queries) if queries else None,
+        'queries_max': max(queries) if queries else None,
+    }
+
+
+def run_benchmark(requests=1000, warmup=20, seed=42, cold=True):
+    """
+    Replay the query mix and return per-endpoint latency and query counts.
+    With ``cold`` the result caches are invalidated before every request so
+    the numbers reflect the database work.
+    """
+    views = get_views()
+    factory = RequestFactory()
+    mix = query_mix(warmup + requests, seed)
+    samples = {endpoint: [] for endpoint in views}
+
+    for n, (endpoint, params) in enumerate(mix):
+        if cold:
+            bump_generation(CATALOG)
+        request = factory.get(f'/api/v3/{endpoint}/', params)
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            try:
+                response = views[endpoint](request)
+                response.render()
+                ok = response.status_code < 500
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+        if n >= warmup:
+            samples[endpoint].append((elapsed, len(queries.captured_queries), ok))
+
+    return {endpoint: summarize(endpoint_samples) for endpoint, endpoint_samples in samples.items()}
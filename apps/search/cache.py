@@ -0,0 +1,101 @@
+"""
+Search result page cache.
+
+Rendered search pages are cached under a canonical form of the query, so
+``?keywords=HTTPD&tags=web,selinux`` and ``?tags=selinux,web&keywords=httpd``
+share an entry. Every key embeds generation counters that are bumped when
+the catalog, download counts or ratings change, which retires all older entries
+at once without tracking which queries a change affects. Entries also expire
+after ``YSEAL_SEARCH_CACHE_TTL`` seconds as an upper bound on staleness.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_PREFIX = 'search:generation'
+RESULTS_PREFIX = 'search:results'
+
+# Catalog: policies, versions, tags and contributors. Downloads: download counts.
+# Feedback: rating and vote summaries.
+CATALOG = 'catalog'
+DOWNLOADS = 'downloads'
+FEEDBACK = 'feedback'
+
+# Query parameters that select or render a page of search results
+RESULT_PARAMS = (
+    'keywords', 'contributor', 'tags', 'is_deprecated', 'fuzzy',
+    'order_by', 'facets', 'page', 'limit', 'cursor', 'count',
+)
+
+# Parameters the search matches case-insensitively; the rest, such as
+# contributor (an exact name match), keep their case in the key
+CASE_INSENSITIVE_PARAMS = ('keywords', 'tags', 'is_deprecated', 'fuzzy', 'count')
+
+
+def get_generation(name):
+    """Return the current value of a generation counter."""
+    key = f'{GENERATION_PREFIX}:{name}'
+    generation = cache.get(key)
+    if generation is None:
+        # add() so concurrent first readers agree on the starting value
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def bump_generation(name):
+    """Invalidate every cached entry that depends on a generation counter."""
+    key = f'{GENERATION_PREFIX}:{name}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def schedule_bump(*names):
+    """Bump generation counters once the current transaction commits."""
+    transaction.on_commit(lambda: [bump_generation(name) for name in names])
+
+
+def normalize_params(params, names=RESULT_PARAMS):
+    """
+    Return the canonical ``name=value`` form of the query parameters:
+    whitespace folded, case folded where the search ignores it, tag and facet
+    lists sorted, flags as booleans.
+    """
+    parts = []
+    for name in names:
+        value = ' '.join(str(params.get(name, '')).split())
+        if name in CASE_INSENSITIVE_PARAMS:
+            value = value.lower()
+        if name == 'cursor':
+            # Cursors are opaque and case-sensitive, and an empty one selects keyset mode
+            value = params[name] if name in params else '-'
+        elif name in ('tags', 'facets'):
+            value = ','.join(sorted({v.strip() for v in value.split(',') if v.strip()}))
+        elif name in ('is_deprecated', 'fuzzy', 'count') and value:
+            value = str(value in ('1', 'true', 'yes', 'on'))
+        elif name == 'page' and value == '1':
+            value = ''
+        parts.append(f'{name}={value}')
+    return '&'.join(parts)
+
+
+def results_key(request):
+    """Cache key for a search result page under the current generations."""
+    canonical = normalize_params(request.query_params)
+    # Pagination links are absolute, so the host is part of the page
+    canonical += f'&host={request.get_host()}'
+    digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+    generations = ':'.join(str(get_generation(name)) for name in (CATALOG, DOWNLOADS, FEEDBACK))
+    return f'{RESULTS_PREFIX}:{generations}:{digest}'
+
+
+def get_results(key):
+    return cache.get(key)
+
+
+def set_results(key, data):
+    cache.set(key, data, settings.YSEAL_SEARCH_CACHE_TTL)
@@ -0,0 +1,125 @@
+"""
+Facet counts for search results.
+
+Tag, contributor and deprecation counts for a filtered result set come from
+one ``UNION ALL`` of grouped queries over the matching policy ids, instead of
+one COUNT per facet value. Supported systems live in an array (PostgreSQL)
+or JSON (SQLite) column on the latest version, so they are counted by
+expanding that column in SQL with ``unnest`` or ``json_each``. Results are
+cached per normalized query until the catalog changes.
+"""
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast
+
+from apps.policies.models import USE_POSTGRES, Policy, PolicyVersion
+from .cache import CATALOG, get_generation, normalize_params
+
+FACETS = ('tags', 'contributor', 'supported_systems', 'is_deprecated')
+
+# Query parameters that change the result set, and therefore the facet counts
+QUERY_PARAMS = ('keywords', 'contributor', 'tags', 'is_deprecated', 'fuzzy')
+
+CACHE_PREFIX = 'search:facets'
+
+
+def parse_facets(value):
+    """Return the known facet names requested in a ``?facets=`` value, in order."""
+    requested = [name.strip() for name in (value or '').split(',')]
+    return [name for name in FACETS if name in requested]
+
+
+def cache_key(params, facets):
+    """Build a cache key from the normalized query under the catalog generation."""
+    canonical = normalize_params(params, QUERY_PARAMS) + '&facets=' + ','.join(facets)
+    digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+    return f'{CACHE_PREFIX}:{get_generation(CATALOG)}:{digest}'
+
+
+def _grouped(queryset, facet, field):
+    return queryset.order_by().annotate(
+        facet=Value(facet, output_field=CharField()),
+        value=Cast(field, output_field=CharField()),
+    ).values('facet', 'value').annotate(count=Count('*'))
+
+
+def _relational_counts(policy_ids, facets):
+    """Count tags, contributors and deprecation in a single grouped query."""
+    branches = []
+    if 'tags' in facets:
+        through = Policy.tags.through.objects.filter(policy_id__in=policy_ids)
+        branches.append(_grouped(through, 'tags', F('tag__name')))
+    if 'contributor' in facets:
+        policies = Policy.objects.filter(pk__in=policy_ids)
+        branches.append(_grouped(policies, 'contributor', F('contributor__name')))
+    if 'is_deprecated' in facets:
+        policies = Policy.objects.filter(pk__in=policy_ids)
+        branches.append(_grouped(policies, 'is_deprecated', F('is_deprecated')))
+    if not branches:
+        return {}
+
+    queryset = branches[0].union(*branches[1:], all=True) if len(branches) > 1 else branches[0]
+    counts = {}
+    for row in queryset:
+        value = row['value']
+        if row['facet'] == 'is_deprecated':
+            # Booleans come back as '1'/'0' or 'true'/'false' depending on the backend
+            value = value.lower() in ('1', 'true', 't')
+        counts.setdefault(row['facet'], Counter())[value] += row['count']
+    return counts
+
+
+def _supported_systems_counts(policy_ids):
+    """Count policies whose latest version supports each system, grouped in the database."""
+    latest = Policy.objects.filter(pk__in=policy_ids, latest_version__isnull=False).values('latest_version_id')
+    latest_sql, params = latest.query.sql_with_params()
+    if USE_POSTGRES:
+        expand, system = 'unnest(v.supported_systems) AS s(system)', 's.system'
+    else:
+        expand, system = 'json_each(v.supported_systems) AS s', 's.value'
+    table = connection.ops.quote_name(PolicyVersion._meta.db_table)
+    # DISTINCT ids, so a system listed twice on one version counts once
+    sql = (
+        f'SELECT {system}, COUNT(DISTINCT v.id) FROM {table} v, {expand} '
+        f'WHERE v.id IN ({latest_sql}) GROUP BY {system}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return Counter({value: count for value, count in cursor.fetchall() if value is not None})
+
+
+def compute_facets(queryset, facets):
+    """
+    Return ``{facet: [{'value', 'count'}, ...]}`` for a filtered policy queryset.
+    Values are ordered by count, most frequent first.
+    """
+    policy_ids = queryset.order_by().values('pk')
+    counts = _relational_counts(policy_ids, facets)
+    if 'supported_systems' in facets:
+        counts['supported_systems'] = _supported_systems_counts(policy_ids)
+
+    limit = settings.YSEAL_SEARCH_FACET_LIMIT
+    return {
+        name: [
+            {'value': value, 'count': count}
+            for value, count in sorted(
+                counts.get(name, {}).items(), key=lambda item: (-item[1], str(item[0]))
+            )[:limit]
+        ]
+        for name in facets
+    }
+
+
+def get_facets(queryset, params, facets):
+    """Return facet counts for a search, served from the cache when possible."""
+    key = cache_key(params, facets)
+    result = cache.get(key)
+    if result is None:
+        result = compute_facets(queryset, facets)
+        cache.set(key, result, settings.YSEAL_SEARCH_FACET_CACHE_TTL)
+    return result
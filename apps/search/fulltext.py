@@ -0,0 +1,89 @@
+"""
+PostgreSQL full-text search for policies.
+
+Each policy carries a weighted ``search_vector`` (name and display name
+weigh most, then tags, description and README) that is kept current by the
+signal handlers in ``apps.search.signals``. Queries hit the GIN index on that
+column and are ranked with ``ts_rank_cd``.
+"""
+import re
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery, Value
+
+from apps.policies.models import USE_POSTGRES, Policy
+
+if USE_POSTGRES:
+    from django.contrib.postgres.aggregates import StringAgg
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+# Fields that feed the search vector; saves touching none of them skip reindexing
+INDEXED_FIELDS = frozenset(['name', 'display_name', 'description', 'readme'])
+
+# Keep only word characters from user input so it is always a valid tsquery
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# ts_rank_cd normalization 32 scales ranks into the 0..1 range
+RANK_NORMALIZATION = 32
+
+
+def search_vector_expression(model=Policy):
+    """Build the weighted tsvector expression for a policy row."""
+    config = settings.YSEAL_SEARCH_CONFIG
+    tag_model = model._meta.get_field('tags').related_model
+    tag_names = tag_model.objects.filter(
+        policies=OuterRef('pk')
+    ).order_by().values('policies').annotate(
+        names=StringAgg('name', delimiter=' ')
+    ).values('names')
+
+    return (
+        SearchVector('name', weight='A', config=config) +
+        SearchVector('display_name', weight='A', config=config) +
+        SearchVector(Subquery(tag_names), weight='B', config=config) +
+        SearchVector('description', weight='C', config=config) +
+        SearchVector('readme', weight='D', config=config)
+    )
+
+
+def update_search_vectors(policy_ids, model=Policy):
+    """Recompute the search vector for the given policies in a single UPDATE."""
+    if not USE_POSTGRES:
+        return 0
+    policy_ids = list(policy_ids)
+    if not policy_ids:
+        return 0
+    return model.objects.filter(pk__in=policy_ids).update(
+        search_vector=search_vector_expression(model)
+    )
+
+
+def build_query(keywords):
+    """
+    Turn free-text keywords into a prefix-matching tsquery.
+    Every term must match, and the last one may be a partial word so
+    results keep up with the user typing.
+    Returns None when the keywords contain no searchable terms.
+    """
+    terms = TOKEN_RE.findall(keywords)
+    if not terms:
+        return None
+    raw = ' & '.join(f'{term}:*' for term in terms)
+    return SearchQuery(raw, search_type='raw', config=settings.YSEAL_SEARCH_CONFIG)
+
+
+def fulltext_search(queryset, keywords):
+    """
+    Filter a policy queryset by keywords and annotate ``relevance``.
+    The ``@@`` match is served by the GIN index on ``search_vector``.
+    """
+    query = build_query(keywords)
+    if query is None:
+        return queryset.none()
+    return queryset.defer('search_vector').filter(search_vector=query).annotate(
+        relevance=SearchRank(
+            F('search_vector'), query,
+            cover_density=True,
+            normalization=Value(RANK_NORMALIZATION),
+        )
+    )
@@ -0,0 +1,434 @@
+"""
+In-process inverted index with BM25 ranking.
+
+The index lives in two files next to each other:
+
+- a read-only *segment* (``policies.idx``) holding the sorted term
+  dictionary, postings and document lengths as flat arrays. Every worker
+  memory-maps it, so the catalog is shared through the page cache instead of
+  being loaded into each process.
+- an append-only *journal* (``policies.<generation>.log``) of JSON lines with
+  documents added, changed or removed since the segment was written. Workers
+  replay new journal lines into a small in-memory overlay before each query.
+
+Once the journal grows past ``journal_limit`` entries it is folded into a new
+segment generation. Writers serialize through an ``flock`` on a lock file;
+readers never lock and notice a new generation by the segment's inode.
+
+The arrays use native byte order, the magic number records which one so a
+segment copied to a different architecture is rebuilt rather than misread.
+"""
+import fcntl
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from operator import itemgetter
+
+MAGIC = b'YSB' + (b'L' if sys.byteorder == 'little' else b'B')
+
+# magic, generation, doc_count, term_count, posting_count, padding, total_length
+HEADER = struct.Struct('<4sIIIIIQ')
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOPWORDS = frozenset([
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'with',
+])
+
+# Term frequencies are stored as uint16
+MAX_TF = 0xFFFF
+
+# Upper bound on dictionary terms a trailing partial word may expand to
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text):
+    """Split text into lowercase index terms."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class Segment:
+    """Read-only view over a memory-mapped segment file."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as fh:
+            stat = os.fstat(fh.fileno())
+            self.inode = (stat.st_dev, stat.st_ino)
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, self.generation, self.doc_count, self.term_count,
+         posting_count, _, self.total_length) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a search index segment')
+
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+
+        def take(typecode, count):
+            nonlocal offset
+            size = array(typecode).itemsize * count
+            chunk = view[offset:offset + size].cast(typecode)
+            offset += size
+            return chunk
+
+        self.doc_ids = take('I', self.doc_count)
+        self.doc_lengths = take('I', self.doc_count)
+        self._term_offsets = take('I', self.term_count + 1)
+        self._posting_offsets = take('I', self.term_count + 1)
+        self._posting_docs = take('I', posting_count)
+        self._posting_tfs = take('H', posting_count)
+        self._strings = offset
+
+    def term(self, i):
+        start = self._strings + self._term_offsets[i]
+        end = self._strings + self._term_offsets[i + 1]
+        return self._mmap[start:end]
+
+    def _bisect(self, key):
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, term):
+        """Return the dictionary position of a term, or None."""
+        key = term.encode()
+        i = self._bisect(key)
+        if i < self.term_count and self.term(i) == key:
+            return i
+        return None
+
+    def prefixed(self, prefix, limit):
+        """Yield terms starting with ``prefix`` in dictionary order."""
+        key = prefix.encode()
+        i = self._bisect(key)
+        while i < self.term_count and limit > 0:
+            term = self.term(i)
+            if not term.startswith(key):
+                break
+            yield term.decode()
+            i += 1
+            limit -= 1
+
+    def postings(self, i):
+        """Yield ``(doc_position, tf)`` pairs for the term at position ``i``."""
+        start, end = self._posting_offsets[i], self._posting_offsets[i + 1]
+        return zip(self._posting_docs[start:end], self._posting_tfs[start:end])
+
+    def position(self, doc_id):
+        """Return a document's position in the segment, or None."""
+        lo, hi = 0, self.doc_count
+        ids = self.doc_ids
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[mid] < doc_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.doc_count and ids[lo] == doc_id:
+            return lo
+        return None
+
+    def documents(self):
+        """Rebuild ``{doc_id: Counter}`` for every document (used for compaction)."""
+        docs = {doc_id: Counter() for doc_id in self.doc_ids}
+        for i in range(self.term_count):
+            term = self.term(i).decode()
+            for position, tf in self.postings(i):
+                docs[self.doc_ids[position]][term] = tf
+        return docs
+
+
+def write_segment(path, documents, generation):
+    """Write ``{doc_id: Counter}`` as a new segment, atomically replacing ``path``."""
+    doc_ids = sorted(documents)
+    positions = {doc_id: i for i, doc_id in enumerate(doc_ids)}
+    lengths = [sum(documents[doc_id].values()) for doc_id in doc_ids]
+
+    inverted = {}
+    for doc_id in doc_ids:
+        position = positions[doc_id]
+        for term, tf in documents[doc_id].items():
+            inverted.setdefault(term.encode(), []).append((position, min(tf, MAX_TF)))
+    terms = sorted(inverted)
+
+    term_offsets = array('I', [0])
+    posting_offsets = array('I', [0])
+    posting_docs = array('I')
+    posting_tfs = array('H')
+    strings = bytearray()
+    for term in terms:
+        strings += term
+        term_offsets.append(len(strings))
+        for position, tf in inverted[term]:
+            posting_docs.append(position)
+            posting_tfs.append(tf)
+        posting_offsets.append(len(posting_docs))
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(HEADER.pack(
+            MAGIC, generation, len(doc_ids), len(terms), len(posting_docs), 0, sum(lengths)
+        ))
+        for arr in (array('I', doc_ids), array('I', lengths), term_offsets,
+                    posting_offsets, posting_docs, posting_tfs):
+            arr.tofile(fh)
+        fh.write(strings)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+class InvertedIndex:
+    """
+    BM25-ranked keyword index over integer document ids.
+    Instances are cheap and per-process; all state is shared through files.
+    """
+
+    def __init__(self, path, k1=1.2, b=0.75, journal_limit=1000):
+        self.path = str(path)
+        self.k1 = k1
+        self.b = b
+        self.journal_limit = journal_limit
+        self._segment = None
+        self._journal_offset = 0
+        self._reset_overlay()
+        self._lock = threading.Lock()
+
+    # Files
+
+    def _journal_path(self, generation):
+        base, _ = os.path.splitext(self.path)
+        return f'{base}.{generation}.log'
+
+    def _write_lock(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fh = open(f'{self.path}.lock', 'a')
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        return fh
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    # Overlay
+
+    def _reset_overlay(self):
+        self._overlay = {}
+        self._overlay_lengths = {}
+        self._overlay_postings = {}
+        self._overridden = set()
+        self._overlay_length = 0
+        self._overridden_length = 0
+
+    def _apply(self, doc_id, terms):
+        previous = self._overlay.get(doc_id)
+        if previous:
+            self._overlay_length -= sum(previous.values())
+            for term in previous:
+                self._overlay_postings[term].pop(doc_id, None)
+
+        position = self._segment.position(doc_id) if self._segment else None
+        if position is not None and position not in self._overridden:
+            self._overridden.add(position)
+            self._overridden_length += self._segment.doc_lengths[position]
+
+        self._overlay[doc_id] = terms
+        self._overlay_lengths[doc_id] = sum(terms.values()) if terms else 0
+        if terms:
+            self._overlay_length += self._overlay_lengths[doc_id]
+            for term, tf in terms.items():
+                self._overlay_postings.setdefault(term, {})[doc_id] = tf
+
+    def refresh(self):
+        """Pick up a new segment generation and replay unseen journal lines."""
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                self._segment = None
+                self._reset_overlay()
+                return False
+
+            if self._segment is None or self._segment.inode != (stat.st_dev, stat.st_ino):
+                try:
+                    self._segment = Segment(self.path)
+                except ValueError:
+                    self._segment = None
+                    self._reset_overlay()
+                    return False
+                self._journal_offset = 0
+                self._reset_overlay()
+
+            journal_path = self._journal_path(self._segment.generation)
+            try:
+                with open(journal_path, 'rb') as fh:
+                    fh.seek(self._journal_offset)
+                    for line in fh:
+                        if not line.endswith(b'\n'):
+                            break
+                        self._journal_offset += len(line)
+                        entry = json.loads(line)
+                        terms = entry.get('t')
+                        self._apply(entry['d'], Counter(terms) if terms is not None else None)
+            except FileNotFoundError:
+                pass
+            return True
+
+    # Statistics
+
+    def _stats(self):
+        segment = self._segment
+        live_overlay = sum(1 for terms in self._overlay.values() if terms is not None)
+        doc_count = segment.doc_count - len(self._overridden) + live_overlay
+        total = segment.total_length - self._overridden_length + self._overlay_length
+        return doc_count, (total / doc_count) if doc_count else 0.0
+
+    def __len__(self):
+        if not self.refresh():
+            return 0
+        return self._stats()[0]
+
+    # Querying
+
+    def _postings(self, term):
+        """Return ``{doc_id: (tf, doc_length)}`` for a term across segment and overlay."""
+        result = {}
+        segment = self._segment
+        i = segment.find(term)
+        if i is not None:
+            overridden = self._overridden
+            ids, lengths = segment.doc_ids, segment.doc_lengths
+            for position, tf in segment.postings(i):
+                if position not in overridden:
+                    result[ids[position]] = (tf, lengths[position])
+        for doc_id, tf in self._overlay_postings.get(term, {}).items():
+            result[doc_id] = (tf, self._overlay_lengths[doc_id])
+        return result
+
+    def _expand(self, prefix):
+        terms = set(self._segment.prefixed(prefix, MAX_PREFIX_EXPANSIONS))
+        terms.update(t for t, docs in self._overlay_postings.items() if docs and t.startswith(prefix))
+        return terms or {prefix}
+
+    def search(self, text, limit=100):
+        """
+        Return up to ``limit`` ``(doc_id, score)`` pairs (all when None), best first.
+        Every query term must match; the last one also matches as a prefix.
+        """
+        terms = list(dict.fromkeys(tokenize(text)))
+        if not terms or not self.refresh():
+            return []
+
+        doc_count, avgdl = self._stats()
+        if not doc_count:
+            return []
+        k1, b = self.k1, self.b
+
+        scores = None
+        for n, term in enumerate(terms):
+            expansions = self._expand(term) if n == len(terms) - 1 else (term,)
+            term_scores = {}
+            for expansion in expansions:
+                postings = self._postings(expansion)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for doc_id, (tf, length) in postings.items():
+                    if scores is not None and doc_id not in scores:
+                        continue
+                    score = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avgdl))
+                    if score > term_scores.get(doc_id, 0.0):
+                        term_scores[doc_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in term_scores.items()}
+            if not scores:
+                return []
+
+        if limit is None:
+            return sorted(scores.items(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+
+    # Writing
+
+    def _current_generation(self):
+        try:
+            with open(self.path, 'rb') as fh:
+                magic, generation = HEADER.unpack(fh.read(HEADER.size))[:2]
+            return generation if magic == MAGIC else None
+        except (FileNotFoundError, struct.error):
+            return None
+
+    def update(self, documents):
+        """
+        Record changed documents, given as ``{doc_id: Counter}``.
+        A value of None removes the document from the index.
+        """
+        if not documents:
+            return
+        with self._write_lock():
+            generation = self._current_generation()
+            if generation is None:
+                return
+            journal_path = self._journal_path(generation)
+            with open(journal_path, 'ab') as fh:
+                for doc_id, terms in documents.items():
+                    entry = {'d': doc_id}
+                    if terms is not None:
+                        entry['t'] = dict(terms)
+                    fh.write(json.dumps(entry, separators=(',', ':')).encode() + b'\n')
+                fh.flush()
+                size = fh.tell()
+
+            if size and self._journal_lines(journal_path) > self.journal_limit:
+                self._compact(generation)
+
+    def _journal_lines(self, journal_path):
+        with open(journal_path, 'rb') as fh:
+            return sum(1 for _ in fh)
+
+    def _compact(self, generation):
+        """Fold the journal into a new segment. Caller holds the write lock."""
+        segment = Segment(self.path)
+        documents = segment.documents()
+        with open(self._journal_path(generation), 'rb') as fh:
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    break
+                entry = json.loads(line)
+                if entry.get('t') is None:
+                    documents.pop(entry['d'], None)
+                else:
+                    documents[entry['d']] = Counter(entry['t'])
+        self._publish(documents, generation + 1, previous=generation)
+
+    def _publish(self, documents, generation, previous=None):
+        open(self._journal_path(generation), 'wb').close()
+        write_segment(self.path, documents, generation)
+        if previous is not None:
+            try:
+                os.remove(self._journal_path(previous))
+            except FileNotFoundError:
+                pass
+
+    def rebuild(self, documents):
+        """Replace the whole index with ``{doc_id: Counter}``."""
+        with self._write_lock():
+            previous = self._current_generation()
+            generation = (previous or 0) + 1
+            self._publish(documents, generation, previous=previous)
@@ -0,0 +1,139 @@
+"""
+BM25 keyword search for deployments without PostgreSQL.
+
+Policies are indexed into the memory-mapped ``InvertedIndex`` (see
+``apps.search.index``). Signal handlers queue changed policies and the index
+is updated once the surrounding transaction commits. When the index file is
+missing it is rebuilt by the ``rebuild_keyword_index`` Celery task, and
+searches fall back to substring matching until it is ready.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+
+from apps.policies.models import Policy
+from .index import InvertedIndex, tokenize
+from .utils import annotate_top_relevance
+
+# Term frequency multipliers per field, a lightweight BM25F
+FIELD_BOOSTS = (
+    ('name', 3),
+    ('display_name', 3),
+    ('tags', 2),
+    ('description', 1),
+    ('readme', 1),
+    ('changelog', 1),
+)
+
+REBUILD_LOCK_KEY = 'search:keyword:rebuild'
+# Seconds a queued rebuild keeps others from being queued
+REBUILD_LOCK_TIMEOUT = 10 * 60
+
+_index = None
+
+
+def get_index():
+    """Return this process's handle on the shared keyword index."""
+    global _index
+    if _index is None:
+        _index = InvertedIndex(
+            settings.YSEAL_SEARCH_INDEX_PATH,
+            journal_limit=settings.YSEAL_SEARCH_INDEX_JOURNAL_LIMIT,
+        )
+    return _index
+
+
+def policy_document(policy, changelog=''):
+    """Build the term frequency table for a policy."""
+    fields = {
+        'name': policy.name,
+        'display_name': policy.display_name,
+        'tags': ' '.join(tag.name for tag in policy.tags.all()),
+        'description': policy.description,
+        'readme': policy.readme,
+        'changelog': changelog,
+    }
+    terms = Counter()
+    for field, boost in FIELD_BOOSTS:
+        for term in tokenize(fields[field] or ''):
+            terms[term] += boost
+    return terms
+
+
+def build_documents(policy_ids=None):
+    """Return ``{policy_id: Counter}`` for the given policies (all when None)."""
+    policies = Policy.objects.prefetch_related('tags').annotate(
+        latest_changelog=F('latest_version__changelog')
+    ).order_by('pk')
+    if policy_ids is not None:
+        policies = policies.filter(pk__in=policy_ids)
+
+    return {
+        policy.pk: policy_document(policy, policy.latest_changelog or '')
+        for policy in policies.iterator(chunk_size=500)
+    }
+
+
+def rebuild_index():
+    """Index the whole catalog into a new segment."""
+    documents = build_documents()
+    get_index().rebuild(documents)
+    return len(documents)
+
+
+def schedule_rebuild():
+    """Queue a background rebuild of the index unless one is already queued."""
+    from .tasks import rebuild_keyword_index
+
+    if cache.add(REBUILD_LOCK_KEY, 1, REBUILD_LOCK_TIMEOUT):
+        rebuild_keyword_index.delay()
+
+
+def index_policies(policy_ids):
+    """Write the current state of the given policies to the index journal."""
+    index = get_index()
+    if not index.exists():
+        # The rebuild reads every policy, these included
+        schedule_rebuild()
+        return
+    documents = build_documents(policy_ids)
+    for policy_id in policy_ids:
+        documents.setdefault(policy_id, None)
+    index.update(documents)
+
+
+def schedule_index(policy_ids):
+    """Reindex policies once the current transaction commits."""
+    policy_ids = sorted({pk for pk in policy_ids if pk is not None})
+    if policy_ids:
+        transaction.on_commit(lambda: index_policies(policy_ids))
+
+
+def keyword_search(queryset, keywords):
+    """
+    Filter a policy queryset by keywords, annotating BM25 ``relevance``.
+    Apply the request's filters to ``queryset`` first: the best
+    ``YSEAL_SEARCH_MAX_RESULTS`` are picked among the policies it matches,
+    not among the whole catalog.
+    """
+    index = get_index()
+    if not index.exists():
+        schedule_rebuild()
+        return substring_search(queryset, keywords)
+    limit = settings.YSEAL_SEARCH_MAX_RESULTS
+    # The whole ranking is only needed when filters may drop some of it
+    ranked = index.search(keywords, limit=None if queryset.query.has_filters() else limit)
+    return annotate_top_relevance(queryset, ranked, limit)
+
+
+def substring_search(queryset, keywords):
+    """Unranked matching used while the index is being built."""
+    return queryset.filter(
+        Q(name__icontains=keywords) |
+        Q(description__icontains=keywords) |
+        Q(contributor__name__icontains=keywords) |
+        Q(tags__name__icontains=keywords)
+    ).distinct()
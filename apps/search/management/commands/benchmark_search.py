@@ -0,0 +1,69 @@
+"""
+Management command to replay a search query mix and report latencies.
+"""
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from apps.policies.models import Policy, PolicyVersion, DownloadLog
+from apps.search.benchmark import run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the search, policy list and tag list endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Measured requests across all endpoints')
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--warm', action='store_true', help='Keep result caches between requests')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--json', action='store_true', help='Print the JSON report instead of a table')
+
+    def handle(self, *args, **options):
+        endpoints = run_benchmark(
+            requests=options['requests'],
+            warmup=options['warmup'],
+            seed=options['seed'],
+            cold=not options['warm'],
+        )
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'environment': {
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+            },
+            'corpus': {
+                'policies': Policy.objects.count(),
+                'versions': PolicyVersion.objects.count(),
+                'downloads': DownloadLog.objects.count(),
+            },
+            'options': {
+                'requests': options['requests'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+                'cache': 'warm' if options['warm'] else 'cold',
+            },
+            'endpoints': endpoints,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"{'endpoint':<10} {'requests':>8} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} "
+                          f"{'p99 ms':>9} {'queries':>8}")
+        for endpoint, stats in endpoints.items():
+            if not stats['requests']:
+                continue
+            self.stdout.write(
+                f"{endpoint:<10} {stats['requests']:>8} {stats['errors']:>6} {stats['p50_ms']:>9.2f} "
+                f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['queries_mean']:>8.1f}"
+            )
@@ -0,0 +1,45 @@
+"""
+Management command to load the synthetic search benchmark catalog.
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from apps.search.benchmark import clear_corpus, generate_corpus
+
+
+class Command(BaseCommand):
+    help = 'Generate a reproducible synthetic policy catalog for search benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policies', type=int, default=100000)
+        parser.add_argument('--versions', type=int, default=1000000, help='Approximate total versions')
+        parser.add_argument('--downloads', type=int, default=10000000)
+        parser.add_argument('--contributors', type=int, default=500)
+        parser.add_argument('--tags', type=int, default=300)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help='Delete an existing benchmark catalog first')
+        parser.add_argument('--skip-index', action='store_true', help='Do not rebuild the search indexes')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            self.stdout.write('Removing existing benchmark catalog...')
+            clear_corpus()
+
+        created = generate_corpus(
+            policies=options['policies'],
+            versions=options['versions'],
+            downloads=options['downloads'],
+            contributors=options['contributors'],
+            tags=options['tags'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+
+        if not options['skip_index']:
+            # bulk_create bypasses the signals that maintain the search indexes
+            self.stdout.write('Rebuilding search indexes...')
+            call_command('rebuild_search_index', batch_size=options['batch_size'], stdout=self.stdout)
+
+        summary = ', '.join(f'{count} {table}' for table, count in created.items())
+        self.stdout.write(self.style.SUCCESS(f'Benchmark catalog ready: {summary}'))
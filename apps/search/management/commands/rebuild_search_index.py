@@ -0,0 +1,46 @@
+"""
+Management command to rebuild the policy search index from scratch.
+"""
+from django.core.management.base import BaseCommand
+from apps.policies.models import USE_POSTGRES, Policy, PolicyFile
+from apps.search.fulltext import update_search_vectors
+from apps.search.keyword import rebuild_index
+from apps.search.suggest import rebuild_suggestions
+from apps.search.symbols import index_files
+from apps.search.trigram import rebuild_trigrams
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the policy search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Policies updated per statement')
+
+    def handle(self, *args, **options):
+        if not rebuild_suggestions():
+            self.stderr.write(self.style.WARNING('Suggestion index is locked by another worker; not rebuilt'))
+        self.rebuild_symbols(options['batch_size'])
+        
+        if not USE_POSTGRES:
+            count = rebuild_index()
+            rebuild_trigrams()
+            self.stdout.write(self.style.SUCCESS(f'Built keyword and trigram indexes for {count} policies'))
+            return
+
+        batch_size = options['batch_size']
+        policy_ids = list(Policy.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(policy_ids), batch_size):
+            update_search_vectors(policy_ids[start:start + batch_size])
+
+        self.stdout.write(self.style.SUCCESS(f'Reindexed {len(policy_ids)} policies'))
+
+    def rebuild_symbols(self, batch_size):
+        """Re-extract the symbol table from every policy file."""
+        files = PolicyFile.objects.select_related('version', 'blob').order_by('pk')
+        batch = []
+        for policy_file in files.iterator(chunk_size=batch_size):
+            batch.append(policy_file)
+            if len(batch) >= batch_size:
+                index_files(batch)
+                batch = []
+        index_files(batch)
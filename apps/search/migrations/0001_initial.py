@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:00
+
+import os
+
+from django.db import migrations, models
+
+USE_POSTGRES = os.getenv('USE_POSTGRES', 'False') == 'True'
+
+
+def populate_trigrams(apps, schema_editor):
+    """Index the names that already exist (pg_trgm handles PostgreSQL)."""
+    if USE_POSTGRES:
+        return
+    from apps.search.trigram import trigrams
+
+    TrigramPosting = apps.get_model('search', 'TrigramPosting')
+    sources = [
+        ('policy_name', apps.get_model('policies', 'Policy'), 'name'),
+        ('policy_display_name', apps.get_model('policies', 'Policy'), 'display_name'),
+        ('contributor_name', apps.get_model('contributors', 'Contributor'), 'name'),
+        ('tag_name', apps.get_model('policies', 'Tag'), 'name'),
+    ]
+    postings = []
+    for source, model, field in sources:
+        for object_id, text in model.objects.values_list('pk', field).iterator():
+            grams = trigrams(text or '')
+            postings.extend(
+                TrigramPosting(gram=gram, source=source, object_id=object_id, gram_count=len(grams))
+                for gram in grams
+            )
+    TrigramPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('contributors', '0001_initial'),
+        ('policies', '0002_policy_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrigramPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3, verbose_name='trigram')),
+                ('source', models.CharField(choices=[('policy_name', 'Policy name'), ('policy_display_name', 'Policy display name'), ('contributor_name', 'Contributor name'), ('tag_name', 'Tag name')], max_length=20, verbose_name='source')),
+                ('object_id', models.BigIntegerField(verbose_name='object ID')),
+                ('gram_count', models.PositiveSmallIntegerField(help_text='Number of distinct trigrams in the indexed name', verbose_name='trigram count')),
+            ],
+            options={
+                'verbose_name': 'trigram posting',
+                'verbose_name_plural': 'trigram postings',
+                'db_table': 'search_trigram_postings',
+                'indexes': [models.Index(fields=['gram', 'source'], name='search_trgm_gram_idx'), models.Index(fields=['source', 'object_id'], name='search_trgm_object_idx')],
+            },
+        ),
+        migrations.RunPython(populate_trigrams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_symbols(apps, schema_editor):
+    """Extract symbols from the policy files that already exist."""
+    from apps.search.symbols import extract_symbols
+
+    PolicyFile = apps.get_model('policies', 'PolicyFile')
+    PolicySymbol = apps.get_model('search', 'PolicySymbol')
+    rows = []
+    files = PolicyFile.objects.select_related('version').iterator()
+    for policy_file in files:
+        for symbol in extract_symbols(policy_file.file_type, policy_file.content):
+            rows.append(PolicySymbol(
+                name=symbol.name[:255], kind=symbol.kind, role=symbol.role, line=symbol.line,
+                file_id=policy_file.pk, version_id=policy_file.version_id,
+                policy_id=policy_file.version.policy_id,
+            ))
+    PolicySymbol.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('policies', '0003_trigram_indexes'),
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicySymbol',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='name')),
+                ('kind', models.CharField(choices=[('type', 'Type'), ('attribute', 'Attribute'), ('boolean', 'Boolean'), ('interface', 'Interface'), ('template', 'Template')], max_length=20, verbose_name='kind')),
+                ('role', models.CharField(choices=[('declaration', 'Declaration'), ('require', 'Required'), ('use', 'Use'), ('call', 'Interface call'), ('allow_source', 'Rule source'), ('allow_target', 'Rule target'), ('file_context', 'File context')], max_length=20, verbose_name='role')),
+                ('line', models.PositiveIntegerField(verbose_name='line')),
+                ('file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='symbols', to='policies.policyfile')),
+                ('policy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='symbols', to='policies.policy')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='symbols', to='policies.policyversion')),
+            ],
+            options={
+                'verbose_name': 'policy symbol',
+                'verbose_name_plural': 'policy symbols',
+                'db_table': 'search_policy_symbols',
+                'indexes': [models.Index(fields=['name', 'role'], name='search_symbol_name_idx')],
+            },
+        ),
+        migrations.RunPython(populate_symbols, migrations.RunPython.noop),
+    ]
@@ -1 +1,93 @@
-# No models for search app - it's utility-based
+"""
+Search models for ySEal.
+"""
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class TrigramPosting(models.Model):
+    """
+    Precomputed trigram postings for typo-tolerant name matching.
+    Used on SQLite, where pg_trgm is not available; one row per distinct
+    trigram of each indexed name.
+    """
+    SOURCE_CHOICES = [
+        ('policy_name', 'Policy name'),
+        ('policy_display_name', 'Policy display name'),
+        ('contributor_name', 'Contributor name'),
+        ('tag_name', 'Tag name'),
+    ]
+
+    gram = models.CharField(_('trigram'), max_length=3)
+    source = models.CharField(_('source'), max_length=20, choices=SOURCE_CHOICES)
+    object_id = models.BigIntegerField(_('object ID'))
+    gram_count = models.PositiveSmallIntegerField(
+        _('trigram count'),
+        help_text=_('Number of distinct trigrams in the indexed name')
+    )
+
+    class Meta:
+        db_table = 'search_trigram_postings'
+        verbose_name = _('trigram posting')
+        verbose_name_plural = _('trigram postings')
+        indexes = [
+            models.Index(fields=['gram', 'source'], name='search_trgm_gram_idx'),
+            models.Index(fields=['source', 'object_id'], name='search_trgm_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source}:{self.object_id} '{self.gram}'"
+
+
+class PolicySymbol(models.Model):
+    """
+    A symbol declared or used by a policy source file.
+    Populated by ``apps.search.symbols`` when files are imported.
+    """
+    KIND_CHOICES = [
+        ('type', 'Type'),
+        ('attribute', 'Attribute'),
+        ('boolean', 'Boolean'),
+        ('interface', 'Interface'),
+        ('template', 'Template'),
+    ]
+    ROLE_CHOICES = [
+        ('declaration', 'Declaration'),
+        ('require', 'Required'),
+        ('use', 'Use'),
+        ('call', 'Interface call'),
+        ('allow_source', 'Rule source'),
+        ('allow_target', 'Rule target'),
+        ('file_context', 'File context'),
+    ]
+
+    name = models.CharField(_('name'), max_length=255)
+    kind = models.CharField(_('kind'), max_length=20, choices=KIND_CHOICES)
+    role = models.CharField(_('role'), max_length=20, choices=ROLE_CHOICES)
+    line = models.PositiveIntegerField(_('line'))
+    policy = models.ForeignKey(
+        'policies.Policy',
+        on_delete=models.CASCADE,
+        related_name='symbols'
+    )
+    version = models.ForeignKey(
+        'policies.PolicyVersion',
+        on_delete=models.CASCADE,
+        related_name='symbols'
+    )
+    file = models.ForeignKey(
+        'policies.PolicyFile',
+        on_delete=models.CASCADE,
+        related_name='symbols'
+    )
+
+    class Meta:
+        db_table = 'search_policy_symbols'
+        verbose_name = _('policy symbol')
+        verbose_name_plural = _('policy symbols')
+        indexes = [
+            models.Index(fields=['name', 'role'], name='search_symbol_name_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.kind}, {self.role}) in {self.file_id}:{self.line}"
@@ -0,0 +1,180 @@
+"""
+Signals keeping the search indexes in sync with the policy catalog.
+PostgreSQL deployments maintain ``Policy.search_vector``; everything else
+feeds the in-process BM25 index.
+"""
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from apps.contributors.models import Contributor
+from apps.policies.models import USE_POSTGRES, Policy, PolicyFile, PolicyVersion, Tag
+from .cache import CATALOG, schedule_bump
+from .fulltext import INDEXED_FIELDS, update_search_vectors
+from .keyword import schedule_index
+from .suggest import schedule_update
+from .symbols import index_files
+from .trigram import index_trigrams, remove_trigrams
+
+
+def reindex(policy_ids):
+    """Refresh the search index entries of the given policies."""
+    if USE_POSTGRES:
+        update_search_vectors(policy_ids)
+    else:
+        schedule_index(policy_ids)
+
+
+@receiver(post_save, sender=Policy)
+def reindex_policy(sender, instance, update_fields=None, **kwargs):
+    """Reindex a policy when one of its indexed fields changes."""
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    reindex([instance.pk])
+
+
+@receiver(post_save, sender=Policy)
+def index_policy_trigrams(sender, instance, update_fields=None, **kwargs):
+    """Keep the policy name trigram postings current."""
+    if update_fields is None or 'name' in update_fields:
+        index_trigrams('policy_name', {instance.pk: instance.name})
+    if update_fields is None or 'display_name' in update_fields:
+        index_trigrams('policy_display_name', {instance.pk: instance.display_name})
+
+
+@receiver(post_delete, sender=Policy)
+def unindex_policy(sender, instance, **kwargs):
+    """Drop a deleted policy from the keyword and trigram indexes."""
+    if not USE_POSTGRES:
+        schedule_index([instance.pk])
+    remove_trigrams('policy_name', [instance.pk])
+    remove_trigrams('policy_display_name', [instance.pk])
+
+
+@receiver(post_save, sender=Contributor)
+def index_contributor_trigrams(sender, instance, update_fields=None, **kwargs):
+    """Keep the contributor name trigram postings current."""
+    if update_fields is None or 'name' in update_fields:
+        index_trigrams('contributor_name', {instance.pk: instance.name})
+
+
+@receiver(post_delete, sender=Contributor)
+def unindex_contributor(sender, instance, **kwargs):
+    """Drop a deleted contributor's trigram postings."""
+    remove_trigrams('contributor_name', [instance.pk])
+
+
+@receiver(m2m_changed, sender=Policy.tags.through)
+def reindex_policy_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """Reindex policies when tags are attached to or removed from them."""
+    if action == 'pre_clear' and reverse:
+        # The affected policies are unknown once the relation is cleared
+        instance._search_policy_ids = list(instance.policies.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        reindex([instance.pk])
+    elif action == 'post_clear':
+        reindex(getattr(instance, '_search_policy_ids', []))
+    else:
+        reindex(pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+def reindex_tag_policies(sender, instance, created, **kwargs):
+    """A renamed tag changes the text of every policy carrying it."""
+    index_trigrams('tag_name', {instance.pk: instance.name})
+    if not created:
+        reindex(instance.policies.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_policies(sender, instance, **kwargs):
+    """Capture the tagged policies before the M2M rows are cascaded away."""
+    instance._search_policy_ids = list(instance.policies.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def reindex_deleted_tag_policies(sender, instance, **kwargs):
+    """Drop a deleted tag's text from the policies that carried it."""
+    remove_trigrams('tag_name', [instance.pk])
+    reindex(getattr(instance, '_search_policy_ids', []))
+
+
+@receiver(post_save, sender=PolicyVersion)
+@receiver(post_delete, sender=PolicyVersion)
+def reindex_version_policy(sender, instance, **kwargs):
+    """The latest version's changelog is part of the keyword index."""
+    if not USE_POSTGRES:
+        schedule_index([instance.policy_id])
+
+
+@receiver(post_save, sender=Policy)
+@receiver(post_delete, sender=Policy)
+def update_policy_suggestions(sender, instance, update_fields=None, **kwargs):
+    """Refresh a policy's completion entry."""
+    if update_fields is not None and not {'name', 'contributor', 'download_count'}.intersection(update_fields):
+        return
+    schedule_update(policy_ids=[instance.pk])
+
+
+@receiver(m2m_changed, sender=Policy.tags.through)
+def update_tag_suggestions(sender, instance, action, reverse, pk_set, model, **kwargs):
+    """Tag popularity follows the policies carrying it."""
+    if action == 'pre_clear' and not reverse:
+        instance._suggest_tag_ids = list(instance.tags.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        schedule_update(tag_ids=[instance.pk])
+    elif action == 'post_clear':
+        schedule_update(tag_ids=getattr(instance, '_suggest_tag_ids', []))
+    else:
+        schedule_update(tag_ids=pk_set or [])
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def update_tag_suggestion(sender, instance, **kwargs):
+    """Refresh a tag's completion entry."""
+    schedule_update(tag_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Contributor)
+def update_contributor_suggestions(sender, instance, created, update_fields=None, **kwargs):
+    """Refresh a contributor's entry and relabel its policies after a rename."""
+    if update_fields is not None and not {'name', 'display_name'}.intersection(update_fields):
+        return
+    schedule_update(
+        contributor_ids=[instance.pk],
+        contributor_policies=[] if created else [instance.pk],
+    )
+
+
+@receiver(post_delete, sender=Contributor)
+def remove_contributor_suggestion(sender, instance, **kwargs):
+    """Drop a deleted contributor's completion entry."""
+    schedule_update(contributor_ids=[instance.pk])
+
+
+@receiver(post_save, sender=PolicyFile)
+def index_file_symbols(sender, instance, **kwargs):
+    """Extract the symbols declared and used by a saved policy file."""
+    index_files([instance])
+
+
+@receiver(post_save, sender=Policy)
+@receiver(post_delete, sender=Policy)
+@receiver(post_save, sender=PolicyVersion)
+@receiver(post_delete, sender=PolicyVersion)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+@receiver(m2m_changed, sender=Policy.tags.through)
+def invalidate_catalog_results(sender, action=None, **kwargs):
+    """Retire cached search pages and facets after any catalog change."""
+    if action is not None and action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    schedule_bump(CATALOG)
@@ -0,0 +1,291 @@
+"""
+Search-as-you-type suggestions.
+
+Completions for policy full names (``contributor.name``), tags and
+contributors live in a ``PrefixIndex``: a sorted key list answered with
+bisection, plus precomputed top-k lists for short prefixes where ranges are
+too wide to scan. The index is shared between workers through the cache and
+each worker keeps a local copy that is swapped out when the shared version
+counter moves, so a lookup normally costs one cache GET and a dict access.
+Saves of policies, tags and contributors update the index in Celery tasks,
+one queued task per set of changed objects.
+"""
+import hashlib
+import heapq
+import json
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+
+from apps.contributors.models import Contributor
+from apps.policies.models import Policy, Tag
+from .utils import cache_lock
+
+INDEX_KEY = 'search:suggest:index'
+VERSION_KEY = 'search:suggest:version'
+LOCK_KEY = 'search:suggest:lock'
+# Set while an update of the same objects, or a rebuild, is queued
+UPDATE_QUEUED_KEY = 'search:suggest:queued:%s'
+REBUILD_QUEUED_KEY = 'search:suggest:queued:rebuild'
+# Seconds a queued task keeps identical ones from being queued
+QUEUED_TIMEOUT = 10 * 60
+
+# Prefixes up to this length are answered from precomputed top-k lists
+PRECOMPUTED_DEPTH = 3
+
+# Keys inspected for longer prefixes before giving up on completeness
+SCAN_LIMIT = 5000
+
+
+class PrefixIndex:
+    """Popularity-weighted completions keyed by lowercase prefix."""
+
+    def __init__(self, top_k=10):
+        self.top_k = top_k
+        self.keys = []       # sorted (key, entry_id)
+        self.entries = {}    # entry_id -> (label, kind, weight, keys)
+        self.top = {}        # short prefix -> [entry_id, ...]
+
+    def _rank(self, entry_id):
+        label, _, weight, _ = self.entries[entry_id]
+        return (weight, -len(label))
+
+    def _scan(self, prefix, limit=None):
+        seen = set()
+        i = bisect_left(self.keys, (prefix,))
+        scanned = 0
+        while i < len(self.keys) and self.keys[i][0].startswith(prefix):
+            seen.add(self.keys[i][1])
+            i += 1
+            scanned += 1
+            if limit and scanned >= limit:
+                break
+        return seen
+
+    def _recompute(self, prefixes):
+        for prefix in prefixes:
+            candidates = self._scan(prefix)
+            if candidates:
+                self.top[prefix] = heapq.nlargest(self.top_k, candidates, key=self._rank)
+            else:
+                self.top.pop(prefix, None)
+
+    def _short_prefixes(self, keys):
+        return {key[:n] for key in keys for n in range(1, min(len(key), PRECOMPUTED_DEPTH) + 1)}
+
+    def put(self, entry_id, label, kind, weight, keys):
+        """Add or replace an entry."""
+        keys = sorted({k.lower() for k in keys if k})
+        affected = self._remove_keys(entry_id)
+        self.entries[entry_id] = (label, kind, weight, keys)
+        for key in keys:
+            insort(self.keys, (key, entry_id))
+        self._recompute(affected | self._short_prefixes(keys))
+
+    def remove(self, entry_id):
+        """Drop an entry if present."""
+        self._recompute(self._remove_keys(entry_id))
+
+    def _remove_keys(self, entry_id):
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return set()
+        for key in entry[3]:
+            i = bisect_left(self.keys, (key, entry_id))
+            if i < len(self.keys) and self.keys[i] == (key, entry_id):
+                del self.keys[i]
+        return self._short_prefixes(entry[3])
+
+    def complete(self, prefix, limit=None):
+        """Return up to ``limit`` ``(label, kind, weight)`` completions, best first."""
+        prefix = prefix.strip().lower()
+        limit = min(limit or self.top_k, self.top_k)
+        if not prefix:
+            return []
+        if len(prefix) <= PRECOMPUTED_DEPTH:
+            ranked = self.top.get(prefix, [])[:limit]
+        else:
+            ranked = heapq.nlargest(limit, self._scan(prefix, SCAN_LIMIT), key=self._rank)
+        return [self.entries[entry_id][:3] for entry_id in ranked]
+
+
+# Entries
+
+def _policy_entries(policies):
+    for policy in policies:
+        full_name = f"{policy.contributor.name}.{policy.name}"
+        yield f'policy:{policy.pk}', full_name, 'policy', policy.download_count, [full_name, policy.name]
+
+
+def _tag_entries(tags):
+    for tag in tags:
+        yield f'tag:{tag.pk}', tag.name, 'tag', tag.weight or 0, [tag.name]
+
+
+def _contributor_entries(contributors):
+    for contributor in contributors:
+        yield (f'contributor:{contributor.pk}', contributor.name, 'contributor',
+               contributor.weight or 0, [contributor.name, contributor.display_name])
+
+
+def _policies(ids=None, contributor_ids=None):
+    queryset = Policy.objects.select_related('contributor').only(
+        'name', 'download_count', 'contributor__name'
+    )
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    if contributor_ids is not None:
+        queryset = queryset.filter(contributor_id__in=contributor_ids)
+    return queryset
+
+
+def _tags(ids=None):
+    queryset = Tag.objects.annotate(weight=Sum('policies__download_count'))
+    return queryset if ids is None else queryset.filter(pk__in=ids)
+
+
+def _contributors(ids=None):
+    queryset = Contributor.objects.annotate(weight=Sum('policies__download_count'))
+    return queryset if ids is None else queryset.filter(pk__in=ids)
+
+
+def build_index():
+    """Build the full prefix index from the catalog."""
+    index = PrefixIndex(top_k=settings.YSEAL_SUGGEST_LIMIT)
+    sources = (
+        _policy_entries(_policies().iterator(chunk_size=1000)),
+        _tag_entries(_tags()),
+        _contributor_entries(_contributors()),
+    )
+    entries = [entry for source in sources for entry in source]
+    for entry_id, label, kind, weight, keys in entries:
+        index.entries[entry_id] = (label, kind, weight, sorted({k.lower() for k in keys if k}))
+        index.keys.extend((key, entry_id) for key in index.entries[entry_id][3])
+    index.keys.sort()
+    index._recompute({key[:n] for key, _ in index.keys for n in range(1, min(len(key), PRECOMPUTED_DEPTH) + 1)})
+    return index
+
+
+# Shared state
+
+_local = {'version': None, 'index': None}
+
+
+def _publish(index):
+    cache.set(INDEX_KEY, index, timeout=None)
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version = 1
+        cache.set(VERSION_KEY, version, timeout=None)
+    _local.update(version=version, index=index)
+
+
+def get_index():
+    """Return the current prefix index, rebuilding it if the cache lost it."""
+    version = cache.get(VERSION_KEY)
+    if version is not None and version == _local['version']:
+        return _local['index']
+    index = cache.get(INDEX_KEY) if version is not None else None
+    if index is None:
+        with cache_lock(LOCK_KEY) as acquired:
+            # Another worker may have built it while this one waited for the lock
+            version = cache.get(VERSION_KEY)
+            index = cache.get(INDEX_KEY) if version is not None else None
+            if index is None:
+                index = build_index()
+                # Without the lock, answer from this copy but leave the shared one alone
+                if acquired:
+                    _publish(index)
+                return index
+    _local.update(version=version, index=index)
+    return index
+
+
+def rebuild_suggestions():
+    """
+    Rebuild and publish the prefix index from scratch. Returns False, having
+    written nothing, when another worker holds the index lock.
+    """
+    with cache_lock(LOCK_KEY) as acquired:
+        if acquired:
+            _publish(build_index())
+        return acquired
+
+
+def schedule_rebuild():
+    """Queue a background rebuild of the index unless one is already queued."""
+    from .tasks import rebuild_suggestion_index
+
+    if cache.add(REBUILD_QUEUED_KEY, 1, QUEUED_TIMEOUT):
+        rebuild_suggestion_index.delay()
+
+
+def update_suggestions(policy_ids=(), tag_ids=(), contributor_ids=(), contributor_policies=()):
+    """
+    Refresh the entries of changed objects in the shared index.
+    ``contributor_policies`` lists contributors whose policies must be
+    relabelled, e.g. after a rename. If the index lock cannot be taken the
+    update is dropped in favour of a full rebuild, so concurrent writers
+    never overwrite each other's changes.
+    """
+    policy_ids, tag_ids, contributor_ids = set(policy_ids), set(tag_ids), set(contributor_ids)
+    if not (policy_ids or tag_ids or contributor_ids or contributor_policies):
+        return
+
+    with cache_lock(LOCK_KEY) as acquired:
+        if not acquired:
+            schedule_rebuild()
+            return
+        index = cache.get(INDEX_KEY)
+        if index is None:
+            _publish(build_index())
+            return
+
+        updates = []
+        if policy_ids:
+            updates.append(('policy', policy_ids, _policy_entries(_policies(ids=policy_ids))))
+        if contributor_policies:
+            updates.append(('policy', set(), _policy_entries(_policies(contributor_ids=contributor_policies))))
+        if tag_ids:
+            updates.append(('tag', tag_ids, _tag_entries(_tags(tag_ids))))
+        if contributor_ids:
+            updates.append(('contributor', contributor_ids, _contributor_entries(_contributors(contributor_ids))))
+
+        for kind, ids, entries in updates:
+            found = set()
+            for entry_id, label, entry_kind, weight, keys in entries:
+                index.put(entry_id, label, entry_kind, weight, keys)
+                found.add(entry_id)
+            for pk in ids:
+                if f'{kind}:{pk}' not in found:
+                    index.remove(f'{kind}:{pk}')
+        _publish(index)
+
+
+def schedule_update(**changes):
+    """Queue a refresh of the changed objects once the current transaction commits."""
+    changes = {name: sorted(set(ids)) for name, ids in changes.items() if ids}
+    if changes:
+        transaction.on_commit(lambda: queue_update(changes))
+
+
+def queue_update(changes):
+    """
+    Queue a background update of the index unless one for the same objects
+    is already queued, e.g. while repeated saves of one policy pile up.
+    """
+    from .tasks import update_suggestion_index
+
+    digest = hashlib.sha256(json.dumps(changes, sort_keys=True).encode('utf-8')).hexdigest()
+    queued_key = UPDATE_QUEUED_KEY % digest
+    if cache.add(queued_key, 1, QUEUED_TIMEOUT):
+        update_suggestion_index.delay(queued_key, changes)
+
+
+def suggest(prefix, limit=None):
+    """Return completions for ``prefix`` as ``(label, kind, weight)`` tuples."""
+    return get_index().complete(prefix, limit)
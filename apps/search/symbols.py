@@ -0,0 +1,199 @@
+"""
+Symbol extraction from SELinux policy sources.
+
+Each ``PolicyFile`` is parsed into the types, attributes, booleans and
+interfaces/templates it declares, and the symbols it uses (allow rules,
+interface calls, required symbols and file context labels). The results are
+stored in ``PolicySymbol`` so "which policy defines httpd_t?" is an indexed
+lookup instead of a scan over file contents.
+
+The parser is line-oriented and tolerant: it understands the refpolicy m4
+conventions used in .te/.if/.fc files and plain CIL statements, and simply
+skips anything it does not recognise.
+"""
+import re
+from collections import namedtuple
+
+from django.db import transaction
+
+from .models import PolicySymbol
+
+Symbol = namedtuple('Symbol', ['name', 'kind', 'role', 'line'])
+
+IDENT = r'[A-Za-z_][\w]*'
+IDENT_RE = re.compile(IDENT)
+
+TYPE_RE = re.compile(rf'^\s*type\s+({IDENT})\s*(?:alias\s+(?:\{{[^}}]*\}}|{IDENT})\s*)?(?:,\s*([^;]*))?;')
+ATTRIBUTE_RE = re.compile(rf'^\s*attribute\s+({IDENT})\s*;')
+TYPEATTRIBUTE_RE = re.compile(rf'^\s*typeattribute\s+({IDENT})\s+([^;]*);')
+BOOL_RE = re.compile(rf'^\s*bool\s+({IDENT})\s+(?:true|false)\s*;')
+TUNABLE_RE = re.compile(rf'^\s*gen_(?:tunable|bool)\(\s*`?({IDENT})')
+RULE_RE = re.compile(
+    r'^\s*(?:allow|dontaudit|auditallow|neverallow|allowxperm|type_transition)\s+'
+    r'(\{[^}]*\}|\S+)\s+(\{[^}]*\}|[^\s:{]+)\s*:'
+)
+INTERFACE_RE = re.compile(rf'^\s*(interface|template)\(\s*`({IDENT})\'')
+CALL_RE = re.compile(rf'^\s*({IDENT})\(')
+REQUIRE_START_RE = re.compile(r'^\s*(?:gen_require\(|require\s*\{)')
+CONTEXT_RE = re.compile(rf'(?:gen_context\(\s*)?{IDENT}:{IDENT}:({IDENT})')
+
+CIL_TYPE_RE = re.compile(rf'\(\s*type\s+({IDENT})\s*\)')
+CIL_ATTRIBUTE_RE = re.compile(rf'\(\s*typeattribute\s+({IDENT})\s*\)')
+CIL_BOOL_RE = re.compile(rf'\(\s*(?:boolean|tunable)\s+({IDENT})\s+(?:true|false)\s*\)')
+CIL_RULE_RE = re.compile(rf'\(\s*(?:allow|dontaudit|auditallow|neverallow)\s+({IDENT})\s+({IDENT})\s')
+
+# Macros that look like calls but are policy structure rather than interfaces
+NOT_INTERFACES = frozenset([
+    'policy_module', 'gen_require', 'optional_policy', 'tunable_policy',
+    'ifdef', 'ifndef', 'ifelse', 'gen_tunable', 'gen_bool', 'gen_context',
+    'interface', 'template', 'require', 'refpolicywarn', 'define',
+    'typealias', 'type_transition', 'filetrans_pattern', 'dnl',
+])
+
+# Statements inside require blocks and the symbol kind they name
+REQUIRE_KINDS = {'type': 'type', 'attribute': 'attribute', 'bool': 'boolean'}
+
+# Identifiers in rules that are keywords rather than types
+NOT_TYPES = frozenset(['self'])
+
+
+def _identifiers(expression):
+    """
+    Return the identifiers in an operand such as ``{ a -b }`` or ``a, b``.
+    Macro arguments (``$1_t``) are skipped since they are not concrete names.
+    """
+    names = []
+    for token in re.split(r'[\s{},~]+', expression):
+        token = token.lstrip('-')
+        if token and '$' not in token and IDENT_RE.fullmatch(token) and token not in NOT_TYPES:
+            names.append(token)
+    return names
+
+
+def _rule_symbols(match, line):
+    symbols = [Symbol(name, 'type', 'allow_source', line) for name in _identifiers(match.group(1))]
+    symbols += [Symbol(name, 'type', 'allow_target', line) for name in _identifiers(match.group(2))]
+    return symbols
+
+
+def _parse_refpolicy(content, file_type):
+    symbols = []
+    in_require = False
+    for line_no, raw in enumerate(content.splitlines(), start=1):
+        line = raw.split('#', 1)[0]
+        if not line.strip():
+            continue
+
+        if REQUIRE_START_RE.match(line):
+            in_require = True
+            line = re.split(r'[({]', line, maxsplit=1)[1]
+        if in_require:
+            # Requirements name symbols defined elsewhere
+            for statement in line.split(';'):
+                words = statement.replace("')", ' ').replace('}', ' ').split()
+                if len(words) >= 2 and words[0] in REQUIRE_KINDS:
+                    for name in _identifiers(' '.join(words[1:])):
+                        symbols.append(Symbol(name, REQUIRE_KINDS[words[0]], 'require', line_no))
+            if "')" in raw or '}' in raw:
+                in_require = False
+            continue
+
+        if file_type == 'fc':
+            for match in CONTEXT_RE.finditer(line):
+                symbols.append(Symbol(match.group(1), 'type', 'file_context', line_no))
+            continue
+
+        match = INTERFACE_RE.match(line)
+        if match:
+            symbols.append(Symbol(match.group(2), match.group(1), 'declaration', line_no))
+            continue
+
+        match = TYPE_RE.match(line)
+        if match:
+            symbols.append(Symbol(match.group(1), 'type', 'declaration', line_no))
+            for name in _identifiers(match.group(2) or ''):
+                symbols.append(Symbol(name, 'attribute', 'use', line_no))
+            continue
+
+        match = ATTRIBUTE_RE.match(line)
+        if match:
+            symbols.append(Symbol(match.group(1), 'attribute', 'declaration', line_no))
+            continue
+
+        match = TYPEATTRIBUTE_RE.match(line)
+        if match:
+            symbols.append(Symbol(match.group(1), 'type', 'use', line_no))
+            for name in _identifiers(match.group(2)):
+                symbols.append(Symbol(name, 'attribute', 'use', line_no))
+            continue
+
+        match = BOOL_RE.match(line) or TUNABLE_RE.match(line)
+        if match:
+            symbols.append(Symbol(match.group(1), 'boolean', 'declaration', line_no))
+            continue
+
+        match = RULE_RE.match(line)
+        if match:
+            symbols.extend(_rule_symbols(match, line_no))
+            continue
+
+        match = CALL_RE.match(line)
+        if match and match.group(1) not in NOT_INTERFACES:
+            symbols.append(Symbol(match.group(1), 'interface', 'call', line_no))
+    return symbols
+
+
+def _parse_cil(content):
+    symbols = []
+    for line_no, raw in enumerate(content.splitlines(), start=1):
+        line = raw.split(';', 1)[0]
+        for pattern, kind in ((CIL_TYPE_RE, 'type'), (CIL_ATTRIBUTE_RE, 'attribute'), (CIL_BOOL_RE, 'boolean')):
+            for match in pattern.finditer(line):
+                symbols.append(Symbol(match.group(1), kind, 'declaration', line_no))
+        for match in CIL_RULE_RE.finditer(line):
+            for name, role in ((match.group(1), 'allow_source'), (match.group(2), 'allow_target')):
+                if name not in NOT_TYPES:
+                    symbols.append(Symbol(name, 'type', role, line_no))
+    return symbols
+
+
+def extract_symbols(file_type, content):
+    """Parse a policy source file into a list of ``Symbol`` tuples."""
+    if not content:
+        return []
+    if file_type in ('te', 'if', 'fc'):
+        symbols = _parse_refpolicy(content, file_type)
+    elif file_type == 'cil':
+        symbols = _parse_cil(content)
+    else:
+        return []
+    # The same symbol used twice on one line is recorded once
+    return list(dict.fromkeys(symbols))
+
+
+def index_files(files):
+    """Replace the symbol table rows of the given ``PolicyFile`` objects."""
+    files = [f for f in files if f.pk]
+    if not files:
+        return 0
+    rows = []
+    for policy_file in files:
+        for symbol in extract_symbols(policy_file.file_type, policy_file.content):
+            rows.append(PolicySymbol(
+                name=symbol.name[:255],
+                kind=symbol.kind,
+                role=symbol.role,
+                line=symbol.line,
+                file_id=policy_file.pk,
+                version_id=policy_file.version_id,
+                policy_id=policy_file.version.policy_id,
+            ))
+    with transaction.atomic():
+        PolicySymbol.objects.filter(file_id__in=[f.pk for f in files]).delete()
+        PolicySymbol.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def index_version(version):
+    """Extract symbols for every file of a policy version."""
+    return index_files(list(version.files.select_related('version')))
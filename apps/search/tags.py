@@ -0,0 +1,115 @@
+"""
+Tag expression filtering.
+
+``?tags=`` accepts comma-separated terms that must all match. A term may list
+alternatives with ``|`` and may be negated with a leading ``-`` or ``!``::
+
+    tags=web,httpd              web AND httpd
+    tags=web|nginx,container    (web OR nginx) AND container
+    tags=web,-deprecated        web AND NOT deprecated
+
+Names are resolved to ids once per catalog generation through the cache, and
+the whole expression becomes one ``GROUP BY policy_id HAVING COUNT = n`` over
+the policy/tag table instead of one join per tag.
+"""
+import operator
+from functools import reduce
+
+from django.core.cache import cache
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+
+from apps.policies.models import Policy, Tag
+from .cache import CATALOG, get_generation
+
+NEGATION_PREFIXES = ('-', '!')
+
+# Cached id for a name that does not exist
+MISSING = 0
+
+
+def parse_tag_expression(value):
+    """
+    Split a tag expression into ``(required, excluded)``: a list of
+    alternative-name groups that must each match, and names that must not.
+    """
+    required, excluded = [], []
+    for term in (value or '').split(','):
+        term = term.strip().lower()
+        negated = term.startswith(NEGATION_PREFIXES)
+        names = [name.strip() for name in term.lstrip(''.join(NEGATION_PREFIXES)).split('|')]
+        names = [name for name in names if name]
+        if not names:
+            continue
+        if negated:
+            excluded.extend(names)
+        else:
+            required.append(names)
+    return required, excluded
+
+
+def resolve_tag_ids(names):
+    """Map lowercase tag names to ids, caching the lookups per catalog generation."""
+    names = set(names)
+    if not names:
+        return {}
+    prefix = f'search:tag-id:{get_generation(CATALOG)}:'
+    cached = cache.get_many([prefix + name for name in names])
+    ids = {key[len(prefix):]: pk for key, pk in cached.items()}
+
+    missing = names - ids.keys()
+    if missing:
+        found = {name.lower(): pk for name, pk in Tag.objects.filter(name__in=missing).values_list('name', 'id')}
+        # Tag names are slugs, so case-insensitive matches are the rare exception
+        unmatched = missing - found.keys()
+        if unmatched:
+            lookup = reduce(operator.or_, (Q(name__iexact=name) for name in unmatched))
+            found.update({name.lower(): pk for name, pk in Tag.objects.filter(lookup).values_list('name', 'id')})
+        resolved = {name: found.get(name, MISSING) for name in missing}
+        cache.set_many({prefix + name: pk for name, pk in resolved.items()})
+        ids.update(resolved)
+    return {name: pk for name, pk in ids.items() if pk != MISSING}
+
+
+def _matching_policy_ids(groups):
+    """
+    Policy ids carrying at least one tag of every group, in one grouped query.
+    Each row is labelled with the group its tag satisfies and a policy
+    qualifies when it covers all groups.
+    """
+    through = Policy.tags.through.objects.filter(tag_id__in={pk for group in groups for pk in group})
+    if all(len(group) == 1 for group in groups):
+        # Plain AND: every tag appears once per policy in the M2M table
+        matched = Count('tag_id')
+    else:
+        matched = Count(Case(
+            *[When(tag_id__in=group, then=Value(i)) for i, group in enumerate(groups)],
+            output_field=IntegerField(),
+        ), distinct=True)
+    return through.order_by().values('policy_id').annotate(
+        matched=matched
+    ).filter(matched=len(groups)).values('policy_id')
+
+
+def filter_by_tags(queryset, value):
+    """Restrict a policy queryset to a tag expression."""
+    required, excluded = parse_tag_expression(value)
+    ids = resolve_tag_ids([name for group in required for name in group] + excluded)
+
+    groups = [{ids[name] for name in group if name in ids} for group in required]
+    if any(not group for group in groups):
+        # A required tag that does not exist matches nothing
+        return queryset.none()
+    # Tags shared between groups make the group label ambiguous; check those separately
+    shared = sum(len(group) for group in groups) != len(set().union(*groups)) if groups else False
+    if groups and not shared:
+        queryset = queryset.filter(pk__in=_matching_policy_ids(groups))
+    else:
+        for group in groups:
+            queryset = queryset.filter(pk__in=_matching_policy_ids([group]))
+
+    excluded_ids = [ids[name] for name in excluded if name in ids]
+    if excluded_ids:
+        queryset = queryset.exclude(
+            pk__in=Policy.tags.through.objects.filter(tag_id__in=excluded_ids).values('policy_id')
+        )
+    return queryset
@@ -0,0 +1,36 @@
+"""
+Celery tasks for the search app.
+"""
+from celery import shared_task
+from django.core.cache import cache
+
+from .keyword import REBUILD_LOCK_KEY, rebuild_index
+from .suggest import REBUILD_QUEUED_KEY, rebuild_suggestions, update_suggestions
+
+# Seconds before a suggestion rebuild blocked by the index lock is retried
+SUGGEST_RETRY_DELAY = 30
+
+
+@shared_task(ignore_result=True)
+def rebuild_keyword_index():
+    """Index the whole catalog into a new keyword index segment."""
+    try:
+        return rebuild_index()
+    finally:
+        cache.delete(REBUILD_LOCK_KEY)
+
+
+@shared_task(ignore_result=True)
+def update_suggestion_index(queued_key, changes):
+    """Refresh the search-as-you-type entries of changed objects."""
+    # Changes committed from now on queue another update
+    cache.delete(queued_key)
+    update_suggestions(**changes)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=None)
+def rebuild_suggestion_index(self):
+    """Rebuild the search-as-you-type index, waiting for workers holding its lock."""
+    cache.delete(REBUILD_QUEUED_KEY)
+    if not rebuild_suggestions():
+        raise self.retry(countdown=SUGGEST_RETRY_DELAY)
@@ -0,0 +1,167 @@
+"""
+Typo-tolerant name matching with trigram similarity.
+
+PostgreSQL uses pg_trgm and its GIN indexes. Elsewhere the trigrams of every
+policy, contributor and tag name are precomputed into ``TrigramPosting`` so
+a fuzzy query is a handful of indexed lookups instead of a table scan.
+Similarity follows pg_trgm: shared trigrams over the union of both sets.
+"""
+import re
+
+from django.conf import settings
+from django.db.models import Count, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+from apps.contributors.models import Contributor
+from apps.policies.models import USE_POSTGRES, Policy, Tag
+from .models import TrigramPosting
+from .utils import annotate_top_relevance
+
+if USE_POSTGRES:
+    from django.contrib.postgres.search import TrigramSimilarity
+
+WORD_RE = re.compile(r'[^\W_]+', re.UNICODE)
+
+# Every source that can be matched, with the model and field it indexes
+SOURCES = {
+    'policy_name': (Policy, 'name'),
+    'policy_display_name': (Policy, 'display_name'),
+    'contributor_name': (Contributor, 'name'),
+    'tag_name': (Tag, 'name'),
+}
+POLICY_SOURCES = ('policy_name', 'policy_display_name')
+
+
+def trigrams(text):
+    """Return the set of trigrams of a string, padded per word like pg_trgm."""
+    grams = set()
+    for word in WORD_RE.findall(text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def index_trigrams(source, objects):
+    """Replace the postings of ``{object_id: text}`` for one source."""
+    if USE_POSTGRES or not objects:
+        return
+    TrigramPosting.objects.filter(source=source, object_id__in=list(objects)).delete()
+    postings = []
+    for object_id, text in objects.items():
+        grams = trigrams(text or '')
+        postings.extend(
+            TrigramPosting(gram=gram, source=source, object_id=object_id, gram_count=len(grams))
+            for gram in grams
+        )
+    TrigramPosting.objects.bulk_create(postings, batch_size=1000)
+
+
+def remove_trigrams(source, object_ids):
+    """Drop the postings of deleted objects."""
+    if not USE_POSTGRES:
+        TrigramPosting.objects.filter(source=source, object_id__in=list(object_ids)).delete()
+
+
+def rebuild_trigrams():
+    """Recompute every trigram posting from the catalog."""
+    TrigramPosting.objects.all().delete()
+    for source, (model, field) in SOURCES.items():
+        rows = model.objects.order_by('pk').values_list('pk', field)
+        batch = {}
+        for object_id, text in rows.iterator(chunk_size=1000):
+            batch[object_id] = text
+            if len(batch) >= 1000:
+                index_trigrams(source, batch)
+                batch = {}
+        index_trigrams(source, batch)
+
+
+def similar_objects(query, sources):
+    """
+    Return ``{source: {object_id: similarity}}`` for names at least
+    ``YSEAL_SEARCH_TRIGRAM_THRESHOLD`` similar to the query.
+    """
+    grams = trigrams(query)
+    if not grams:
+        return {}
+    threshold = settings.YSEAL_SEARCH_TRIGRAM_THRESHOLD
+    shared = Cast(Count('id'), FloatField())
+    rows = TrigramPosting.objects.filter(
+        gram__in=grams, source__in=sources
+    ).values('source', 'object_id', 'gram_count').annotate(
+        similarity=shared / (len(grams) + F('gram_count') - shared)
+    ).filter(similarity__gte=threshold)
+
+    matches = {}
+    for row in rows:
+        matches.setdefault(row['source'], {})[row['object_id']] = row['similarity']
+    return matches
+
+
+def _ranked_policies(query, sources):
+    """Map trigram matches on policies, contributors and tags to policy scores."""
+    matches = similar_objects(query, sources)
+    scores = {}
+
+    def merge(policy_id, score):
+        if score > scores.get(policy_id, 0.0):
+            scores[policy_id] = score
+
+    for source in POLICY_SOURCES:
+        for policy_id, score in matches.get(source, {}).items():
+            merge(policy_id, score)
+
+    contributors = matches.get('contributor_name', {})
+    if contributors:
+        rows = Policy.objects.filter(contributor_id__in=list(contributors)).values_list('pk', 'contributor_id')
+        for policy_id, contributor_id in rows:
+            merge(policy_id, contributors[contributor_id])
+
+    tags = matches.get('tag_name', {})
+    if tags:
+        rows = Policy.tags.through.objects.filter(tag_id__in=list(tags)).values_list('policy_id', 'tag_id')
+        for policy_id, tag_id in rows:
+            merge(policy_id, tags[tag_id])
+
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _postgres_fuzzy_search(queryset, query, sources):
+    conditions = Q()
+    similarities = []
+    if 'policy_name' in sources:
+        conditions |= Q(name__trigram_similar=query)
+        similarities.append(TrigramSimilarity('name', query))
+    if 'policy_display_name' in sources:
+        conditions |= Q(display_name__trigram_similar=query)
+        similarities.append(TrigramSimilarity('display_name', query))
+    if 'contributor_name' in sources:
+        conditions |= Q(contributor_id__in=Contributor.objects.filter(
+            name__trigram_similar=query
+        ).values('pk'))
+        similarities.append(TrigramSimilarity('contributor__name', query))
+    if 'tag_name' in sources:
+        conditions |= Q(pk__in=Policy.tags.through.objects.filter(
+            tag__name__trigram_similar=query
+        ).values('policy_id'))
+        tag_similarity = Policy.tags.through.objects.filter(
+            policy_id=OuterRef('pk')
+        ).annotate(
+            similarity=TrigramSimilarity('tag__name', query)
+        ).order_by('-similarity').values('similarity')[:1]
+        similarities.append(Coalesce(Subquery(tag_similarity), Value(0.0)))
+
+    relevance = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    return queryset.filter(conditions).annotate(relevance=relevance)
+
+
+def fuzzy_search(queryset, query, sources=tuple(SOURCES)):
+    """
+    Filter a policy queryset to names similar to ``query`` and annotate the
+    best trigram similarity as ``relevance``. Apply the request's filters to
+    ``queryset`` first: without pg_trgm the best
+    ``YSEAL_SEARCH_MAX_RESULTS`` are picked among the policies it matches.
+    """
+    if USE_POSTGRES:
+        return _postgres_fuzzy_search(queryset, query, sources)
+    return annotate_top_relevance(queryset, _ranked_policies(query, sources), settings.YSEAL_SEARCH_MAX_RESULTS)
@@ -0,0 +1,67 @@
+"""
+Helpers shared by the search engines.
+"""
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db.models import Case, FloatField, Value, When
+
+# Policies checked against the request's filters per query while ranking
+CANDIDATE_BATCH = 500
+
+
+def annotate_relevance(queryset, ranked):
+    """
+    Restrict a policy queryset to ranked ``(pk, score)`` pairs produced by an
+    in-process engine and expose each score as the ``relevance`` annotation,
+    so ordering, filtering and pagination still happen in the database.
+    """
+    if not ranked:
+        return queryset.none()
+    return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(
+        relevance=Case(
+            *[When(pk=pk, then=Value(float(score))) for pk, score in ranked],
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+    )
+
+
+def annotate_top_relevance(queryset, ranked, limit):
+    """
+    Like ``annotate_relevance`` for the best ``limit`` pairs of a full
+    ranking that ``queryset`` matches. When the queryset has filters the
+    ranking is checked against them in batches, best first, so the cap
+    applies to the policies the caller's filters leave rather than to the
+    whole catalog.
+    """
+    if not queryset.query.has_filters():
+        return annotate_relevance(queryset, ranked[:limit])
+    matched = []
+    for start in range(0, len(ranked), CANDIDATE_BATCH):
+        batch = ranked[start:start + CANDIDATE_BATCH]
+        allowed = set(queryset.filter(pk__in=[pk for pk, _ in batch]).values_list('pk', flat=True))
+        matched.extend(pair for pair in batch if pair[0] in allowed)
+        if len(matched) >= limit:
+            break
+    return annotate_relevance(queryset, matched[:limit])
+
+
+@contextmanager
+def cache_lock(key, timeout=30, wait=10):
+    """
+    Best-effort mutual exclusion across workers using ``cache.add``.
+    Gives up waiting after ``wait`` seconds and proceeds unlocked rather than
+    failing the request; the lock expires on its own after ``timeout``.
+    """
+    deadline = time.monotonic() + wait
+    acquired = cache.add(key, 1, timeout)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(0.01)
+        acquired = cache.add(key, 1, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(key)
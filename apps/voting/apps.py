@@ -5,3 +5,6 @@ class VotingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.voting'
     verbose_name = 'Voting'
+    
+    def ready(self):
+        import apps.voting.signals
@@ -0,0 +1,16 @@
+"""
+Management command to recompute the rating summaries and vote tallies on Policy.
+"""
+from django.core.management.base import BaseCommand
+from apps.search.cache import FEEDBACK, bump_generation
+from apps.voting.tallies import rebuild_rating_summaries, rebuild_vote_tallies
+
+
+class Command(BaseCommand):
+    help = 'Recompute policy rating summaries and vote tallies from the ratings and votes tables'
+
+    def handle(self, *args, **options):
+        rebuild_rating_summaries()
+        rebuild_vote_tallies()
+        bump_generation(FEEDBACK)
+        self.stdout.write(self.style.SUCCESS('Rebuilt policy rating summaries and vote tallies'))
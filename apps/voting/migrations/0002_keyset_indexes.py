@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('voting', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['created_at', 'id'], name='ratings_created_54e3f6_idx'),
+        ),
+    ]
@@ -83,6 +83,7 @@ class Rating(TimeStampedModel):
         indexes = [
             models.Index(fields=['policy', 'score']),
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['created_at', 'id']),
         ]
 
     def __str__(self):
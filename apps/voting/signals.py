@@ -0,0 +1,74 @@
+"""
+Signals keeping the rating summaries and vote tallies on Policy in step
+with Rating and Vote changes.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from apps.search.cache import FEEDBACK, schedule_bump
+from .models import Rating, Vote
+from .tallies import add_rating, add_vote
+
+
+@receiver(pre_save, sender=Rating)
+def remember_rating(sender, instance, update_fields=None, **kwargs):
+    """Capture the stored policy and score so an edit can be moved between buckets."""
+    instance._tally_previous = None
+    if instance.pk is None or instance._state.adding:
+        return
+    if update_fields is not None and not {'policy', 'score'}.intersection(update_fields):
+        instance._tally_previous = (instance.policy_id, instance.score)
+        return
+    instance._tally_previous = Rating.objects.filter(pk=instance.pk).values_list('policy_id', 'score').first()
+
+
+@receiver(post_save, sender=Rating)
+def tally_rating(sender, instance, **kwargs):
+    """Apply a new or edited rating to the policy summary."""
+    previous = getattr(instance, '_tally_previous', None)
+    current = (instance.policy_id, instance.score)
+    if previous == current:
+        return
+    if previous is not None:
+        add_rating(*previous, sign=-1)
+    add_rating(*current)
+    schedule_bump(FEEDBACK)
+
+
+@receiver(post_delete, sender=Rating)
+def untally_rating(sender, instance, **kwargs):
+    """Remove a deleted rating from the policy summary."""
+    add_rating(instance.policy_id, instance.score, sign=-1)
+    schedule_bump(FEEDBACK)
+
+
+@receiver(pre_save, sender=Vote)
+def remember_vote(sender, instance, update_fields=None, **kwargs):
+    """Capture the stored policy and value so a changed vote can be moved."""
+    instance._tally_previous = None
+    if instance.pk is None or instance._state.adding:
+        return
+    if update_fields is not None and not {'policy', 'value'}.intersection(update_fields):
+        instance._tally_previous = (instance.policy_id, instance.value)
+        return
+    instance._tally_previous = Vote.objects.filter(pk=instance.pk).values_list('policy_id', 'value').first()
+
+
+@receiver(post_save, sender=Vote)
+def tally_vote(sender, instance, **kwargs):
+    """Apply a new or changed vote to the policy tallies."""
+    previous = getattr(instance, '_tally_previous', None)
+    current = (instance.policy_id, instance.value)
+    if previous == current:
+        return
+    if previous is not None:
+        add_vote(*previous, sign=-1)
+    add_vote(*current)
+    schedule_bump(FEEDBACK)
+
+
+@receiver(post_delete, sender=Vote)
+def untally_vote(sender, instance, **kwargs):
+    """Remove a deleted vote from the policy tallies."""
+    add_vote(instance.policy_id, instance.value, sign=-1)
+    schedule_bump(FEEDBACK)
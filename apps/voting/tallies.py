@@ -0,0 +1,131 @@
+"""
+Rating summaries and vote tallies kept on Policy.
+
+Every Rating change adjusts the policy's ``rating_count``, ``rating_sum``
+and per-score histogram column with a single ``UPDATE ... SET col = col + n``,
+so concurrent ratings never lose updates and readers get the average and
+histogram from the policy row itself. The same statement refreshes
+``bayesian_rating``, the indexed sort key behind ``order_by=-rating``.
+
+Votes work the same way: ``star_count`` and ``downvote_count`` are adjusted
+in place together with ``wilson_score``, the lower bound of the Wilson score
+interval for the share of upvotes, which backs ``order_by=-score``.
+
+``rebuild_rating_summaries`` and ``rebuild_vote_tallies`` recompute the
+columns from the source tables, for backfills and after changing the
+rating prior.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Sqrt
+from django.db.models.lookups import GreaterThan
+
+from apps.policies.models import Policy
+from .models import Rating, Vote
+
+SCORES = range(1, 6)
+
+# Normal quantile for the Wilson interval (95% confidence)
+WILSON_Z = 1.96
+
+
+def bayesian_average(total, count):
+    """
+    Expression for the Bayesian average of ``count`` ratings summing to
+    ``total``, or 0 for a policy without ratings.
+    """
+    weight = settings.YSEAL_RATING_PRIOR_WEIGHT
+    prior = settings.YSEAL_RATING_PRIOR_MEAN * weight
+    return Case(
+        When(GreaterThan(count, 0), then=(Value(prior) + total) / (Value(float(weight)) + count)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def add_rating(policy_id, score, sign=1):
+    """Count a rating towards (or with ``sign=-1`` away from) a policy's summary."""
+    count = F('rating_count') + sign
+    total = F('rating_sum') + sign * score
+    column = f'rating_{score}_count'
+    Policy.objects.filter(pk=policy_id).update(
+        rating_count=count,
+        rating_sum=total,
+        bayesian_rating=bayesian_average(total, count),
+        **{column: F(column) + sign},
+    )
+
+
+def rebuild_rating_summaries(policy_ids=None):
+    """Recompute the rating summary of the given policies, or of every policy."""
+    ratings = Rating.objects.all()
+    policies = Policy.objects.all()
+    if policy_ids is not None:
+        ratings = ratings.filter(policy_id__in=policy_ids)
+        policies = policies.filter(pk__in=policy_ids)
+
+    summaries = ratings.order_by().values('policy_id').annotate(
+        rating_count=Count('id'),
+        rating_sum=Sum('score'),
+        **{f'rating_{score}_count': Count('id', filter=Q(score=score)) for score in SCORES},
+    )
+    with transaction.atomic():
+        policies.update(
+            rating_count=0, rating_sum=0, bayesian_rating=0,
+            **{f'rating_{score}_count': 0 for score in SCORES},
+        )
+        for summary in summaries:
+            policy_id = summary.pop('policy_id')
+            Policy.objects.filter(pk=policy_id).update(
+                bayesian_rating=bayesian_average(Value(summary['rating_sum']), Value(summary['rating_count'])),
+                **summary,
+            )
+
+
+def wilson_lower_bound(up, down):
+    """
+    Expression for the lower bound of the Wilson score interval of ``up``
+    positive out of ``up + down`` votes, or 0 without votes.
+    """
+    z2 = WILSON_Z * WILSON_Z
+    total = up + down
+    spread = Value(WILSON_Z) * Sqrt(up * down * Value(1.0) / total + Value(z2 / 4))
+    return Case(
+        When(GreaterThan(total, 0), then=(up + Value(z2 / 2) - spread) / (total + Value(z2))),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def add_vote(policy_id, value, sign=1):
+    """Count an up (1) or down (-1) vote towards (or with ``sign=-1`` away from) a policy."""
+    up = F('star_count') + (sign if value > 0 else 0)
+    down = F('downvote_count') + (sign if value < 0 else 0)
+    Policy.objects.filter(pk=policy_id).update(
+        star_count=up,
+        downvote_count=down,
+        wilson_score=wilson_lower_bound(up, down),
+    )
+
+
+def rebuild_vote_tallies(policy_ids=None):
+    """Recompute the vote tallies of the given policies, or of every policy."""
+    votes = Vote.objects.all()
+    policies = Policy.objects.all()
+    if policy_ids is not None:
+        votes = votes.filter(policy_id__in=policy_ids)
+        policies = policies.filter(pk__in=policy_ids)
+
+    tallies = votes.order_by().values('policy_id').annotate(
+        star_count=Count('id', filter=Q(value__gt=0)),
+        downvote_count=Count('id', filter=Q(value__lt=0)),
+    )
+    with transaction.atomic():
+        policies.update(star_count=0, downvote_count=0, wilson_score=0)
+        for tally in tallies:
+            policy_id = tally.pop('policy_id')
+            Policy.objects.filter(pk=policy_id).update(
+                wilson_score=wilson_lower_bound(Value(tally['star_count']), Value(tally['downvote_count'])),
+                **tally,
+            )
@@ -10,6 +10,8 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+# Sync workers serve one request at a time, so requests held open (such as
+# GET /api/v3/imports/{id}/?wait=N) are capped by YSEAL_IMPORT_MAX_WAIT
 worker_class = 'sync'
 worker_connections = 1000
 timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
@@ -36,5 +38,13 @@ user = None
 group = None
 tmp_upload_dir = None
 
+
+
+def worker_exit(server, worker):
+    """Write buffered download logs and counters before a worker goes away."""
+    from apps.policies.downloads import flush_pending
+    flush_pending()
+
+
 # SSL (handled by OpenShift router)
 # No SSL configuration needed here
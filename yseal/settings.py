@@ -105,6 +105,10 @@ if USE_POSTGRES:
             'PASSWORD': os.getenv('DB_PASSWORD', 'yseal'),
             'HOST': os.getenv('DB_HOST', 'localhost'),
             'PORT': os.getenv('DB_PORT', '5432'),
+            'OPTIONS': {
+                # Threshold used by the pg_trgm % operator for fuzzy search
+                'options': f"-c pg_trgm.similarity_threshold={os.getenv('SEARCH_TRIGRAM_THRESHOLD', '0.2')}",
+            },
         }
     }
 else:
@@ -196,6 +200,20 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'flush-download-counters': {
+        'task': 'apps.policies.tasks.flush_download_counters',
+        'schedule': float(os.getenv('DOWNLOAD_FLUSH_INTERVAL', '60')),
+    },
+    'roll-up-download-logs': {
+        'task': 'apps.policies.tasks.roll_up_download_logs',
+        'schedule': float(os.getenv('DOWNLOAD_ROLLUP_INTERVAL', '300')),
+    },
+    'compact-download-logs': {
+        'task': 'apps.policies.tasks.compact_download_logs',
+        'schedule': 24 * 60 * 60.0,
+    },
+}
 
 # Cache Configuration
 CACHES = {
@@ -269,6 +287,94 @@ if DEBUG:
 YSEAL_API_PATH_PREFIX = '/api'
 YSEAL_DEFAULT_CONTRIBUTOR = 'community'
 
+# Search Settings
+# Text search configuration used for PostgreSQL full-text search vectors
+YSEAL_SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', 'english')
+# Memory-mapped BM25 keyword index used when PostgreSQL is not available
+YSEAL_SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', str(BASE_DIR / 'search_index' / 'policies.idx'))
+# Journal entries appended before the keyword index is compacted
+YSEAL_SEARCH_INDEX_JOURNAL_LIMIT = int(os.getenv('SEARCH_INDEX_JOURNAL_LIMIT', '1000'))
+# Maximum number of ranked matches an in-process search engine returns
+YSEAL_SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', '1000'))
+# Minimum trigram similarity for fuzzy (?fuzzy=1) matches
+YSEAL_SEARCH_TRIGRAM_THRESHOLD = float(os.getenv('SEARCH_TRIGRAM_THRESHOLD', '0.2'))
+# Number of completions returned by the search suggest endpoint
+YSEAL_SUGGEST_LIMIT = int(os.getenv('SUGGEST_LIMIT', '10'))
+# Values returned per facet and seconds facet counts are cached for
+YSEAL_SEARCH_FACET_LIMIT = int(os.getenv('SEARCH_FACET_LIMIT', '20'))
+YSEAL_SEARCH_FACET_CACHE_TTL = int(os.getenv('SEARCH_FACET_CACHE_TTL', '300'))
+# Upper bound in seconds on how long a cached search result page is served
+YSEAL_SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', '300'))
+
+# Download Settings
+# Seconds between flushes of pending download counters (also the Celery beat interval)
+YSEAL_DOWNLOAD_FLUSH_INTERVAL = int(os.getenv('DOWNLOAD_FLUSH_INTERVAL', '60'))
+# Download log rows buffered per process before a bulk write (1 writes each row inline),
+# the longest a row waits, and the buffer size at which hot policies are sampled down
+YSEAL_DOWNLOAD_BUFFER_SIZE = int(os.getenv('DOWNLOAD_BUFFER_SIZE', '500'))
+YSEAL_DOWNLOAD_BUFFER_SECONDS = float(os.getenv('DOWNLOAD_BUFFER_SECONDS', '5'))
+YSEAL_DOWNLOAD_BUFFER_CAPACITY = int(os.getenv('DOWNLOAD_BUFFER_CAPACITY', '10000'))
+# Download log rows folded into the rollup tables per transaction
+YSEAL_DOWNLOAD_ROLLUP_BATCH = int(os.getenv('DOWNLOAD_ROLLUP_BATCH', '50000'))
+# Seconds a download log row must age before it is rolled up
+YSEAL_DOWNLOAD_ROLLUP_LAG = int(os.getenv('DOWNLOAD_ROLLUP_LAG', '60'))
+# Days raw download logs and hourly rollups are kept; daily rollups are kept forever
+YSEAL_DOWNLOAD_LOG_RETENTION_DAYS = int(os.getenv('DOWNLOAD_LOG_RETENTION_DAYS', '90'))
+YSEAL_DOWNLOAD_HOURLY_RETENTION_DAYS = int(os.getenv('DOWNLOAD_HOURLY_RETENTION_DAYS', '30'))
+# Seconds download statistics responses are cached for
+YSEAL_STATS_CACHE_TTL = int(os.getenv('STATS_CACHE_TTL', '300'))
+
+# Rating Settings
+# Prior for the Bayesian average used by order_by=-rating: policies behave as if they
+# already had RATING_PRIOR_WEIGHT ratings of RATING_PRIOR_MEAN stars
+YSEAL_RATING_PRIOR_MEAN = float(os.getenv('RATING_PRIOR_MEAN', '3.0'))
+YSEAL_RATING_PRIOR_WEIGHT = int(os.getenv('RATING_PRIOR_WEIGHT', '10'))
+
+# Version Settings
+# Seconds clients may cache a published version's detail (served with Cache-Control: immutable)
+YSEAL_VERSION_CACHE_MAX_AGE = int(os.getenv('VERSION_CACHE_MAX_AGE', '31536000'))
+
+# Import Settings
+# Directory uploads are spooled to until the import task has read them; it must be
+# shared by the web and Celery worker hosts
+YSEAL_IMPORT_SPOOL_DIR = os.getenv('IMPORT_SPOOL_DIR', str(BASE_DIR / 'spool' / 'imports'))
+# Bytes read from an archive at a time while hashing and unpacking
+YSEAL_IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '65536'))
+# Policy file rows inserted per bulk write
+YSEAL_IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+# Largest package member imported; bigger members are skipped
+YSEAL_IMPORT_MAX_FILE_SIZE = int(os.getenv('IMPORT_MAX_FILE_SIZE', str(16 * 1024 * 1024)))
+# Most frequent an import writes its progress, in seconds
+YSEAL_IMPORT_PROGRESS_INTERVAL = float(os.getenv('IMPORT_PROGRESS_INTERVAL', '1'))
+# Longest a GET /api/v3/imports/{id}/?wait=N request is held open, in seconds. A waiting
+# request occupies a whole sync gunicorn worker, so keep this short; clients re-poll
+# until the import finishes
+YSEAL_IMPORT_MAX_WAIT = int(os.getenv('IMPORT_MAX_WAIT', '5'))
+
+# Archive Settings
+# Directory uploaded policy archives are kept in, named by their SHA-256
+YSEAL_ARCHIVE_ROOT = os.getenv('ARCHIVE_ROOT', str(BASE_DIR / 'archives'))
+# nginx internal location aliased to ARCHIVE_ROOT (e.g. /_archives/); when set, downloads
+# are handed to nginx with X-Accel-Redirect instead of being sent by the application
+YSEAL_ARCHIVE_ACCEL_REDIRECT = os.getenv('ARCHIVE_ACCEL_REDIRECT', '')
+# Total size in bytes of archives assembled for versions without an upload, kept under
+# ARCHIVE_ROOT/built; the least recently downloaded are evicted beyond it (default: 1 GiB)
+YSEAL_ARCHIVE_CACHE_MAX_SIZE = int(os.getenv('ARCHIVE_CACHE_MAX_SIZE', str(1024 * 1024 * 1024)))
+# Seconds a download waits for another request assembling the same archive before
+# streaming its own uncached copy
+YSEAL_ARCHIVE_BUILD_WAIT = int(os.getenv('ARCHIVE_BUILD_WAIT', '60'))
+
+# Blob Storage Settings
+# Where new policy file contents are stored: 'database' or 'filesystem' (under BLOB_ROOT,
+# which must be shared by the web and Celery worker hosts)
+YSEAL_BLOB_STORAGE = os.getenv('BLOB_STORAGE', 'database')
+YSEAL_BLOB_ROOT = os.getenv('BLOB_ROOT', str(BASE_DIR / 'blobs'))
+# 'zstd' compresses new blobs (requires the zstandard package); 'none' stores them as-is
+YSEAL_BLOB_COMPRESSION = os.getenv('BLOB_COMPRESSION', 'none')
+YSEAL_BLOB_ZSTD_LEVEL = int(os.getenv('BLOB_ZSTD_LEVEL', '3'))
+# Largest file whose text is included in version details
+YSEAL_FILE_CONTENT_MAX_SIZE = int(os.getenv('FILE_CONTENT_MAX_SIZE', str(1024 * 1024)))
+
 # Authentication
 LOGIN_URL = '/dashboard/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'